@@ -13,10 +13,15 @@ from sqlalchemy.exc import SQLAlchemyError
 from controllers.investmentsEP import InvestmentController
 from controllers.transactionsEP import TransactionController
 from enums.TaskStatusEnum import JobStatus
+from migrations import runMigrations
+from services.AggregateService import AggregateService
+from services.IngestionJobService import IngestionJobService
 from services.InvestmentService import InvestmentService
 from services.JsonDownloadService import JSONDownloadService
+from services.TransactionSearchService import TransactionSearchService
 from services.tasks.scheduler import TaskScheduler
 from services.transactionsService import TransactionService
+from utils.OrjsonProvider import OrjsonProvider
 from utils.logger import Logger
 import models
 
@@ -28,6 +33,7 @@ class Akkountant(Flask):
     scheduler: TaskScheduler
     transactionEP: TransactionController
     transactionService: TransactionService
+    json_provider_class = OrjsonProvider
 
     def __init__(self, import_name: str):
         load_dotenv()
@@ -117,6 +123,23 @@ class Akkountant(Flask):
             else:
                 self.logger.info("No new tables created.")
 
+            # Indexes and columns create_all cannot add to existing tables
+            runMigrations(self.db.engine)
+
+            # Mail and statement reads that were queued or running when the server stopped
+            IngestionJobService().failOrphanedJobs(self.db.engine)
+
+            # Search index over transaction details and tags
+            searchService = TransactionSearchService()
+            searchService.ensureIndexes(self.db.engine)
+            if models.TransactionSearchToken.__tablename__ not in existing_tables_before:
+                searchService.rebuild(self.db.session)
+            # Backfill the aggregate tables the first time they are created
+            if models.DailyRollup.__tablename__ not in existing_tables_before:
+                AggregateService().rebuildDailyRollup(self.db.session)
+            if models.MonthlySpend.__tablename__ not in existing_tables_before:
+                AggregateService().rebuildMonthlySpend(self.db.session)
+
     def _setup_instances(self):
         """Initialize application instances."""
         self.transactionService = TransactionService()
@@ -167,10 +190,14 @@ class Akkountant(Flask):
         """Define application routes."""
         transactionRoutes = [
             ('/fetchTransactions', 'POST', self.transactionEP.fetchTransactions),
+            ('/exportTransactions', 'POST', self.transactionEP.exportTransactions),
+            ('/transactionCacheStats', 'GET', self.transactionEP.fetchCacheStats),
             ('/fetchOptedBanks', 'GET', self.transactionEP.fetchOptedBanks),
             ('/calendarTransactions', 'POST', self.transactionEP.fetchCalendarTransactions),
+            ('/spendSummary', 'GET', self.transactionEP.fetchSpendSummary),
             ('/readEmails', 'GET', self.transactionEP.triggerEmailCheck),
             ('/readStatements', 'GET', self.transactionEP.triggerStatementCheck),
+            ('/jobStatus', 'GET', self.transactionEP.fetchJobStatus),
             ('/getFileDetails', 'POST', self.transactionEP.fetchFileDetails),
             ('/getGoogleStatus', 'GET', self.transactionEP.checkGoogleApiStatus),
             ('/updateGoogleTokens', 'POST', self.transactionEP.addUpdateUserToken),
@@ -236,8 +263,11 @@ class Akkountant(Flask):
         self.run(host=host, port=port, debug=debug)
 
 
-app = Akkountant(__name__)
-flask_app = app.app
+# Statement parse workers are spawned, and spawn re-imports the module started with python as __mp_main__ in every
+# worker. They only parse, so they must not build the app, run migrations or start the scheduler again
+if __name__ != "__mp_main__":
+    app = Akkountant(__name__)
+    flask_app = app.app
 
 if __name__ == "__main__":
     app.run_app(debug=False)
@@ -0,0 +1,168 @@
+"""
+Throughput of reading transaction alerts, the compiled matchers against the per-email implementation they replaced.
+
+    python -m benchmarks.EmailExtractBenchmark [--snippets 100000] [--banks HDFC_DEBIT YES_BANK_ACE] [--conflict-rate 0]
+
+Times `GenericUtil.extractDetailsFromEmail` and `DateTimeUtil.convert_to_sql_datetime` over synthetic alerts of every
+bank next to a copy of the code before the matcher registry and the resolved format cache. Exits with 1 when any
+output differs from that baseline. tests/test_email_extract_benchmark.py runs the same comparison in the test suite.
+"""
+import argparse
+import datetime
+import random
+import re
+import sys
+import time
+
+from enums.DateFormatEnum import DateStatementEnum
+from enums.EmailRegexEnum import EmailRegexEnum
+from utils.DateTimeUtil import DateTimeUtil
+from utils.GenericUtils import GenericUtil
+
+MERCHANTS = ['SWIGGY', 'ZOMATO', 'AMAZON PAY INDIA', 'FLIPKART', 'BIGBASKET', 'UBER INDIA', 'IRCTC', 'BESCOM',
+             'AIRTEL PAYMENTS', 'DECATHLON SPORTS', 'BOOKMYSHOW', 'APOLLO PHARMACY', 'SHELL PETROL', 'BLINKIT']
+
+
+def hdfcDebit(generator, day, amount, merchant):
+    return (f"Dear Customer, Rs.{amount} has been debited from account **{generator.randrange(10 ** 4):04d} to VPA "
+            f"{merchant.lower().replace(' ', '')}@ybl {merchant} on {day:%d-%m-%y}. Your UPI transaction reference "
+            f"number is {generator.randrange(10 ** 12):012d}. If you did not authorize this transaction, please report "
+            f"it immediately.")
+
+
+def milleniaCredit(generator, day, amount, merchant):
+    return (f"Thank you for using your HDFC Bank Credit Card ending {generator.randrange(10 ** 4):04d} for Rs {amount} "
+            f"at {merchant} on {day:%d-%m-%Y} {generator.randrange(24):02d}:{generator.randrange(60):02d}:"
+            f"{generator.randrange(60):02d}. Authorization code:- {generator.randrange(10 ** 6):06d} ")
+
+
+def iciciAmazonPay(generator, day, amount, merchant):
+    return (f"Your ICICI Bank Credit Card XX{generator.randrange(10 ** 4):04d} has been used for a transaction of INR "
+            f"{amount} on {day:%b %d, %Y} at {generator.randrange(24):02d}:{generator.randrange(60):02d}:"
+            f"{generator.randrange(60):02d}. Info: {merchant}. The Available Credit Limit on your card is INR "
+            f"{generator.randrange(10 ** 5):,}.00 ")
+
+
+def yesBankAce(generator, day, amount, merchant):
+    return (f"INR {amount} has been spent on your YES BANK Credit Card ending with {generator.randrange(10 ** 4):04d} "
+            f"at {merchant} on {day:%d-%m-%Y} at {generator.randrange(1, 13):02d}:{generator.randrange(60):02d}:"
+            f"{generator.randrange(60):02d} {generator.choice(['am', 'pm'])}. Avl Bal INR "
+            f"{generator.randrange(10 ** 5):,}.{generator.randrange(100):02d} ")
+
+
+# Banks with an alert pattern, YES_BANK_DEBIT has none
+ALERTS = {
+    'HDFC_DEBIT': hdfcDebit,
+    'Millenia_Credit': milleniaCredit,
+    'ICICI_AMAZON_PAY': iciciAmazonPay,
+    'YES_BANK_ACE': yesBankAce,
+}
+
+
+def snippets(bank, count, conflictRate, seed=0):
+    """:return: `count` alerts of `bank`, about `conflictRate` of them in a shape the pattern does not match"""
+    generator = random.Random(seed)
+    firstDay = datetime.date(2023, 1, 1)
+    generated = []
+    for _ in range(count):
+        if generator.random() < conflictRate:
+            generated.append(f"Your OTP for the transaction is {generator.randrange(10 ** 6):06d}. Do not share it.")
+            continue
+        day = firstDay + datetime.timedelta(days=generator.randrange(730))
+        amount = f"{generator.randrange(1, 10 ** 5)}.{generator.randrange(100):02d}"
+        generated.append(ALERTS[bank](generator, day, amount, generator.choice(MERCHANTS)))
+    return generated
+
+
+""" The implementation before the matcher registry, kept as the reference the outputs are compared with """
+
+
+def baselineConvert(date_str, bank):
+    try:
+        parsed_date = datetime.datetime.strptime(date_str, getattr(DateStatementEnum, bank).value)
+        return parsed_date.strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        possible_format = DateTimeUtil.find_matching_format(date_str)
+        if possible_format is not None:
+            parsed_date = datetime.datetime.strptime(date_str, possible_format)
+            return parsed_date.strftime("%Y-%m-%d %H:%M:%S")
+        raise ValueError(f"Date format of '{date_str}' is not recognized.")
+
+
+def baselineExtract(emails, bankType):
+    pattern = EmailRegexEnum[bankType].value
+    cleanedMails = []
+    conflicts = []
+    for email in emails:
+        matches = re.search(pattern, email)
+        if matches:
+            details = matches.groupdict()
+            date = baselineConvert(details.get('transaction_date'), bankType)
+            description = details.get('merchant')
+            amount = details.get('amount_spent')
+            referenceID = GenericUtil().generate_reference_id(date, description, amount)
+            cleanedMails.append({
+                'reference': referenceID,
+                'date': date,
+                'description': description,
+                'amount': amount,
+            })
+        else:
+            conflicts.append(email)
+    return cleanedMails, conflicts
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def benchmarkBank(bank, count, conflictRate):
+    """:return: (report lines, list of mismatches)"""
+    alerts = snippets(bank, count, conflictRate)
+    search = GenericUtil.getEmailMatcher(bank).search
+    dates = [match.group('transaction_date') for match in map(search, alerts) if match]
+    # Start from an empty format cache, the first alert of every shape pays for resolving it
+    DateTimeUtil._resolved_formats.clear()
+    convert = DateTimeUtil().convert_to_sql_datetime
+    extractor = GenericUtil()
+
+    before, expectedDates = timed(lambda: [baselineConvert(date, bank) for date in dates])
+    after, actualDates = timed(lambda: [convert(date, bank) for date in dates])
+    reports = [f"{bank:<18} convert_to_sql_datetime  {len(dates):>7} dates     "
+               f"{before * 1000:>9.1f} ms -> {after * 1000:>9.1f} ms"]
+
+    before, expected = timed(baselineExtract, alerts, bank)
+    after, actual = timed(extractor.extractDetailsFromEmail, alerts, bank)
+    reports.append(f"{bank:<18} extractDetailsFromEmail  {len(alerts):>7} snippets  "
+                   f"{before * 1000:>9.1f} ms -> {after * 1000:>9.1f} ms")
+
+    mismatches = []
+    if actualDates != expectedDates:
+        mismatches.append(f"{bank}: convert_to_sql_datetime differs from the baseline")
+    if actual != expected:
+        mismatches.append(f"{bank}: extractDetailsFromEmail differs from the baseline")
+    return reports, mismatches
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument('--snippets', type=int, default=100000, help="Alerts generated per bank")
+    arguments.add_argument('--banks', nargs='+', choices=list(ALERTS), default=list(ALERTS))
+    arguments.add_argument('--conflict-rate', type=float, default=0,
+                           help="Share of alerts that do not match, every one of them is logged as an error")
+    options = arguments.parse_args(argv)
+
+    failures = []
+    for bank in options.banks:
+        reports, mismatches = benchmarkBank(bank, options.snippets, options.conflict_rate)
+        print("\n".join(reports))
+        failures += mismatches
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
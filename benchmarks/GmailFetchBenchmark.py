@@ -0,0 +1,194 @@
+"""
+Round trips and wall time of reading mail snippets, batched against one `messages().get` per message.
+
+    python -m benchmarks.GmailFetchBenchmark [--messages 1000] [--latency-ms 5] [--page-size 100] [--failing 0]
+
+Runs the real Gmail API client against a local HTTP server that answers like the API: list pages with nextPageToken,
+per-message gets and multipart batch requests, sleeping `latency` per HTTP round trip. `--failing` messages answer
+503 inside every batch and on their first get of their own, so the per-item fallback and its retries run too. Exits
+with 1 when the batched fetch does not return exactly the snippets of the per-message fetch.
+"""
+import argparse
+import email.parser
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from google.oauth2.credentials import Credentials
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+from utils.GmailPaging import iterMessagePages
+from utils.GmailServiceUtils import GmailServiceUtils
+
+MESSAGES_PATH = '/gmail/v1/users/me/messages'
+BOUNDARY = 'fake_gmail_batch'
+
+
+class FakeGmailHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes, with Nagle every keep-alive response waits for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.roundTrip()
+        status, body = self.server.answer(self.path, individual=True)
+        self.reply(status, 'application/json', body)
+
+    def do_POST(self):
+        self.server.roundTrip()
+        content = self.rfile.read(int(self.headers['Content-Length']))
+        if urllib.parse.urlsplit(self.path).path != '/batch':
+            self.reply(404, 'application/json', b'{}')
+            return
+        self.server.batches += 1
+        parts = email.parser.BytesParser().parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + content)
+        answers = []
+        for part in parts.get_payload():
+            # Every part holds one HTTP request, answered in a part that echoes its Content-ID
+            requestLine = part.get_payload().split('\n', 1)[0].strip()
+            status, body = self.server.answer(requestLine.split(' ')[1], individual=False)
+            answers.append(f"--{BOUNDARY}\r\nContent-Type: application/http\r\n"
+                           f"Content-ID: <response-{part['Content-ID'][1:]}\r\n\r\n"
+                           f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                           f"Content-Type: application/json\r\n\r\n{body.decode()}\r\n")
+        self.reply(200, f"multipart/mixed; boundary={BOUNDARY}", ("".join(answers) + f"--{BOUNDARY}--").encode())
+
+    def reply(self, status, contentType, body):
+        self.send_response(status)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeGmailServer(ThreadingHTTPServer):
+    """The Gmail endpoints the mail readers use, over a generated mailbox, on a free local port."""
+    daemon_threads = True
+
+    def __init__(self, messageCount, latency, failing=0):
+        super().__init__(('127.0.0.1', 0), FakeGmailHandler)
+        self.latency = latency
+        self.roundTrips = 0
+        self.batches = 0
+        self.retried = 0
+        self._lock = threading.Lock()
+        self.mailbox = [{'id': f"{index:016x}", 'threadId': f"{index:016x}", 'internalDate': str(index * 1000),
+                         'snippet': f"Rs.{index % 997}.00 has been debited from account **1234 to VPA merchant{index}"
+                                    f"@upi on 01-01-24. Your UPI transaction reference number is {index:012d}."}
+                        for index in range(messageCount)]
+        self.byId = {message['id']: message for message in self.mailbox}
+        # Spread over the mailbox, these fail in every batch and once on their own
+        self.failing = {message['id'] for message in self.mailbox[::max(1, messageCount // failing)][:failing]} \
+            if failing else set()
+        self._failedOnce = set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def roundTrip(self):
+        with self._lock:
+            self.roundTrips += 1
+        time.sleep(self.latency)
+
+    def answer(self, path, individual):
+        """:return: (status, JSON body) of a GET of the list or a message"""
+        url = urllib.parse.urlsplit(path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        if url.path == MESSAGES_PATH:
+            return 200, json.dumps(self.listPage(int(query['maxResults']), query.get('pageToken'))).encode()
+        messageId = url.path.rsplit('/', 1)[-1]
+        if messageId not in self.byId:
+            return 404, b'{"error": {"code": 404, "message": "Not Found"}}'
+        if messageId in self.failing:
+            with self._lock:
+                failed = not individual or messageId not in self._failedOnce
+                if individual:
+                    self.retried += messageId in self._failedOnce
+                    self._failedOnce.add(messageId)
+            if failed:
+                return 503, b'{"error": {"code": 503, "message": "Backend Error"}}'
+        message = self.byId[messageId]
+        if 'fields' in query:
+            message = {field: message[field] for field in query['fields'].split(',')}
+        return 200, json.dumps(message).encode()
+
+    def listPage(self, maxResults, pageToken=None):
+        start = int(pageToken or 0)
+        page = {'messages': [{'id': message['id'], 'threadId': message['threadId']}
+                             for message in self.mailbox[start:start + maxResults]]}
+        if start + maxResults < len(self.mailbox):
+            page['nextPageToken'] = str(start + maxResults)
+        return page
+
+
+def gmailClient(server):
+    """:return: (Gmail service, credentials) of the real API client, pointed at `server`"""
+    document = json.loads(discovery_cache.get_static_doc('gmail', 'v1'))
+    document['rootUrl'] = server.url
+    credentials = Credentials(token='benchmark')
+    return build_from_document(document, credentials=credentials), credentials
+
+
+def perMessage(gmail, credentials, pageSize):
+    """How the mail readers fetched snippets before batching: one blocking get per listed message."""
+    messages = []
+    for messageIds in iterMessagePages(gmail, 'from:alerts', pageSize):
+        messages += [gmail.users().messages().get(userId="me", id=messageId).execute(num_retries=3)
+                     for messageId in messageIds]
+    return [message['snippet'] for message in messages]
+
+
+def batched(gmail, credentials, pageSize):
+    utils = GmailServiceUtils()
+    messages = []
+    for messageIds in iterMessagePages(gmail, 'from:alerts', pageSize):
+        messages += utils.fetchMessages(gmail, credentials, messageIds, fields='id,snippet')
+    return [message['snippet'] for message in messages]
+
+
+def run(strategy, messageCount, latency, pageSize, failing=0):
+    """:return: (server, seconds, snippets), the server holds the round trip counters"""
+    server = FakeGmailServer(messageCount, latency, failing)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        gmail, credentials = gmailClient(server)
+        start = time.perf_counter()
+        snippets = strategy(gmail, credentials, pageSize)
+        return server, time.perf_counter() - start, snippets
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument('--messages', type=int, default=1000, help="Messages matching the query")
+    arguments.add_argument('--latency-ms', type=float, default=5, help="Simulated latency of one HTTP round trip")
+    arguments.add_argument('--page-size', type=int, default=100, help="maxResults of every list call")
+    arguments.add_argument('--failing', type=int, default=0, help="Messages a batch cannot serve")
+    options = arguments.parse_args(argv)
+
+    results = {}
+    for name, strategy in (('per message', perMessage), ('batched', batched)):
+        server, seconds, snippets = run(strategy, options.messages, options.latency_ms / 1000, options.page_size,
+                                        options.failing)
+        results[name] = snippets
+        print(f"{name:<12} {options.messages:>7} messages  {server.roundTrips:>6} round trips  "
+              f"{server.batches:>4} batches  {seconds * 1000:>9.1f} ms")
+    if results['batched'] != results['per message']:
+        print("Batched fetch returned different snippets than the per message fetch", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
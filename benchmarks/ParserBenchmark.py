@@ -0,0 +1,79 @@
+"""
+Parse time and regression check of the statement parsers on synthetic statements.
+
+    python -m benchmarks.ParserBenchmark [--layouts HDFC_DEBIT_V1 EPF] [--files 5] [--transactions 200] [--repeat 3]
+                                         [--engine fitz]
+
+Prints the median parse time per file and per page of every layout. Exits with 1 when a parser returns anything but
+the exact transaction list of a statement, so CI can run it offline as a regression gate.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.SyntheticStatements import LAYOUTS, generate, parserFor
+
+
+def parseTimed(statement, engine, spillDir):
+    """:return: (seconds the parse took, transactions)"""
+    parser = parserFor(statement.layout)
+    parser.tableEngine = engine
+    parser.setContent(statement.content, statement.fileName, spillDir)
+    try:
+        start = time.perf_counter()
+        transactions = parser.parseFile()
+        return time.perf_counter() - start, transactions
+    finally:
+        parser.releaseContent()
+
+
+def firstDifference(expected, actual):
+    for index, (wanted, got) in enumerate(zip(expected, actual)):
+        if wanted != got:
+            return f"transaction {index}: expected {wanted}, got {got}"
+    return f"expected {len(expected)} transactions, got {len(actual)}"
+
+
+def benchmarkLayout(layout, files, transactions, repeat, engine):
+    """:return: (report line, list of mismatches)"""
+    fileTimes, pageTimes, mismatches = [], [], []
+    with tempfile.TemporaryDirectory(prefix='benchmark-') as spillDir:
+        for seed in range(files):
+            statement = generate(layout, transactions, seed)
+            runs = [parseTimed(statement, engine, spillDir) for _ in range(repeat)]
+            wrong = next((result for _, result in runs if result != statement.expected), None)
+            if wrong is not None:
+                mismatches.append(f"{statement.fileName}: {firstDifference(statement.expected, wrong)}")
+            seconds = statistics.median(elapsed for elapsed, _ in runs)
+            fileTimes.append(seconds)
+            pageTimes.append(seconds / statement.pageCount)
+    report = (f"{layout:<18} {files:>5} files  {statistics.median(fileTimes) * 1000:>9.1f} ms/file  "
+              f"{statistics.median(pageTimes) * 1000:>8.1f} ms/page  {'ok' if not mismatches else 'MISMATCH'}")
+    return report, mismatches
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument('--layouts', nargs='+', choices=list(LAYOUTS), default=list(LAYOUTS))
+    arguments.add_argument('--files', type=int, default=5, help="Statements generated per layout")
+    arguments.add_argument('--transactions', type=int, default=200, help="Transactions per statement")
+    arguments.add_argument('--repeat', type=int, default=3, help="Parses per statement, the median is reported")
+    arguments.add_argument('--engine', choices=['fitz', 'tabula'], default='fitz',
+                           help="Table engine of the parsers, tabula needs a JVM")
+    options = arguments.parse_args(argv)
+
+    failures = []
+    for layout in options.layouts:
+        report, mismatches = benchmarkLayout(layout, options.files, options.transactions, options.repeat,
+                                             options.engine)
+        print(report)
+        failures += mismatches
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""
+Synthetic bank statements in every layout the parsers read, each with the transaction list its parser must return.
+Pages are drawn with PyMuPDF at the areas and column boundaries the parsers extract from, so benchmarks and
+regression runs need no real statements, no network and no JVM. Every cell is checked to fit inside its column, which
+keeps the text where tabula slices it as well.
+"""
+import datetime
+import random
+from collections import namedtuple
+
+import fitz
+
+from services.parsers.EPF_Statement import EPFStatementParser
+from services.parsers.HDFC_Credit import HDFCMilleniaParse
+from services.parsers.HDFC_Debit import HDFCDebitParser
+from services.parsers.ICICI_Amazon_Credit import ICICICreditCardStatementParser
+from services.parsers.NPS_Statement import NPSParser
+from services.parsers.YES_Credit import YESBankCreditParser
+from services.parsers.YES_Debit import YESBankDebitParser
+from utils.GenericUtils import GenericUtil
+
+SyntheticStatement = namedtuple('SyntheticStatement', ['layout', 'fileName', 'content', 'pageCount', 'expected'])
+
+FONT = 'helv'
+FONT_SIZE = 7
+LINE_HEIGHT = 11
+
+MERCHANTS = ['SWIGGY', 'ZOMATO', 'AMAZON PAY', 'FLIPKART', 'BIGBASKET', 'UBER INDIA', 'IRCTC', 'BESCOM', 'AIRTEL',
+             'DECATHLON', 'BOOKMYSHOW', 'MAKEMYTRIP', 'APOLLO PHARMACY', 'SHELL PETROL', 'BLINKIT']
+CITIES = ['BANGALORE', 'MUMBAI', 'PUNE', 'DELHI', 'CHENNAI', 'HYDERABAD']
+SCHEMES = ['SBI PENSION FUND SCHEME', 'HDFC PENSION FUND SCHEME', 'ICICI PRUDENTIAL PENSION FUND SCHEME',
+           'UTI RETIREMENT SOLUTIONS SCHEME', 'KOTAK PENSION FUND SCHEME', 'ADITYA BIRLA SUN LIFE PENSION SCHEME']
+
+
+class StatementCanvas:
+    """A PDF being drawn, with text placed in the columns of a parser."""
+
+    def __init__(self, width=612, height=842):
+        self.document = fitz.open()
+        self.width = width
+        self.height = height
+        self.page = None
+
+    @property
+    def pageCount(self):
+        return self.document.page_count
+
+    def newPage(self):
+        self.page = self.document.new_page(width=self.width, height=self.height)
+
+    def row(self, y, edges, cells, size=FONT_SIZE):
+        """
+        Writes one line of a table.
+        :param y: Top of the line
+        :param edges: x coordinates of the column boundaries, from the left to the right edge of the table
+        :param cells: Text per column, None leaves the column empty
+        """
+        for column, text in enumerate(cells):
+            if text is None:
+                continue
+            if edges[column] + 2 + fitz.get_text_length(text, fontname=FONT, fontsize=size) >= edges[column + 1]:
+                raise ValueError(f"'{text}' does not fit in column {column}")
+            self.page.insert_text((edges[column] + 2, y + LINE_HEIGHT - 2), text, fontsize=size, fontname=FONT)
+
+    def text(self, x, y, text, size=FONT_SIZE):
+        self.page.insert_text((x, y + LINE_HEIGHT - 2), text, fontsize=size, fontname=FONT)
+
+    def rules(self, edges, top, rows):
+        """Ruled grid of `rows` lines starting at `top`, for parsers reading lattice tables."""
+        bottom = top + rows * LINE_HEIGHT
+        for line in range(rows + 1):
+            self.page.draw_line((edges[0], top + line * LINE_HEIGHT), (edges[-1], top + line * LINE_HEIGHT))
+        for x in edges:
+            self.page.draw_line((x, top), (x, bottom))
+
+    def toBytes(self):
+        content = self.document.tobytes()
+        self.document.close()
+        return content
+
+
+def money(amount):
+    return f"{amount:,.2f}"
+
+
+def randomAmount(rng, low=10, high=50000):
+    return round(rng.uniform(low, high), 2)
+
+
+def randomDates(rng, count, start=datetime.date(2024, 1, 1)):
+    """`count` ascending dates in the month from `start`."""
+    return sorted(start + datetime.timedelta(days=rng.randrange(28)) for _ in range(count))
+
+
+def randomMerchant(rng):
+    return f"{rng.choice(MERCHANTS)} {rng.choice(CITIES)}"
+
+
+def paginate(items, firstPage, otherPages):
+    """Splits `items` into pages holding `firstPage` and then `otherPages` items."""
+    pages = [items[:firstPage]]
+    for start in range(firstPage, len(items), otherPages):
+        pages.append(items[start:start + otherPages])
+    return pages
+
+
+def withReferences(transactions):
+    references = GenericUtil.generate_reference_ids([item['date'] for item in transactions],
+                                                    [item['description'] for item in transactions],
+                                                    [item['amount'] for item in transactions])
+    return [{'reference': reference, **item} for reference, item in zip(references, transactions)]
+
+
+def hdfcDebitV1(rng, count):
+    """Ruled statement with four digit years. Withdrawals come back as the printed figure without separators."""
+    edges = [20, 80, 300, 400, 460, 540, 620, 740]
+    header = ['Date', 'Narration', 'Chq./Ref.No.', 'Value Dt', 'Withdrawal Amt.', 'Deposit Amt.', 'Closing Balance']
+    canvas = StatementCanvas(width=780)
+    expected = []
+    balance = 100000.0
+    rows = list(zip(randomDates(rng, count), (rng.random() < 0.25 for _ in range(count))))
+    for pageRows in paginate(rows, 44, 44):
+        canvas.newPage()
+        canvas.text(20, 100, 'HDFC BANK Ltd. Statement of account')
+        canvas.row(280, edges, header)
+        for line, (date, isDeposit) in enumerate(pageRows, start=1):
+            amount, description = randomAmount(rng), randomMerchant(rng)
+            balance += amount if isDeposit else -amount
+            withdrawal, deposit = ('0.00', money(amount)) if isDeposit else (money(amount), '0.00')
+            canvas.row(280 + line * LINE_HEIGHT, edges,
+                       [date.strftime('%d/%m/%Y'), description, f"{rng.randrange(10 ** 12):012d}",
+                        date.strftime('%d/%m/%y'), withdrawal, deposit, money(balance)])
+            expected.append({'date': date.strftime('%d/%m/%Y'), 'description': description,
+                             'amount': -amount if isDeposit else withdrawal.replace(',', '')})
+        canvas.rules(edges, 280, len(pageRows) + 1)
+    return canvas, withReferences(expected)
+
+
+def hdfcDebitV2(rng, count):
+    """Unruled statement with two digit years, some narrations wrap onto the next lines."""
+    edges = [27, 67, 272, 357, 397, 475, 551, 612]
+    header = ['Date', 'Narration', 'Chq./Ref.No.', 'Value Dt', 'Withdrawal Amt.', 'Deposit Amt.', 'Closing Balance']
+    canvas = StatementCanvas()
+    expected = []
+    balance = 100000.0
+    # Lines of a transaction stay on one page, its wrapped narration belongs to it
+    transactions = [(date, rng.random() < 0.25, rng.choice([0, 0, 0, 1, 2])) for date in randomDates(rng, count)]
+    pages, lines = [[]], 0
+    for transaction in transactions:
+        if lines + 1 + transaction[2] > 48:
+            pages.append([])
+            lines = 0
+        pages[-1].append(transaction)
+        lines += 1 + transaction[2]
+    for pageTransactions in pages:
+        canvas.newPage()
+        canvas.text(27, 100, 'HDFC BANK Ltd. Statement of account')
+        canvas.row(232, edges, header)
+        y = 232 + LINE_HEIGHT
+        for date, isDeposit, wrapped in pageTransactions:
+            amount, description = randomAmount(rng), f"UPI-{randomMerchant(rng)}"
+            balance += amount if isDeposit else -amount
+            canvas.row(y, edges, [date.strftime('%d/%m/%y'), description, f"{rng.randrange(10 ** 12):012d}",
+                                  date.strftime('%d/%m/%y'), None if isDeposit else money(amount),
+                                  money(amount) if isDeposit else None, money(balance)])
+            y += LINE_HEIGHT
+            for _ in range(wrapped):
+                overflow = f"REF{rng.randrange(10 ** 9)} {rng.choice(CITIES)}"
+                canvas.row(y, edges, [None, overflow])
+                description += f" {overflow}"
+                y += LINE_HEIGHT
+            expected.append({'date': date.strftime('%d/%m/%Y'), 'description': description,
+                             'amount': -amount if isDeposit else amount})
+    return canvas, withReferences(expected)
+
+
+def yesDebit(rng, count):
+    """Descriptions that wrap leave the transaction line empty and sit on the lines above and below it."""
+    edges = [44, 92, 144, 282, 354, 420, 482, 612]
+    canvas = StatementCanvas()
+    expected = []
+    balance = 100000.0
+    for pageDates in paginate(randomDates(rng, count), 15, 15):
+        canvas.newPage()
+        canvas.text(44, 120, 'YES BANK Statement of Account')
+        canvas.row(254, edges, ['Transaction', 'Value', 'Description', 'Cheque No', 'Withdrawals', 'Deposits',
+                                'Balance'])
+        canvas.row(254 + LINE_HEIGHT, edges, ['Date', 'Date'])
+        y = 254 + 2 * LINE_HEIGHT
+        for date in pageDates:
+            amount, isDeposit = randomAmount(rng), rng.random() < 0.25
+            balance += amount if isDeposit else -amount
+            withdrawal, deposit = ('0.00', money(amount)) if isDeposit else (money(amount), '0.00')
+            cells = [date.strftime('%d/%m/%Y'), date.strftime('%d/%m/%Y'), None, f"{rng.randrange(10 ** 8)}",
+                     withdrawal, deposit, money(balance)]
+            if rng.random() < 0.3:
+                head, tail = f"UPI/{rng.choice(MERCHANTS).replace(' ', '')}/", f"{rng.randrange(10 ** 10)}"
+                canvas.row(y, edges, [None, None, head])
+                canvas.row(y + LINE_HEIGHT, edges, cells)
+                canvas.row(y + 2 * LINE_HEIGHT, edges, [None, None, tail])
+                description = head + tail
+                y += 3 * LINE_HEIGHT
+            else:
+                description = randomMerchant(rng)
+                cells[2] = description
+                canvas.row(y, edges, cells)
+                y += LINE_HEIGHT
+            expected.append({'date': date.strftime('%d/%m/%Y'), 'description': description,
+                             'amount': -amount if isDeposit else amount})
+    # The parser stops at the opening balance, which tabula cuts at the first column boundary
+    canvas.row(y + LINE_HEIGHT, edges, ['Opening Ba', 'lance', None, None, None, None, money(100000)])
+    return canvas, withReferences(expected)
+
+
+def yesCredit(rng, count):
+    edges = [20, 96, 485, 612]
+    canvas = StatementCanvas()
+    expected = []
+    for page, pageDates in enumerate(paginate(randomDates(rng, count), 50, 65)):
+        canvas.newPage()
+        y = 40
+        if page == 0:
+            canvas.text(20, y, 'YES BANK ACE Credit Card Statement')
+            canvas.row(y + 2 * LINE_HEIGHT, edges, ['Date', 'Transaction Details', 'Amount (Rs.)'])
+            y += 3 * LINE_HEIGHT
+        for date in pageDates:
+            amount, isCredit = randomAmount(rng, high=20000), rng.random() < 0.15
+            description = randomMerchant(rng)
+            details = f"{description}, Ref No: {rng.randrange(10 ** 12)}" if rng.random() < 0.5 else description
+            canvas.row(y, edges, [date.strftime('%d/%m/%Y'), details, f"{money(amount)} {'Cr' if isCredit else 'Dr'}"])
+            expected.append({'date': date.strftime('%d/%m/%Y'), 'description': description,
+                             'amount': -amount if isCredit else amount})
+            y += LINE_HEIGHT
+    canvas.row(y + LINE_HEIGHT, edges, [None, 'End of the statement'])
+    return canvas, withReferences(expected)
+
+
+def iciciAmazon(rng, count):
+    """Transactions fill page 1 and then page 2, which is the last one the parser reads."""
+    firstEdges, secondEdges = [199, 243, 299, 435, 473, 515, 568], [30, 86, 169, 366, 437, 507, 562]
+    header = ['Date', 'SerNo.', 'Transaction Details', 'Reward', 'Intl.#', 'Amount (in`)']
+    canvas = StatementCanvas()
+    expected = []
+    pages = paginate(randomDates(rng, min(count, 20 + 68)), 20, 68)
+    for page, (edges, top) in enumerate([(firstEdges, 368), (secondEdges, 60)]):
+        canvas.newPage()
+        canvas.text(30, 40, 'Amazon Pay ICICI Bank Credit Card Statement')
+        canvas.row(top, edges, header)
+        for line, date in enumerate(pages[page] if page < len(pages) else [], start=1):
+            amount, isCredit = randomAmount(rng, high=20000), rng.random() < 0.15
+            description = rng.choice(MERCHANTS)
+            canvas.row(top + line * LINE_HEIGHT, edges,
+                       [date.strftime('%d/%m/%Y'), f"{rng.randrange(10 ** 10, 10 ** 11)}", description,
+                        f"{int(amount) // 100}", None, f"{money(amount)} CR" if isCredit else money(amount)])
+            expected.append({'date': date.strftime('%d/%m/%Y'), 'description': description,
+                             'amount': -amount if isCredit else amount})
+    return canvas, withReferences(expected)
+
+
+def hdfcMillenia(rng, count):
+    """The last page only holds the summary, the parser does not read it."""
+    edges = [23, 104, 476, 588]
+    header = ['Date', 'Transaction Description', 'Amount (in Rs.)']
+    canvas = StatementCanvas()
+    expected = []
+    for page, pageDates in enumerate(paginate(randomDates(rng, count), 20, 57)):
+        canvas.newPage()
+        top = 432 if page == 0 else 67
+        canvas.text(23, 40, 'HDFC Bank Millennia Credit Card Statement')
+        canvas.row(top, edges, header)
+        for line, date in enumerate(pageDates, start=1):
+            amount, isCredit = randomAmount(rng, high=20000), rng.random() < 0.15
+            description = randomMerchant(rng)
+            canvas.row(top + line * LINE_HEIGHT, edges,
+                       [date.strftime('%d/%m/%Y'), description, f"{money(amount)} Cr" if isCredit else money(amount)])
+            expected.append({'date': date.strftime('%d/%m/%Y'), 'description': description,
+                             'amount': -amount if isCredit else amount})
+    canvas.newPage()
+    canvas.text(23, 67, 'Reward Points Summary')
+    return canvas, withReferences(expected)
+
+
+def npsHoldings(rng, count):
+    """
+    Scheme allocation, then the holdings they name on page 1. Page 2 holds one closing line, the holdings pass reads
+    one line past the last holding to emit it.
+    """
+    allocationEdges, holdingEdges = [8, 129, 493, 581], [8, 237, 281, 320, 362, 402, 447, 493, 581]
+    canvas = StatementCanvas()
+    canvas.newPage()
+    count = min(count, len(SCHEMES) * 2)
+    names = rng.sample([f"{scheme} {tier} - TIER I" for scheme in SCHEMES for tier in ('E', 'C')], count)
+    canvas.text(8, 60, 'NPS Transaction Statement for Tier I Account')
+    canvas.row(104, allocationEdges, [None, 'Scheme', 'Percentage'])
+    for line, name in enumerate(names, start=1):
+        canvas.row(104 + line * LINE_HEIGHT, allocationEdges, [None, name, f"{100 // count}.00%"])
+
+    expected = []
+    size = 6
+    canvas.row(520, holdingEdges, ['Scheme Name', 'TotalUnits', 'BlockedUnits', 'FreeUnits', 'NAV', 'Value',
+                                   'Invested', 'Gain'], size=size)
+    y = 520 + LINE_HEIGHT
+    for name in names:
+        units, nav = f"{rng.uniform(10, 9999):.4f}", f"{rng.uniform(10, 80):.4f}"
+        # Long names wrap onto a line of their own
+        head, _, tail = name.rpartition(' - ') if len(name) > 36 else (name, '', '')
+        canvas.row(y, holdingEdges, [head, units, '0.0000', units, nav, f"{rng.uniform(1000, 99999):.2f}",
+                                     f"{rng.uniform(1000, 99999):.2f}", f"{rng.uniform(-999, 9999):.2f}"], size=size)
+        if tail:
+            y += LINE_HEIGHT
+            canvas.row(y, holdingEdges, [f"- {tail}"], size=size)
+        y += LINE_HEIGHT
+        expected.append({'name': name, 'nav': nav, 'quantity': units})
+    canvas.newPage()
+    canvas.text(8, 60, 'Note: This is a computer generated statement', size=size)
+    return canvas, expected
+
+
+def epfPassbook(rng, count):
+    """One contribution a month, the amount is the employee and employer share together."""
+    edges = [25, 82, 138, 168, 283, 339, 397, 453, 515, 560]
+    canvas = StatementCanvas()
+    canvas.newPage()
+    canvas.text(25, 120, 'EPFO Member Passbook')
+    canvas.row(226, edges, ['Wage Month', 'Date', 'Type', 'Particulars', 'EPF Wages', 'EPS Wages', 'Employee',
+                            'Employer', 'Pension'])
+    expected = []
+    month = datetime.date(2022, 1, 1)
+    for line in range(1, min(count, 25) + 1):
+        wages = rng.randrange(15000, 60000)
+        employee, employer = round(wages * 0.12), round(wages * 0.12) - 1250
+        credited = (month + datetime.timedelta(days=45)).replace(day=15)
+        description = f"Cont. For Due-Month {credited.strftime('%m%Y')}"
+        canvas.row(226 + line * LINE_HEIGHT, edges,
+                   [month.strftime('%b-%Y'), credited.strftime('%d-%m-%Y'), 'CR', description, f"{wages:,}",
+                    '15,000', f"{employee:,}", f"{employer:,}", '1,250'])
+        expected.append({'date': credited.strftime('%d-%m-%Y'), 'description': description,
+                         'amount': float(employee + employer)})
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+    return canvas, expected
+
+
+# Layout name -> (generator, parser class)
+LAYOUTS = {
+    'HDFC_DEBIT_V1': (hdfcDebitV1, HDFCDebitParser),
+    'HDFC_DEBIT_V2': (hdfcDebitV2, HDFCDebitParser),
+    'YES_BANK_DEBIT': (yesDebit, YESBankDebitParser),
+    'YES_BANK_ACE': (yesCredit, YESBankCreditParser),
+    'ICICI_AMAZON_PAY': (iciciAmazon, ICICICreditCardStatementParser),
+    'Millenia_Credit': (hdfcMillenia, HDFCMilleniaParse),
+    'NPS': (npsHoldings, NPSParser),
+    'EPF': (epfPassbook, EPFStatementParser),
+}
+
+
+def generate(layout, count, seed=0):
+    """
+    :param count: Transactions to draw. Layouts with a fixed number of pages (ICICI, NPS, EPF) draw at most what fits
+    :return: SyntheticStatement with the PDF's bytes and the transactions its parser must return
+    """
+    generator, _ = LAYOUTS[layout]
+    canvas, expected = generator(random.Random(f"{layout}-{seed}"), count)
+    pageCount = canvas.pageCount
+    return SyntheticStatement(layout, f"{layout}_{seed}.pdf", canvas.toBytes(), pageCount, expected)
+
+
+def parserFor(layout):
+    return LAYOUTS[layout][1]()
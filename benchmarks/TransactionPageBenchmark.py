@@ -0,0 +1,160 @@
+"""
+Latency of the paginated transactions listing against a seeded SQLite database.
+
+    python -m benchmarks.TransactionPageBenchmark [--transactions 100000] [--users 5] [--requests 200]
+
+Every request is answered twice: the way the endpoint used to, with a page query, a count query and a sums query,
+and through `TransactionService._fetchTransactions`, which uses the windowed query of `FilterSpec.fetchPage` for
+filtered pages and the daily rollup totals for unfiltered ones. Prints p50/p95 per filter and exits with 1 when the
+two disagree on the page or on the totals.
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from flask import Flask, g
+from sqlalchemy import case, create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+import models.investmentHistory  # noqa: F401, mapped here only, the User relationships need it
+from models import Base, Transactions, User
+from services.AggregateService import AggregateService
+from services.transactionsService import TransactionService
+from utils.DotDict import DotDict
+from utils.FilterSpec import FilterSpec
+
+BANKS = ['HDFC', 'YES_BANK', 'ICICI', 'SBI', 'AXIS']
+TAGS = ['Food', 'Travel', 'Bills', 'Shopping', None]
+PAGE_SIZE = 100
+LISTING_COLUMNS = ['referenceID', 'date', 'details', 'amount', 'tag', 'fileID', 'source', 'bank', 'user']
+TOTALS = {
+    "count": func.count(),
+    "credit_sum": func.sum(case((Transactions.amount < 0, Transactions.amount), else_=0)),
+    "debit_sum": func.sum(case((Transactions.amount > 0, Transactions.amount), else_=0)),
+}
+FIRST_DAY = datetime.date(2022, 1, 1)
+
+
+def seed(session, transactions, users, seed=0):
+    """Inserts `transactions` rows spread over `users` users and three years."""
+    generator = random.Random(seed)
+    userIDs = [f"user-{index}" for index in range(users)]
+    session.execute(insert(User), [{'userID': userID, 'email': f"{userID}@example.com"} for userID in userIDs])
+    rows = [{
+        'referenceID': f"{index:012d}",
+        'date': FIRST_DAY + datetime.timedelta(days=generator.randrange(3 * 365)),
+        'details': f"UPI/{generator.randrange(10 ** 9)}/MERCHANT {generator.randrange(500)}",
+        'amount': round(generator.uniform(-50000, 50000), 2),
+        'tag': generator.choice(TAGS),
+        'fileID': None,
+        'source': 'Email',
+        'bank': generator.choice(BANKS),
+        'user': generator.choice(userIDs),
+    } for index in range(transactions)]
+    for start in range(0, len(rows), 10000):
+        session.execute(insert(Transactions), rows[start:start + 10000])
+    AggregateService().rebuildDailyRollup(session)
+    session.commit()
+    return userIDs
+
+
+def requests(userIDs, count, seed=0):
+    """:return: [(filter name, userID, page, filters)] shaped like what the frontend sends"""
+    generator = random.Random(seed)
+    generated = []
+    for _ in range(count):
+        dateFrom = FIRST_DAY + datetime.timedelta(days=generator.randrange(2 * 365))
+        dateRange = {'dateFrom': dateFrom, 'dateTo': dateFrom + datetime.timedelta(days=180)}
+        sortedBy = {'column': 'referenceID', 'order': 'desc'}
+        shapes = {
+            'none': {'sorted': sortedBy},
+            'dateRange': {'dateRange': dateRange, 'sorted': sortedBy},
+            'bank+dateRange': {'dateRange': dateRange, 'bank': generator.choice(BANKS), 'sorted': sortedBy},
+        }
+        for name, filters in shapes.items():
+            generated.append((name, generator.choice(userIDs), generator.randrange(1, 6), filters))
+    return generated
+
+
+def threeQueryPage(session, filterSpec, page):
+    """The listing as it was answered before the window aggregates: page, count and sums as separate queries."""
+    query = filterSpec.apply(session.query(*filterSpec._selection()))
+    if filterSpec.orderBy:
+        query = query.order_by(*filterSpec.orderBy)
+    rows = query.offset((page - 1) * PAGE_SIZE).limit(PAGE_SIZE).all()
+    count = filterSpec.apply(session.query(func.count(Transactions.referenceID))).scalar()
+    sums = filterSpec.apply(session.query(TOTALS['credit_sum'], TOTALS['debit_sum'])).first()
+    return filterSpec._results(rows, False), {'count': count, 'credit_sum': sums[0], 'debit_sum': sums[1]}
+
+
+def listingPage(service, userID, page, filters):
+    """The listing as the endpoint answers it now, without the result cache."""
+    result = service._fetchTransactions(page, filters, PAGE_SIZE, None, userID)
+    return result['results'], {'count': result['count'], 'credit_sum': result['credit_sum'],
+                               'debit_sum': result['debit_sum']}
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def benchmark(session, userIDs, requestCount):
+    """:return: ({filter name: {strategy: [seconds]}}, list of mismatches)"""
+    timings, mismatches = {}, []
+    service = TransactionService()
+    with Flask(__name__).app_context():
+        # The services read their session from the request globals
+        g.db = DotDict({'session': session})
+        for name, userID, page, filters in requests(userIDs, requestCount):
+            filterSpec = FilterSpec.forTransactions(filters, 'sqlite', userID, columns=LISTING_COLUMNS)
+            before, expected = timed(threeQueryPage, session, filterSpec, page)
+            after, actual = timed(listingPage, service, userID, page, filters)
+            timings.setdefault(name, {'three queries': [], 'listing': []})
+            timings[name]['three queries'].append(before)
+            timings[name]['listing'].append(after)
+            if expected != actual:
+                mismatches.append(f"{name} {userID} page {page}: listing result differs from the three queries")
+    return timings, mismatches
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arguments.add_argument('--transactions', type=int, default=100000, help="Rows seeded into the database")
+    arguments.add_argument('--users', type=int, default=5, help="Users the rows are spread over")
+    arguments.add_argument('--requests', type=int, default=200, help="Requests per filter")
+    options = arguments.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='benchmark-') as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'transactions.db')}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        try:
+            userIDs = seed(session, options.transactions, options.users)
+            timings, mismatches = benchmark(session, userIDs, options.requests)
+        finally:
+            session.close()
+            engine.dispose()
+
+    for name, strategies in timings.items():
+        for strategy, seconds in strategies.items():
+            print(f"{name:<16} {strategy:<14} p50 {statistics.median(seconds) * 1000:>8.2f} ms  "
+                  f"p95 {percentile(seconds, 0.95) * 1000:>8.2f} ms")
+    for mismatch in mismatches:
+        print(mismatch, file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
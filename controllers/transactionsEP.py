@@ -2,13 +2,14 @@ from enums.BanksEnum import BankEnums
 from enums.ServiceTypeEnum import ServiceTypeEnum
 from services.transactionsService import TransactionService
 from utils.logger import Logger
-from flask import request, jsonify
+from flask import request, jsonify, Response, stream_with_context
 
 from flask import g
 
 
 class TransactionController:
     TransactionService: TransactionService
+    exportMimeTypes = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
 
     def __init__(self, transactionService):
         self.TransactionService = transactionService
@@ -19,25 +20,47 @@ class TransactionController:
         data = request.get_json(force=True)
         page = data.get("Page", 1)
         filters = data.get("Filter", None)
+        cursor = data.get("Cursor", None)
+        userId = g.get('firebase_id')
         self.logger.info(f"Fetch {page} with filter {filters}")
-        transactions = self.TransactionService.fetchTransactions(page=page, filters=filters)
-        # Format the transactions for JSON response
-        results = [
-            {key: value for key, value in t.__dict__.items() if key != '_sa_instance_state'}
-            for t in transactions["results"]
-        ]
+        try:
+            transactions = self.TransactionService.fetchTransactions(page=page, filters=filters, cursor=cursor,
+                                                                     userID=userId)
+        except ValueError as ex:
+            return jsonify({"error": str(ex)}), 400
+        # Rows already come back as plain dicts of the listing columns
+        results = transactions["results"]
         response = {
             "total_count": transactions["count"],
             "page": page,
             "credit_sum": transactions["credit_sum"],
             "debit_sum": transactions["debit_sum"],
             "page_size": len(results),
+            "next_cursor": transactions["next_cursor"],
             "results": results,
         }
 
         # Return the response
         return jsonify(response), 200
 
+    @Logger.standardLogger
+    def exportTransactions(self):
+        data = request.get_json(force=True)
+        filters = data.get("Filter", None)
+        fileFormat = data.get("Format", "csv")
+        if fileFormat not in self.exportMimeTypes:
+            return jsonify({"error": f"Unsupported format {fileFormat}"}), 400
+        self.logger.info(f"Export transactions as {fileFormat} with filter {filters}")
+        rows = self.TransactionService.exportTransactions(filters=filters, fileFormat=fileFormat,
+                                                          userID=g.get('firebase_id'))
+        return Response(stream_with_context(rows), mimetype=self.exportMimeTypes[fileFormat], headers={
+            "Content-Disposition": f"attachment; filename=transactions.{fileFormat}"
+        })
+
+    @Logger.standardLogger
+    def fetchCacheStats(self):
+        return jsonify(self.TransactionService.fetchCacheStats()), 200
+
     def fetchOptedBanks(self):
         """
                 Endpoint to fetch transaction and statement dates for the calendar view.
@@ -60,6 +83,7 @@ class TransactionController:
         Endpoint to fetch transaction and statement dates for the calendar view.
         """
         data = request.get_json(force=True)
+        userId = g.get('firebase_id')
         month_start = data.get("monthStart")  # Expected in "yyyy-mm-dd" format
         month_end = data.get("monthEnd")  # Expected in "yyyy-mm-dd" format
 
@@ -70,29 +94,39 @@ class TransactionController:
 
         # Fetch transactions and statements from the service
         transactions = self.TransactionService.fetchTransactionDates(
-            date_from=month_start, date_to=month_end
+            userID=userId, date_from=month_start, date_to=month_end
         )
 
         # Format the response
         response = {
             "transaction_dates": transactions.get("transaction_dates", []),
             "statement_dates": transactions.get("statement_dates", []),
+            "daily_totals": transactions.get("daily_totals", []),
         }
 
         return jsonify(response), 200
 
+    @Logger.standardLogger
+    def fetchSpendSummary(self):
+        """
+        Endpoint to fetch monthly debit/credit totals broken down by tag and bank.
+        """
+        userId = g.get('firebase_id')
+        monthFrom = request.args.get('monthFrom')  # Expected in "yyyy-mm" format
+        monthTo = request.args.get('monthTo', monthFrom)  # Expected in "yyyy-mm" format
+        if not monthFrom:
+            return jsonify({"error": "Invalid or missing month range"}), 400
+        self.logger.info(f"Fetching spend summary for range: {monthFrom} - {monthTo}")
+        return jsonify(self.TransactionService.fetchSpendSummary(userId, monthFrom, monthTo)), 200
+
     @Logger.standardLogger
     def triggerEmailCheck(self):
         userId = request.headers.get("X-Firebase-ID")
         dateTo = request.args.get('dateTo')
         dateFrom = request.args.get('dateFrom')
         self.logger.info(f"Reading email for user {userId}")
-        successCount, errorCount = \
-            self.TransactionService.readTransactionFromMail(dateTo=dateTo, dateFrom=dateFrom, userID=userId)
-        return jsonify({"Message": {
-            "read": successCount,
-            "conflicts": errorCount
-        }}), 200
+        jobID = self.TransactionService.enqueueMailRead(dateTo=dateTo, dateFrom=dateFrom, userID=userId)
+        return jsonify({"Message": {"jobID": jobID}}), 202
 
     @Logger.standardLogger
     def triggerStatementCheck(self):
@@ -101,12 +135,19 @@ class TransactionController:
         dateFrom = request.args.get('dateFrom')
         bank = request.args.get('bank')
         self.logger.info(f"Reading statements for user {userId}")
-        successCount, errorCount = \
-            self.TransactionService.readStatementsFromMail(dateTo=dateTo, dateFrom=dateFrom, userID=userId, bank=bank)
-        return jsonify({"Message": {
-            "read": successCount,
-            "conflicts": errorCount
-        }}), 200
+        jobID = self.TransactionService.enqueueStatementRead(dateTo=dateTo, dateFrom=dateFrom, userID=userId,
+                                                             bank=bank)
+        return jsonify({"Message": {"jobID": jobID}}), 202
+
+    @Logger.standardLogger
+    def fetchJobStatus(self):
+        jobID = request.args.get('jobID')
+        if not jobID:
+            return jsonify({"error": "jobID is required"}), 400
+        job = self.TransactionService.fetchIngestionJob(jobID, g.get('firebase_id'))
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job), 200
 
     @Logger.standardLogger
     def updateTransaction(self):
@@ -203,8 +244,13 @@ class TransactionController:
         data = request.get_json(force=True)
         page = data.get("Page", 1)
         filters = data.get("Filter", None)
+        cursor = data.get("Cursor", None)
         self.logger.info(f"Fetch FileDetails Page {page} with filter {filters}")
-        file_details = self.TransactionService.fetchFileDetails(page=page, filters=filters)
+        try:
+            file_details = self.TransactionService.fetchFileDetails(page=page, filters=filters, cursor=cursor,
+                                                                    userID=g.get('firebase_id'))
+        except ValueError as ex:
+            return jsonify({"error": str(ex)}), 400
 
         # Format the file details for JSON response
         results = [
@@ -215,6 +261,7 @@ class TransactionController:
             "total_count": file_details["count"],
             "page": page,
             "page_size": len(results),
+            "next_cursor": file_details["next_cursor"],
             "results": results,
         }
         return jsonify(response)
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class IngestionJobEnum(Enum):
+    Email = 'email'  # /readEmails
+    Statement = 'statement'  # /readStatements
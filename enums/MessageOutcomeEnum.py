@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class MessageOutcomeEnum(Enum):
+    Read = 'read'  # Alert read into transactions/conflicts
+    Inserted = 'inserted'  # Statement parsed and at least one transaction inserted
+    Duplicate = 'duplicate'  # Statement parsed, every transaction already existed
+    Empty = 'empty'  # Nothing to read in the message or attachment
+    Complete = 'complete'  # Every attachment of the message was handed over, each one has its own outcome
+    Failed = 'failed'  # Processing raised, retried on the next run
@@ -3,6 +3,7 @@ from enum import Enum
 
 class JobStatus(Enum):
     PENDING = "Pending"
+    RUNNING = "Running"
     COMPLETED = "Completed"
     OVERDUE = "Overdue"
     FAILED = "Failed"
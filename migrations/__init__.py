@@ -0,0 +1,32 @@
+"""
+Schema changes that `create_all` cannot apply to an existing database (new indexes and columns on existing tables).
+Each migration is a module exposing `upgrade(engine)`, listed in order in `MIGRATIONS`. Applied versions are recorded
+in the `schemaMigrations` table so every migration runs once per database.
+"""
+import datetime
+import importlib
+
+from sqlalchemy.orm import Session
+
+from models import SchemaMigration
+from utils.logger import Logger
+
+MIGRATIONS = [
+    "m0001_transactions_user_indexes",
+    "m0002_file_details_content_hash",
+    "m0003_search_tokens_user_index",
+]
+
+logger = Logger(__name__).get_logger()
+
+
+def runMigrations(engine):
+    with Session(engine) as session:
+        applied = {version for version, in session.query(SchemaMigration.version)}
+        for version in MIGRATIONS:
+            if version in applied:
+                continue
+            logger.info(f"Applying migration {version}")
+            importlib.import_module(f"migrations.{version}").upgrade(engine)
+            session.add(SchemaMigration(version=version, appliedAt=datetime.datetime.now()))
+            session.commit()
@@ -0,0 +1,7 @@
+"""User scoped composite indexes on transactions: (user, date), (user, bank, date) and (user, fileID)."""
+from models import Transactions
+
+
+def upgrade(engine):
+    for index in Transactions.__table__.indexes:
+        index.create(engine, checkfirst=True)
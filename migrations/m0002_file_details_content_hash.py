@@ -0,0 +1,13 @@
+"""contentHash column on fileDetails and its (user, contentHash) index."""
+from sqlalchemy import inspect, text
+
+from models import FileDetails
+
+
+def upgrade(engine):
+    columns = {column['name'] for column in inspect(engine).get_columns(FileDetails.__tablename__)}
+    if 'contentHash' not in columns:
+        with engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {FileDetails.__tablename__} ADD COLUMN contentHash VARCHAR(64)"))
+    for index in FileDetails.__table__.indexes:
+        index.create(engine, checkfirst=True)
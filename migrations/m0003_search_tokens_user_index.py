@@ -0,0 +1,16 @@
+"""Replaces the (field, token) index of transactionSearchTokens with a user scoped (user, field, token) index."""
+from sqlalchemy import inspect, text
+
+from models import TransactionSearchToken
+
+REPLACED_INDEX = 'ix_search_tokens_field_token'
+
+
+def upgrade(engine):
+    for index in TransactionSearchToken.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    existing = {index['name'] for index in inspect(engine).get_indexes(TransactionSearchToken.__tablename__)}
+    if REPLACED_INDEX in existing:
+        onTable = f" ON {TransactionSearchToken.__tablename__}" if engine.dialect.name == 'mysql' else ""
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP INDEX {REPLACED_INDEX}{onTable}"))
@@ -2,6 +2,12 @@ from models.fileDetails import FileDetails
 from models.users import User
 from models.transactions import Transactions
 from models.transactionsForReview import TransactionForReview
+from models.transactionSearchTokens import TransactionSearchToken
+from models.dailyRollup import DailyRollup
+from models.monthlySpend import MonthlySpend
+from models.gmailSyncState import GmailSyncState
+from models.driveFolderCache import DriveFolderCache
+from models.processedMessages import ProcessedMessage
 from models.savedTags import SavedTags
 from models.statementPasswords import StatementPasswords
 from models.googleTokens import UserToken
@@ -11,4 +17,6 @@ from models.purchasedSecurities import PurchasedSecurities
 from models.GoldDetails import GoldDetails
 from models.securityTransactions import SecurityTransactions
 from models.Jobs import Job
+from models.ingestionJobs import IngestionJob
+from models.schemaMigrations import SchemaMigration
 from models.Base import Base
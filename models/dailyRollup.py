@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Date, ForeignKey, PrimaryKeyConstraint, Integer
+from sqlalchemy.types import DECIMAL as Decimal
+from models.Base import Base
+
+
+class DailyRollup(Base):
+    """Per user, per day totals backing the calendar. Maintained incrementally by the transaction service."""
+    __tablename__ = 'dailyRollup'
+
+    user = Column(String(100), ForeignKey('users.userID', ondelete='CASCADE'), nullable=False)
+    day = Column(Date, nullable=False)
+    transactionCount = Column(Integer, nullable=False, default=0)
+    debitSum = Column(Decimal(12, 2), nullable=False, default=0)  # Sum of positive amounts
+    creditSum = Column(Decimal(12, 2), nullable=False, default=0)  # Sum of negative amounts
+    statementCount = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('user', 'day'),
+    )
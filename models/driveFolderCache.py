@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, ForeignKey, PrimaryKeyConstraint, DateTime
+from models.Base import Base
+
+
+class DriveFolderCache(Base):
+    """Drive folder id of a user's folder path, so uploads do not resolve the path one segment at a time."""
+    __tablename__ = 'driveFolderCache'
+
+    user = Column(String(100), ForeignKey('users.userID', ondelete='CASCADE'), nullable=False)
+    path = Column(String(255), nullable=False)  # Without leading and trailing slashes, e.g. Akkountant/HDFC_DEBIT
+    folderId = Column(String(100), nullable=False)
+    cachedAt = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('user', 'path'),
+    )
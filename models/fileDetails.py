@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Date, ForeignKey
+from sqlalchemy import Column, String, Date, ForeignKey, Index
 from models.Base import Base
 from sqlalchemy.orm import relationship
 from sqlalchemy import Integer
@@ -14,6 +14,12 @@ class FileDetails(Base):
     statementCount = Column(Integer, nullable=False)
     bank = Column(String(100), nullable=False)
     user = Column(String(100), ForeignKey('users.userID', ondelete='CASCADE'), nullable=False)
+    # SHA-256 of the statement's bytes, a statement downloaded again is recognised before it is parsed or uploaded
+    contentHash = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        Index('ix_fileDetails_user_contentHash', 'user', 'contentHash'),
+    )
 
     transactions = relationship('Transactions', back_populates='file_details')
     user_relationship = relationship('User', back_populates='file_details')
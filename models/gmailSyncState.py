@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, ForeignKey, PrimaryKeyConstraint, BigInteger, DateTime
+from models.Base import Base
+
+
+class GmailSyncState(Base):
+    """Where the last Gmail sync of a user's bank alerts stopped, so the next sync only reads newer mail."""
+    __tablename__ = 'gmailSyncState'
+
+    user = Column(String(100), ForeignKey('users.userID', ondelete='CASCADE'), nullable=False)
+    bank = Column(String(100), nullable=False)
+    historyId = Column(String(32), nullable=True)  # Mailbox historyId at the end of the last sync
+    lastMessageAt = Column(BigInteger, nullable=True)  # internalDate (epoch ms) of the newest alert read
+    updatedAt = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('user', 'bank'),
+    )
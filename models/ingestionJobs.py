@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, ForeignKey, Integer, DateTime
+from models.Base import Base
+
+
+class IngestionJob(Base):
+    """A mail or statement read running in the background, polled through /jobStatus."""
+    __tablename__ = 'ingestionJobs'
+
+    id = Column(String(36), primary_key=True)
+    user = Column(String(100), ForeignKey('users.userID', ondelete='CASCADE'), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)  # IngestionJobEnum
+    status = Column(String(20), nullable=False)  # Pending, Running, Completed, Failed
+    messagesListed = Column(Integer, nullable=False, default=0)
+    filesParsed = Column(Integer, nullable=False, default=0)
+    rowsInserted = Column(Integer, nullable=False, default=0)
+    conflicts = Column(Integer, nullable=False, default=0)
+    result = Column(String(900), nullable=True)
+    createdAt = Column(DateTime, nullable=False)
+    startedAt = Column(DateTime, nullable=True)
+    finishedAt = Column(DateTime, nullable=True)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, ForeignKey, PrimaryKeyConstraint, Integer
+from sqlalchemy.types import DECIMAL as Decimal
+from models.Base import Base
+
+
+class MonthlySpend(Base):
+    """Per user monthly totals by bank and tag. Maintained incrementally by the transaction service."""
+    __tablename__ = 'monthlySpend'
+
+    user = Column(String(100), ForeignKey('users.userID', ondelete='CASCADE'), nullable=False)
+    month = Column(String(7), nullable=False)  # YYYY-MM
+    bank = Column(String(25), nullable=False)
+    tag = Column(String(100), nullable=False, default="")  # Untagged transactions are stored under ""
+    debitSum = Column(Decimal(12, 2), nullable=False, default=0)  # Sum of positive amounts
+    creditSum = Column(Decimal(12, 2), nullable=False, default=0)  # Sum of negative amounts
+    debitCount = Column(Integer, nullable=False, default=0)
+    creditCount = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('user', 'month', 'bank', 'tag'),
+    )
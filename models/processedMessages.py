@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, ForeignKey, PrimaryKeyConstraint, DateTime
+from models.Base import Base
+
+
+class ProcessedMessage(Base):
+    """Gmail messages (and their attachments) already ingested for a user, so later scans can skip them."""
+    __tablename__ = 'processedMessages'
+
+    user = Column(String(100), ForeignKey('users.userID', ondelete='CASCADE'), nullable=False)
+    messageId = Column(String(64), nullable=False)
+    attachmentId = Column(String(100), nullable=False, default='')  # Part id of the attachment, '' for the message
+    outcome = Column(String(20), nullable=False)
+    processedAt = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('user', 'messageId', 'attachmentId'),
+    )
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from models.Base import Base
+
+
+class SchemaMigration(Base):
+    """Migrations from the `migrations` package that have been applied to this database."""
+    __tablename__ = 'schemaMigrations'
+
+    version = Column(String(100), primary_key=True)
+    appliedAt = Column(DateTime, nullable=False)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, ForeignKey, PrimaryKeyConstraint, Index
+from models.Base import Base
+
+
+class TransactionSearchToken(Base):
+    """Trigram inverted index over transaction details and tags. Only maintained when MySQL FULLTEXT is unavailable."""
+    __tablename__ = 'transactionSearchTokens'
+
+    referenceID = Column(String(64), ForeignKey('transactions.referenceID', ondelete='CASCADE'), nullable=False)
+    field = Column(String(10), nullable=False)  # 'details' or 'tag'
+    token = Column(String(12), nullable=False)
+    user = Column(String(100), nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('referenceID', 'field', 'token'),
+        # Searches are scoped to one user, lead with it so a common trigram does not pull in every tenant's rows
+        Index('ix_search_tokens_user_field_token', 'user', 'field', 'token'),
+    )
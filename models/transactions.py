@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Date, ForeignKey
+from sqlalchemy import Column, String, Date, ForeignKey, Index
 from models.Base import Base
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import DECIMAL as Decimal
@@ -17,5 +17,12 @@ class Transactions(Base):
     bank = Column(String(25), nullable=False)
     user = Column(String(100), ForeignKey('users.userID', ondelete='CASCADE'), nullable=False)
 
+    # Every listing is scoped to one user, lead with it so queries never scan other tenants' rows
+    __table_args__ = (
+        Index('ix_transactions_user_date', 'user', 'date'),
+        Index('ix_transactions_user_bank_date', 'user', 'bank', 'date'),
+        Index('ix_transactions_user_file', 'user', 'fileID'),
+    )
+
     file_details = relationship('FileDetails', back_populates='transactions')
     user_relationship = relationship('User', back_populates='transactions')
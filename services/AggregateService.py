@@ -0,0 +1,265 @@
+import datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, bindparam, case, delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects.mysql import insert as mysqlInsert
+from sqlalchemy.dialects.postgresql import insert as postgresqlInsert
+from sqlalchemy.dialects.sqlite import insert as sqliteInsert
+from sqlalchemy.exc import IntegrityError
+
+from models import DailyRollup, FileDetails, MonthlySpend, Transactions
+from utils.logger import Logger
+
+
+class AggregateService:
+    """
+    Keeps the pre-aggregated tables in step with `Transactions` and `FileDetails`. Every method works inside the
+    caller's transaction and only emits increments, so the caller decides when to commit.
+    """
+    _instance = None
+    logger = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AggregateService, cls).__new__(cls)
+            cls.logger = Logger(__name__).get_logger()
+        return cls._instance
+
+    @staticmethod
+    def _toDate(value):
+        if isinstance(value, datetime.datetime):
+            return value.date()
+        if isinstance(value, datetime.date):
+            return value
+        return datetime.date.fromisoformat(str(value)[:10])
+
+    @staticmethod
+    def _upsertStatement(session, table, keyColumns: list, valueColumns: list):
+        """
+        Insert that adds its values onto the existing row when the key is taken, so concurrent writers of the same
+        key cannot race between a lookup and the insert.
+        :return: The statement, or None when the dialect has no upsert
+        """
+        dialectName = session.get_bind().dialect.name
+        if dialectName == 'mysql':
+            statement = mysqlInsert(table)
+            return statement.on_duplicate_key_update(
+                {column: table.c[column] + statement.inserted[column] for column in valueColumns})
+        if dialectName in ('sqlite', 'postgresql'):
+            statement = (sqliteInsert if dialectName == 'sqlite' else postgresqlInsert)(table)
+            return statement.on_conflict_do_update(
+                index_elements=keyColumns,
+                set_={column: table.c[column] + statement.excluded[column] for column in valueColumns})
+        return None
+
+    @staticmethod
+    def _applyDeltas(session, model, keyColumns: list, deltas: dict):
+        """
+        Adds `deltas` onto the rows of `model`, inserting the rows that do not exist yet.
+        :param keyColumns: Names of the primary key columns
+        :param deltas: key tuple -> {column name: increment}
+        """
+        if not deltas:
+            return
+        table = model.__table__
+        valueColumns = sorted({column for delta in deltas.values() for column in delta})
+        statement = AggregateService._upsertStatement(session, table, keyColumns, valueColumns)
+        if statement is not None:
+            session.execute(statement, [
+                {**dict(zip(keyColumns, key)), **{column: delta.get(column, 0) for column in valueColumns}}
+                for key, delta in deltas.items()
+            ])
+            return
+        try:
+            with session.begin_nested():
+                AggregateService._updateThenInsert(session, table, keyColumns, valueColumns, deltas)
+        except IntegrityError:
+            # Another writer created one of the rows between the lookup and the insert, every row exists by now
+            AggregateService._updateThenInsert(session, table, keyColumns, valueColumns, deltas)
+
+    @staticmethod
+    def _updateThenInsert(session, table, keyColumns: list, valueColumns: list, deltas: dict):
+        """Fallback of `_applyDeltas` for dialects without an upsert, updates the existing rows and inserts the rest."""
+        keys = list(deltas.keys())
+        existing = {tuple(row) for row in session.execute(
+            select(*[table.c[column] for column in keyColumns])
+            .where(tuple_(*[table.c[column] for column in keyColumns]).in_(keys))
+        )}
+
+        updates = [key for key in keys if tuple(key) in existing]
+        inserts = [key for key in keys if tuple(key) not in existing]
+        if updates:
+            statement = update(table).where(
+                and_(*[table.c[column] == bindparam(f"key_{column}") for column in keyColumns])
+            ).values({column: table.c[column] + bindparam(f"delta_{column}") for column in valueColumns})
+            session.execute(statement, [
+                {**{f"key_{column}": value for column, value in zip(keyColumns, key)},
+                 **{f"delta_{column}": deltas[key].get(column, 0) for column in valueColumns}}
+                for key in updates
+            ])
+        if inserts:
+            session.execute(insert(table), [
+                {**dict(zip(keyColumns, key)), **{column: deltas[key].get(column, 0) for column in valueColumns}}
+                for key in inserts
+            ])
+
+    """ Daily rollup """
+
+    def _dailyDeltas(self, rows, sign: int):
+        deltas = {}
+        for row in rows:
+            amount = Decimal(str(row['amount']))
+            delta = deltas.setdefault((row['user'], self._toDate(row['date'])),
+                                      {'transactionCount': 0, 'debitSum': Decimal(0), 'creditSum': Decimal(0)})
+            delta['transactionCount'] += sign
+            if amount > 0:
+                delta['debitSum'] += sign * amount
+            elif amount < 0:
+                delta['creditSum'] += sign * amount
+        return deltas
+
+    def _monthlyDeltas(self, rows, sign: int):
+        deltas = {}
+        for row in rows:
+            amount = Decimal(str(row['amount']))
+            key = (row['user'], self._toDate(row['date']).strftime("%Y-%m"), row['bank'], row.get('tag') or "")
+            delta = deltas.setdefault(key, {'debitSum': Decimal(0), 'creditSum': Decimal(0),
+                                            'debitCount': 0, 'creditCount': 0})
+            if amount > 0:
+                delta['debitSum'] += sign * amount
+                delta['debitCount'] += sign
+            elif amount < 0:
+                delta['creditSum'] += sign * amount
+                delta['creditCount'] += sign
+        return deltas
+
+    def addTransactions(self, session, rows):
+        """:param rows: dicts with user, date, amount, bank and tag of the inserted transactions"""
+        self._applyDeltas(session, DailyRollup, ['user', 'day'], self._dailyDeltas(rows, 1))
+        self._applyDeltas(session, MonthlySpend, ['user', 'month', 'bank', 'tag'], self._monthlyDeltas(rows, 1))
+
+    def removeTransactions(self, session, rows):
+        """:param rows: dicts with user, date, amount, bank and tag of the deleted transactions"""
+        self._applyDeltas(session, DailyRollup, ['user', 'day'], self._dailyDeltas(rows, -1))
+        self._applyDeltas(session, MonthlySpend, ['user', 'month', 'bank', 'tag'], self._monthlyDeltas(rows, -1))
+
+    def updateTransaction(self, session, before: dict, after: dict):
+        """Moves a transaction's contribution from its old values to its new ones."""
+        self.removeTransactions(session, [before])
+        self.addTransactions(session, [after])
+
+    def addStatement(self, session, user, uploadDate, count: int = 1):
+        self._applyDeltas(session, DailyRollup, ['user', 'day'],
+                          {(user, self._toDate(uploadDate)): {'statementCount': count}})
+
+    def fetchDailyRollup(self, session, user, date_from, date_to):
+        return session.query(DailyRollup) \
+            .filter(DailyRollup.user == user) \
+            .filter(DailyRollup.day.between(date_from, date_to)) \
+            .order_by(DailyRollup.day.asc()).all()
+
+    def fetchTransactionTotals(self, session, user):
+        """count, credit_sum and debit_sum over all of `user`'s transactions, summed from one rollup row per day"""
+        count, creditSum, debitSum = session.query(func.sum(DailyRollup.transactionCount),
+                                                   func.sum(DailyRollup.creditSum),
+                                                   func.sum(DailyRollup.debitSum)) \
+            .filter(DailyRollup.user == user).one()
+        if not count:
+            # Same as the aggregates over no transactions
+            return {'count': 0, 'credit_sum': None, 'debit_sum': None}
+        return {'count': int(count), 'credit_sum': creditSum, 'debit_sum': debitSum}
+
+    def rebuildDailyRollup(self, session, user=None):
+        """Recomputes the daily rollup from the source tables, for one user or everyone."""
+        deleteStatement = delete(DailyRollup)
+        transactionQuery = session.query(
+            Transactions.user, Transactions.date, func.count(),
+            func.sum(case((Transactions.amount > 0, Transactions.amount), else_=0)),
+            func.sum(case((Transactions.amount < 0, Transactions.amount), else_=0)),
+        ).group_by(Transactions.user, Transactions.date)
+        statementQuery = session.query(FileDetails.user, FileDetails.uploadDate, func.count()) \
+            .group_by(FileDetails.user, FileDetails.uploadDate)
+        if user is not None:
+            deleteStatement = deleteStatement.where(DailyRollup.user == user)
+            transactionQuery = transactionQuery.filter(Transactions.user == user)
+            statementQuery = statementQuery.filter(FileDetails.user == user)
+
+        rollup = {}
+        for rowUser, day, count, debitSum, creditSum in transactionQuery:
+            rollup[(rowUser, self._toDate(day))] = {'transactionCount': count, 'debitSum': debitSum or 0,
+                                                    'creditSum': creditSum or 0, 'statementCount': 0}
+        for rowUser, day, count in statementQuery:
+            rollup.setdefault((rowUser, self._toDate(day)), {'transactionCount': 0, 'debitSum': 0,
+                                                             'creditSum': 0})['statementCount'] = count
+        session.execute(deleteStatement)
+        if rollup:
+            session.execute(insert(DailyRollup), [{'user': key[0], 'day': key[1], **values}
+                                                  for key, values in rollup.items()])
+        session.commit()
+        self.logger.info(f"Rebuilt daily rollup with {len(rollup)} rows")
+
+    """ Monthly spend """
+
+    def fetchMonthlySpend(self, session, user, monthFrom: str, monthTo: str):
+        """
+        :param monthFrom: First month, YYYY-MM
+        :param monthTo: Last month, YYYY-MM
+        :return: month -> totals, by_tag and by_bank breakdowns
+        """
+        rows = session.query(MonthlySpend) \
+            .filter(MonthlySpend.user == user) \
+            .filter(MonthlySpend.month.between(monthFrom, monthTo)) \
+            .order_by(MonthlySpend.month.asc()).all()
+
+        def emptyTotals():
+            return {'debit_sum': Decimal(0), 'credit_sum': Decimal(0), 'debit_count': 0, 'credit_count': 0}
+
+        def accumulate(totals, row):
+            totals['debit_sum'] += row.debitSum
+            totals['credit_sum'] += row.creditSum
+            totals['debit_count'] += row.debitCount
+            totals['credit_count'] += row.creditCount
+
+        summary = {}
+        for row in rows:
+            month = summary.setdefault(row.month, {**emptyTotals(), 'by_tag': {}, 'by_bank': {}})
+            accumulate(month, row)
+            accumulate(month['by_tag'].setdefault(row.tag, emptyTotals()), row)
+            accumulate(month['by_bank'].setdefault(row.bank, emptyTotals()), row)
+        return summary
+
+    def rebuildMonthlySpend(self, session, user=None):
+        """Recomputes the monthly spend table from `Transactions`, for one user or everyone."""
+        deleteStatement = delete(MonthlySpend)
+        # Group by day in SQL and fold the days into months here, month extraction is dialect specific
+        query = session.query(
+            Transactions.user, Transactions.date, Transactions.bank, Transactions.tag,
+            func.sum(case((Transactions.amount > 0, Transactions.amount), else_=0)),
+            func.sum(case((Transactions.amount < 0, Transactions.amount), else_=0)),
+            func.sum(case((Transactions.amount > 0, 1), else_=0)),
+            func.sum(case((Transactions.amount < 0, 1), else_=0)),
+        ).group_by(Transactions.user, Transactions.date, Transactions.bank, Transactions.tag)
+        if user is not None:
+            deleteStatement = deleteStatement.where(MonthlySpend.user == user)
+            query = query.filter(Transactions.user == user)
+
+        spend = {}
+        for rowUser, day, bank, tag, debitSum, creditSum, debitCount, creditCount in query:
+            key = (rowUser, self._toDate(day).strftime("%Y-%m"), bank, tag or "")
+            totals = spend.setdefault(key, {'debitSum': 0, 'creditSum': 0, 'debitCount': 0, 'creditCount': 0})
+            totals['debitSum'] += debitSum or 0
+            totals['creditSum'] += creditSum or 0
+            totals['debitCount'] += debitCount or 0
+            totals['creditCount'] += creditCount or 0
+        session.execute(deleteStatement)
+        if spend:
+            session.execute(insert(MonthlySpend), [
+                {'user': key[0], 'month': key[1], 'bank': key[2], 'tag': key[3], **values}
+                for key, values in spend.items()
+            ])
+        session.commit()
+        self.logger.info(f"Rebuilt monthly spend with {len(spend)} rows")
+
+    def rebuildAll(self, session, user=None):
+        self.rebuildDailyRollup(session, user)
+        self.rebuildMonthlySpend(session, user)
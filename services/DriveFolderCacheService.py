@@ -0,0 +1,31 @@
+import datetime
+import os
+
+from models import DriveFolderCache
+
+
+class DriveFolderCacheService:
+    """
+    Drive folder ids of the paths a user's statements are uploaded to, kept in the database for `ttl`. Not a
+    singleton: an instance reads and writes in the caller's session for one user, and is handed to
+    GdriveServiceUtils.uploadFileToDrive. Ids are only dropped early when Drive answers 404 for them.
+    """
+    ttl = datetime.timedelta(seconds=float(os.getenv('DRIVE_FOLDER_CACHE_TTL', 7 * 24 * 3600)))
+
+    def __init__(self, session, user):
+        self.session = session
+        self.user = user
+
+    def get(self, path):
+        """:return: The cached folder id of `path`, None when unknown or expired"""
+        row = self.session.get(DriveFolderCache, (self.user, path.strip('/')))
+        if row is None or row.cachedAt < datetime.datetime.now() - self.ttl:
+            return None
+        return row.folderId
+
+    def put(self, path, folderId):
+        self.session.merge(DriveFolderCache(user=self.user, path=path.strip('/'), folderId=folderId,
+                                            cachedAt=datetime.datetime.now()))
+
+    def invalidate(self, path):
+        self.session.query(DriveFolderCache).filter_by(user=self.user, path=path.strip('/')).delete()
@@ -0,0 +1,106 @@
+import datetime
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import g
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from enums.TaskStatusEnum import JobStatus
+from models import IngestionJob
+from utils.logger import Logger
+
+
+class IngestionJobService:
+    """
+    Runs mail and statement reads off the request thread. Every run is an `IngestionJob` row whose status and progress
+    counters are written as the work goes, so /jobStatus answers from any worker process.
+    """
+    _instance = None
+    logger = None
+    executor = ThreadPoolExecutor(max_workers=int(os.getenv('INGESTION_JOB_WORKERS', 2)),
+                                  thread_name_prefix='ingestion-job')
+    counters = ('messagesListed', 'filesParsed', 'rowsInserted', 'conflicts')
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(IngestionJobService, cls).__new__(cls)
+            cls.logger = Logger(__name__).get_logger()
+        return cls._instance
+
+    def submit(self, app, userID, kind, run):
+        """
+        Records a pending job and queues `run(progress)` on the job pool, inside an app context of `app`.
+        :param kind: IngestionJobEnum
+        :param run: Does the work and returns the result message, `progress(**counts)` adds to the job's counters
+        :return: Id of the job
+        """
+        jobID = str(uuid.uuid4())
+        with Session(app.db.engine) as session:
+            session.add(IngestionJob(id=jobID, user=userID, kind=kind.value, status=JobStatus.PENDING.value,
+                                     createdAt=datetime.datetime.now(), **{counter: 0 for counter in self.counters}))
+            session.commit()
+        self.executor.submit(self._execute, app, jobID, run)
+        self.logger.info(f"Queued {kind.value} job {jobID} for user {userID}")
+        return jobID
+
+    def _execute(self, app, jobID, run):
+        with app.app_context():
+            g.db = app.db
+            self._update(app, jobID, status=JobStatus.RUNNING.value, startedAt=datetime.datetime.now())
+            try:
+                result = run(lambda **counts: self._addProgress(app, jobID, counts))
+                self._update(app, jobID, status=JobStatus.COMPLETED.value, result=result,
+                             finishedAt=datetime.datetime.now())
+            except Exception as ex:
+                self.logger.error(f"Job {jobID} failed: {ex}")
+                app.db.session.rollback()
+                self._update(app, jobID, status=JobStatus.FAILED.value, result=str(ex)[:900],
+                             finishedAt=datetime.datetime.now())
+
+    @staticmethod
+    def _update(app, jobID, **values):
+        # Own session, so progress never commits half of the job's work
+        with Session(app.db.engine) as session:
+            session.execute(update(IngestionJob).where(IngestionJob.id == jobID).values(**values))
+            session.commit()
+
+    def _addProgress(self, app, jobID, counts):
+        counts = {counter: count for counter, count in counts.items() if count}
+        if counts:
+            self._update(app, jobID, **{counter: getattr(IngestionJob, counter) + count
+                                        for counter, count in counts.items()})
+
+    def failOrphanedJobs(self, engine):
+        """
+        Jobs only run on the pool of the process that queued them, so at startup every job still pending or running
+        was cut off by a restart and would otherwise report its status forever.
+        :return: Number of jobs marked as failed
+        """
+        with Session(engine) as session:
+            result = session.execute(
+                update(IngestionJob)
+                .where(IngestionJob.status.in_([JobStatus.PENDING.value, JobStatus.RUNNING.value]))
+                .values(status=JobStatus.FAILED.value, result="Interrupted by a restart of the server",
+                        finishedAt=datetime.datetime.now()))
+            session.commit()
+        if result.rowcount:
+            self.logger.warning(f"Marked {result.rowcount} interrupted ingestion jobs as failed")
+        return result.rowcount
+
+    def fetchJob(self, session, userID, jobID):
+        """:return: The job as a dict, None when the user has no such job"""
+        job = session.query(IngestionJob).filter_by(id=jobID, user=userID).first()
+        if job is None:
+            return None
+        return {
+            'jobID': job.id,
+            'kind': job.kind,
+            'status': job.status,
+            **{counter: getattr(job, counter) for counter in self.counters},
+            'result': job.result,
+            'createdAt': job.createdAt,
+            'startedAt': job.startedAt,
+            'finishedAt': job.finishedAt,
+        }
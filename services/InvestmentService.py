@@ -45,7 +45,8 @@ class InvestmentService(BaseService):
         "SetGoldRate": "Set Gold Rates",
         "SetPPFRate": "Set PPF Rates",
         "CheckMail": "Check Mail",
-        "CheckStatement": "Check Statements"
+        "CheckStatement": "Check Statements",
+        "RebuildAggregates": "Rebuild Aggregates"
     }
 
     def __init__(self):
@@ -0,0 +1,75 @@
+import datetime
+
+from sqlalchemy import delete, insert, tuple_
+
+from enums.MessageOutcomeEnum import MessageOutcomeEnum
+from models import ProcessedMessage
+from utils.logger import Logger
+
+
+class MessageLedgerService:
+    """
+    Ledger of the Gmail messages and attachments already processed per user. Scans consult it right after listing
+    messages, so nothing that was ingested before is fetched or downloaded again. Failed entries are retried.
+    """
+    _instance = None
+    logger = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MessageLedgerService, cls).__new__(cls)
+            cls.logger = Logger(__name__).get_logger()
+        return cls._instance
+
+    def processedMessageIds(self, session, user, messageIds) -> set:
+        """
+        A message is settled once it has its own entry (attachmentId '') and none of its entries failed. The message
+        entry of a statement mail is recorded after its attachments, so a scan cut short leaves the mail unsettled.
+        :return: The settled ids in `messageIds`, found with one IN query
+        """
+        if not messageIds:
+            return set()
+        settled, failed = set(), set()
+        for messageId, attachmentId, outcome in session.query(ProcessedMessage.messageId,
+                                                              ProcessedMessage.attachmentId,
+                                                              ProcessedMessage.outcome) \
+                .filter(ProcessedMessage.user == user) \
+                .filter(ProcessedMessage.messageId.in_(list(messageIds))):
+            if outcome == MessageOutcomeEnum.Failed.value:
+                failed.add(messageId)
+            elif attachmentId == '':
+                settled.add(messageId)
+        return settled - failed
+
+    def processedAttachmentIds(self, session, user, messageId) -> set:
+        """:return: The attachment ids of `messageId` that were processed without a failure"""
+        return {attachmentId for attachmentId, in session.query(ProcessedMessage.attachmentId)
+                .filter(ProcessedMessage.user == user)
+                .filter(ProcessedMessage.messageId == messageId)
+                .filter(ProcessedMessage.attachmentId != '')
+                .filter(ProcessedMessage.outcome != MessageOutcomeEnum.Failed.value)}
+
+    def skipper(self, session, user):
+        """Callable handed to the Gmail helpers, returns the listed ids that can be skipped."""
+        return lambda messageIds: self.processedMessageIds(session, user, messageIds)
+
+    def attachmentSkipper(self, session, user):
+        """Callable handed to the statement downloader, tells whether an attachment of a message can be skipped."""
+        return lambda messageId, attachmentId: attachmentId in self.processedAttachmentIds(session, user, messageId)
+
+    def record(self, session, user, entries):
+        """
+        Records (or overwrites) outcomes inside the caller's transaction.
+        :param entries: (messageId, attachmentId, MessageOutcomeEnum) tuples, attachmentId '' for the message itself
+        """
+        if not entries:
+            return
+        rows = {(messageId, attachmentId or ''): outcome.value for messageId, attachmentId, outcome in entries}
+        session.execute(delete(ProcessedMessage).where(ProcessedMessage.user == user).where(
+            tuple_(ProcessedMessage.messageId, ProcessedMessage.attachmentId).in_(list(rows.keys()))))
+        now = datetime.datetime.now()
+        session.execute(insert(ProcessedMessage), [
+            {'user': user, 'messageId': messageId, 'attachmentId': attachmentId, 'outcome': outcome,
+             'processedAt': now}
+            for (messageId, attachmentId), outcome in rows.items()
+        ])
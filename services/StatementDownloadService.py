@@ -1,106 +1,129 @@
-import os
 import base64
 import requests
 from urllib.parse import urlparse, parse_qs
 from werkzeug.utils import secure_filename
 from bs4 import BeautifulSoup
+from enums.MessageOutcomeEnum import MessageOutcomeEnum
 from enums.StatementPatternEnum import StatementPatternEnum
 from utils.DateTimeUtil import DateTimeUtil
+from utils.GmailPaging import GMAIL_PAGE_SIZE, iterMessagePages
 from utils.logger import Logger
 
-TEMP_DIR = os.getcwd() + '/tmp'
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 " \
              "Safari/537.36 "
 
 
 class StatementDownloadService:
-    _instance = None  # Class-level variable to hold the singleton instance
-
-    def __new__(cls, *args, **kwargs):
-        if not cls._instance:
-            cls._instance = super(StatementDownloadService, cls).__new__(cls)
-        return cls._instance
-
-    def __init__(self, password=None, gmailService=None):
-        # Avoid reinitializing if already initialized
-        if not hasattr(self, 'initialized'):
-            self.logger = Logger(__name__).get_logger()
-            self.gmail_service = gmailService
-            self.password = password
-            self.initialized = True  # Mark the instance as initialized
-
-    def route_download_process(self, bank_type, date_to=None, date_from=None):
+    """
+    Not a singleton: an instance holds the Gmail service and password of one user, and banks are downloaded
+    concurrently.
+    """
+
+    def __init__(self, password=None, gmailService=None, page_size=GMAIL_PAGE_SIZE):
+        self.logger = Logger(__name__).get_logger()
+        self.gmail_service = gmailService
+        self.password = password
+        self.page_size = page_size
+
+    def route_download_process(self, bank_type, date_to=None, date_from=None, skip=None, skip_attachment=None):
+        """
+        :param skip: Optional callable returning the listed message ids that were already processed, those are neither
+        fetched nor downloaded
+        :param skip_attachment: Optional callable (message id, attachment id) -> True for an attachment that was
+        already processed, it is not downloaded again
+        :return: Generator of dicts with fileName, content (the file's bytes), messageId and attachmentId, one per file
+        as soon as it is downloaded. Nothing is written to disk. Mails and attachments without a statement come as
+        dicts with a None content and their `outcome` instead, and every attachment mail ends with its own entry
+        """
         statement_pattern = StatementPatternEnum[bank_type].value
         date_from = date_from or DateTimeUtil.currentMonthDatesForEmail()
         date_to = date_to or date_from
-        os.makedirs(TEMP_DIR, exist_ok=True)
-        files = []
         if bank_type == StatementPatternEnum.HDFC_DEBIT.name:
-            hrefs = self.download_pdf_from_smart_statement(statement_pattern, date_to, date_from)
-            if hrefs:
-                files = self.download_files_from_hrefs(hrefs)
-            else:
-                self.logger.warning("No hrefs found for download.")
+            hrefs = self.download_pdf_from_smart_statement(statement_pattern, date_to, date_from, skip)
+            files = self.download_files_from_hrefs(hrefs)
         else:
-            files = self.download_to_temp(statement_pattern, date_to, date_from)
+            files = self.download_to_temp(statement_pattern, date_to, date_from, skip, prefix=f"{bank_type}_",
+                                          skip_attachment=skip_attachment)
+        yield from files
 
-        self.logger.info("Finished downloading files to temp")
-        return files
+        self.logger.info("Finished downloading files")
 
-    def download_to_temp(self, search_string, date_to, date_from):
-        messages = self._fetch_emails(search_string, date_from, date_to)
-        files = []
+    def download_to_temp(self, search_string, date_to, date_from, skip=None, prefix='', skip_attachment=None):
+        messages = self._fetch_emails(search_string, date_from, date_to, skip)
+        downloaded = 0
 
         for index, message in enumerate(messages):
-            attachments = self._extract_attachments(message)
-            for attachment in attachments:
-                filename = self._save_attachment(attachment, index)
-                files.append(filename)
+            parts = self._attachment_parts(message)
+            if parts is None:
+                yield self._outcome(message['id'], '', MessageOutcomeEnum.Failed)
+                continue
+            for part in parts:
+                attachment_id = part.get('partId', '')
+                if skip_attachment is not None and skip_attachment(message['id'], attachment_id):
+                    continue
+                data = self._get_attachment_data(part, message['id'])
+                if data is None:
+                    yield self._outcome(message['id'], attachment_id, MessageOutcomeEnum.Failed)
+                    continue
+                downloaded += 1
+                yield {'fileName': self._attachment_name(part['filename'], index, prefix), 'content': data,
+                       'messageId': message['id'], 'attachmentId': attachment_id}
+            # After its attachments, so the mail is only skipped once every one of them has an outcome
+            yield self._outcome(message['id'], '', MessageOutcomeEnum.Complete if parts else MessageOutcomeEnum.Empty)
+
+        self.logger.info(f"Downloaded {downloaded} files")
 
-        self.logger.info(f"Downloaded {len(files)} files to temp")
-        return files
+    @staticmethod
+    def _outcome(message_id, attachment_id, outcome):
+        """Entry of a mail or attachment that has no statement to hand over, only an outcome for the ledger"""
+        return {'fileName': None, 'content': None, 'messageId': message_id, 'attachmentId': attachment_id,
+                'outcome': outcome}
 
-    def download_pdf_from_smart_statement(self, search_string, date_to, date_from):
-        messages = self._fetch_emails(search_string, date_from, date_to)
-        hrefs = []
+    def download_pdf_from_smart_statement(self, search_string, date_to, date_from, skip=None):
+        """:return: Generator of (message id, href, outcome), href is None and outcome set for a mail without a link"""
+        messages = self._fetch_emails(search_string, date_from, date_to, skip)
+        extracted = 0
 
         for index, message in enumerate(messages):
-            href = self._extract_smart_statement_link(message)
+            try:
+                href = self._extract_smart_statement_link(message)
+            except Exception as e:
+                self.logger.error(f"Error extracting statement link: {e}")
+                yield message['id'], None, MessageOutcomeEnum.Failed
+                continue
             if href:
-                hrefs.append(href)
+                extracted += 1
+                yield message['id'], href, None
+            else:
+                yield message['id'], None, MessageOutcomeEnum.Empty
 
-        self.logger.info(f"Extracted {len(hrefs)} links from emails")
-        return hrefs
+        if extracted:
+            self.logger.info(f"Extracted {extracted} links from emails")
+        else:
+            self.logger.warning("No hrefs found for download.")
 
     def download_files_from_hrefs(self, hrefs):
-        job_req_list = [self._parse_href(link) for link in hrefs if link]
-        return self._download_hdfc_statements(job_req_list)
+        return self._download_hdfc_statements(hrefs)
 
-    def _fetch_emails(self, search_string, date_from, date_to):
+    def _fetch_emails(self, search_string, date_from, date_to, skip=None):
+        """Generator over the matching messages, listed one page at a time"""
         query = f"{search_string} after:{date_from} before:{date_to}"
         try:
-            results = self.gmail_service.users().messages().list(userId='me', q=query).execute()
-            emails = results.get('messages', [])
-            self.logger.info(f"Found {len(emails)} statements in the range")
-            return emails
+            for message_ids in iterMessagePages(self.gmail_service, query, self.page_size, skip):
+                self.logger.info(f"Found {len(message_ids)} new statements")
+                for message_id in message_ids:
+                    yield {'id': message_id}
         except Exception as e:
             self.logger.error(f"Error fetching emails: {e}")
-            return []
 
-    def _extract_attachments(self, message):
+    def _attachment_parts(self, message):
+        """:return: The parts of the message that are attachments, None when the message could not be fetched"""
         try:
             msg = self.gmail_service.users().messages().get(userId='me', id=message['id']).execute()
-            parts = msg['payload'].get('parts', [])
-            attachments = []
-            for part in parts:
-                if part['filename']:
-                    attachment_data = self._get_attachment_data(part, message['id'])
-                    if attachment_data:
-                        attachments.append((part['filename'], attachment_data))
-            return attachments
+            return [part for part in msg['payload'].get('parts', []) if part['filename']]
         except Exception as e:
             self.logger.error(f"Error extracting attachments: {e}")
-            return []
+            return None
 
     def _get_attachment_data(self, part, message_id):
         try:
@@ -116,42 +139,37 @@ class StatementDownloadService:
             self.logger.error(f"Error fetching attachment data: {e}")
         return None
 
-    def _save_attachment(self, attachment, index):
-        filename, file_data = attachment
+    def _attachment_name(self, filename, index, prefix=''):
         ext = filename.split('.')[-1]
-        secure_name = secure_filename(f"file_{index}.{ext}")
-        file_path = os.path.join(TEMP_DIR, secure_name)
-        with open(file_path, 'wb') as file:
-            file.write(file_data)
+        # The prefix keeps the files of banks downloaded in the same job apart
+        secure_name = secure_filename(f"{prefix}file_{index}.{ext}")
 
         self.logger.info(f"Attachment {secure_name} downloaded.")
         return secure_name
 
     def _extract_smart_statement_link(self, message):
-        try:
-            msg = self.gmail_service.users().messages().get(userId='me', id=message['id']).execute()
-            parts = msg['payload'].get('parts', [])
-            part = None
+        """:return: The href of the smart statement button, None when the mail has none"""
+        msg = self.gmail_service.users().messages().get(userId='me', id=message['id']).execute()
+        parts = msg['payload'].get('parts', [])
+        part = None
+        if len(parts) > 0:
+            part = parts[0]
+        while part:
+            data = part['body'].get('data')
+            if data:
+                decoded_data = base64.urlsafe_b64decode(data).decode('utf-8')
+                soup = BeautifulSoup(decoded_data, 'html.parser')
+                td_tag = soup.find('td', style="background-color: #004b8d; padding: 12px; font-size: 14px; "
+                                               "letter-spacing: 1px; border-radius: 5px;")
+                if td_tag:
+                    a_tag = td_tag.find('a')
+                    if a_tag and 'href' in a_tag.attrs:
+                        return a_tag['href']
+            parts = part.get('parts', [])
             if len(parts) > 0:
                 part = parts[0]
-            while part:
-                data = part['body'].get('data')
-                if data:
-                    decoded_data = base64.urlsafe_b64decode(data).decode('utf-8')
-                    soup = BeautifulSoup(decoded_data, 'html.parser')
-                    td_tag = soup.find('td', style="background-color: #004b8d; padding: 12px; font-size: 14px; "
-                                                   "letter-spacing: 1px; border-radius: 5px;")
-                    if td_tag:
-                        a_tag = td_tag.find('a')
-                        if a_tag and 'href' in a_tag.attrs:
-                            return a_tag['href']
-                parts = part.get('parts', [])
-                if len(parts) > 0:
-                    part = parts[0]
-                else:
-                    part = None
-        except Exception as e:
-            self.logger.error(f"Error extracting statement link: {e}")
+            else:
+                part = None
         return None
 
     @staticmethod
@@ -167,10 +185,18 @@ class StatementDownloadService:
             return [seq_element['value'], job_key]
         return None
 
-    def _download_hdfc_statements(self, job_req_list):
-        downloaded_files = []
-
-        for req in job_req_list:
+    def _download_hdfc_statements(self, hrefs):
+        downloaded = 0
+
+        for message_id, link, outcome in hrefs:
+            if not link:
+                yield self._outcome(message_id, '', outcome)
+                continue
+            try:
+                req = self._parse_href(link)
+            except requests.RequestException as e:
+                self.logger.error(f"Failed to open the statement link. {e}")
+                req = None
             if req:
                 req_id, job_key = req
                 link = f"https://smartstatements.hdfcbank.com/HDFCRestFulService/webresources/app/pdfformat?jobkey=" \
@@ -179,15 +205,13 @@ class StatementDownloadService:
 
                 if response.status_code == 200:
                     filename = f"HDFC_Statement_{job_key}_{req_id}.pdf"
-                    file_path = os.path.join(TEMP_DIR, filename)
-
-                    with open(file_path, 'wb') as pdf_file:
-                        pdf_file.write(response.content)
-
-                    downloaded_files.append(filename)
+                    downloaded += 1
                     self.logger.info(f"Downloaded file {filename}")
-                else:
-                    self.logger.error(f"Failed to download for jobKey={job_key}, reqId={req_id}.")
-
-        self.logger.info(f"Successfully downloaded {len(downloaded_files)} files")
-        return downloaded_files
+                    yield {'fileName': filename, 'content': response.content, 'messageId': message_id,
+                           'attachmentId': ''}
+                    continue
+                self.logger.error(f"Failed to download for jobKey={job_key}, reqId={req_id}.")
+            # Recorded as failed, the link is opened again on the next run
+            yield self._outcome(message_id, '', MessageOutcomeEnum.Failed)
+
+        self.logger.info(f"Successfully downloaded {downloaded} files")
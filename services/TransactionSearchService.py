@@ -0,0 +1,125 @@
+from sqlalchemy import and_, delete, func, insert, inspect, select, text
+from sqlalchemy.dialects.mysql import match
+
+from models import Transactions, TransactionSearchToken
+from utils.logger import Logger
+
+
+class TransactionSearchService:
+    """
+    Free text search over `Transactions.details` and `Transactions.tag`.
+    MySQL is served by FULLTEXT indexes using the ngram parser. Every other dialect (SQLite in development) uses the
+    local trigram table `transactionSearchTokens`, which is kept in sync by the transaction service. In both cases the
+    index only narrows the candidate rows, the original ilike still decides the match so results do not change.
+    """
+    _instance = None
+    logger = None
+
+    # Terms shorter than a trigram cannot use the index and fall back to a plain ilike
+    minTermLength = 3
+    # Filter key / field name -> column
+    searchFields = {'details': Transactions.details, 'tag': Transactions.tag}
+    fulltextIndexes = {'details': 'ft_transactions_details', 'tag': 'ft_transactions_tag'}
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TransactionSearchService, cls).__new__(cls)
+            cls.logger = Logger(__name__).get_logger()
+        return cls._instance
+
+    @staticmethod
+    def usesFulltext(dialectName: str) -> bool:
+        return dialectName == 'mysql'
+
+    @staticmethod
+    def trigrams(value: str | None) -> set:
+        value = (value or "").lower()
+        return {value[index:index + 3] for index in range(len(value) - 2)}
+
+    def ensureIndexes(self, engine):
+        """Create the MySQL FULLTEXT indexes if they are missing. No-op for other dialects."""
+        if not self.usesFulltext(engine.dialect.name):
+            return
+        existing = {index['name'] for index in inspect(engine).get_indexes(Transactions.__tablename__)}
+        with engine.begin() as connection:
+            for field, indexName in self.fulltextIndexes.items():
+                if indexName not in existing:
+                    self.logger.info(f"Creating FULLTEXT index {indexName}")
+                    connection.execute(text(f"CREATE FULLTEXT INDEX {indexName} ON "
+                                            f"{Transactions.__tablename__} ({field}) WITH PARSER ngram"))
+
+    def searchClause(self, dialectName: str, field: str, term: str, userID=None):
+        """
+        :param dialectName: Dialect of the session the clause will run on
+        :param field: 'details' or 'tag'
+        :param term: Text typed by the user
+        :param userID: When given, only this user's tokens are looked up
+        :return: Clause matching rows whose `field` contains `term`
+        """
+        column = self.searchFields[field]
+        likeClause = column.ilike(f"%{term}%")
+        if len(term) < self.minTermLength:
+            return likeClause
+        if self.usesFulltext(dialectName):
+            phrase = term.replace('"', ' ')
+            return and_(match(column, against=f'"{phrase}"').in_boolean_mode(), likeClause)
+        grams = self.trigrams(term)
+        candidates = select(TransactionSearchToken.referenceID)
+        if userID is not None:
+            candidates = candidates.where(TransactionSearchToken.user == userID)
+        candidates = (
+            candidates
+            .where(TransactionSearchToken.field == field)
+            .where(TransactionSearchToken.token.in_(grams))
+            .group_by(TransactionSearchToken.referenceID)
+            .having(func.count(func.distinct(TransactionSearchToken.token)) == len(grams))
+        )
+        return and_(Transactions.referenceID.in_(candidates), likeClause)
+
+    def _tokenRows(self, rows):
+        tokenRows = []
+        for row in rows:
+            for field in self.searchFields:
+                tokenRows += [{'referenceID': row['referenceID'], 'field': field, 'token': token, 'user': row['user']}
+                              for token in self.trigrams(row.get(field))]
+        return tokenRows
+
+    def indexRows(self, session, rows):
+        """
+        (Re)index transactions inside the caller's transaction.
+        :param rows: dicts with referenceID, details, tag and user
+        """
+        if not rows or self.usesFulltext(session.get_bind().dialect.name):
+            return
+        self.removeReferences(session, [row['referenceID'] for row in rows])
+        tokenRows = self._tokenRows(rows)
+        if tokenRows:
+            session.execute(insert(TransactionSearchToken), tokenRows)
+
+    def indexTransaction(self, session, transaction: Transactions):
+        self.indexRows(session, [{'referenceID': transaction.referenceID, 'details': transaction.details,
+                                  'tag': transaction.tag, 'user': transaction.user}])
+
+    def removeReferences(self, session, referenceIDs):
+        if self.usesFulltext(session.get_bind().dialect.name):
+            return
+        session.execute(delete(TransactionSearchToken).where(TransactionSearchToken.referenceID.in_(referenceIDs)))
+
+    def removeForFile(self, session, fileID):
+        if self.usesFulltext(session.get_bind().dialect.name):
+            return
+        fileReferences = select(Transactions.referenceID).where(Transactions.fileID == fileID)
+        session.execute(delete(TransactionSearchToken).where(TransactionSearchToken.referenceID.in_(fileReferences)))
+
+    def rebuild(self, session, batchSize: int = 1000):
+        """Rebuild the trigram table from scratch, e.g. after it was created on a populated database."""
+        if self.usesFulltext(session.get_bind().dialect.name):
+            return
+        session.execute(delete(TransactionSearchToken))
+        query = select(Transactions.referenceID, Transactions.details, Transactions.tag, Transactions.user)
+        for partition in session.execute(query.execution_options(yield_per=batchSize)).mappings().partitions():
+            tokenRows = self._tokenRows(partition)
+            if tokenRows:
+                session.execute(insert(TransactionSearchToken), tokenRows)
+        session.commit()
+        self.logger.info("Rebuilt transaction search tokens")
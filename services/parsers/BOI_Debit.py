@@ -1,6 +1,5 @@
 from abc import ABC
 import pandas
-import tabula
 from services.parsers.Base_Parser import BaseParser
 from utils.GenericUtils import GenericUtil
 
@@ -45,8 +44,7 @@ class BOIDebitParser(BaseParser, ABC):
     def readFirstPage(self):
         extraction_area = [244, 59, 796, 541]
         columns = [116, 188, 363, 413, 466, 537]
-        tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-            self.filePath,
+        tables: [pandas.core.frame.DataFrame] = self.readTables(
             pages='1', area=extraction_area, guess=False,
             stream=True, silent=True,
             columns=columns, password=self.password)
@@ -55,8 +53,7 @@ class BOIDebitParser(BaseParser, ABC):
     def readMiddlePages(self):
         extraction_area = [1, 59, 1000, 541]
         columns = [116, 188, 363, 413, 466, 537]
-        tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-            self.filePath,
+        tables: [pandas.core.frame.DataFrame] = self.readTables(
             pages=f'2-{self.pagesInPDF}', area=extraction_area, guess=True,
             stream=True, silent=True,
             columns=columns, password=self.password, pandas_options={'header': None})
@@ -1,8 +1,12 @@
 import logging
+import os
 from abc import abstractmethod, ABC
 
 import fitz
+import tabula
 
+from services.parsers import FitzTables
+from utils.GenericUtils import GenericUtil
 from utils.logger import Logger
 
 
@@ -10,19 +14,36 @@ class BaseParser(ABC):
     pagesInPDF: int
     password: str | None
     filePath: str | None
+    fileContent: bytes | None
     _transactionList: []
+    # Engine behind readTables: 'tabula', or 'fitz' to read the tables with PyMuPDF and skip the JVM. Parsers switch
+    # by overriding it once tests/test_table_engines.py shows the same transactions on both, STATEMENT_TABLE_ENGINE
+    # switches them all
+    tableEngine = 'tabula'
+    _engineOverride = os.getenv('STATEMENT_TABLE_ENGINE')
 
     def __init__(self, name):
         self.password = None
         self._transactionList = []
         self.end_flag = False
         self.filePath = None
+        self.fileContent = None
+        self._spilledPath = None
+        self._pageCache = None
+        if self._engineOverride:
+            self.tableEngine = self._engineOverride
+        # Exception that ended the last parse early, None when it read the whole statement
+        self.parseError = None
         self.logging = Logger(name).get_logger()
 
     def parseFile(self):
         try:
             # Reset list to prevent duplicates
             self._transactionList = []
+            self.parseError = None
+            # Opened and decrypted once, every pass of this parse reads its pages from the cache. Parsers left on tabula
+            # still read the spilled file again on every readTables call
+            self._pageCache = FitzTables.PageCache(self.openDocument())
             self.countPages()
             self.readFirstPage()
             if self.pagesInPDF > 1:
@@ -30,10 +51,23 @@ class BaseParser(ABC):
                 self.readLastPage()
         except Exception as ex:
             self.logging.error(f"Error has occurred while parsing file. Ending parse {ex}")
+            self.parseError = ex
         finally:
+            if self._pageCache is not None:
+                self._pageCache.close()
+                self._pageCache = None
             self.end_flag = True
             return self._transactionList
 
+    def appendTransactions(self, dates, descriptions, amounts):
+        """Adds the rows given column wise, with their reference ids generated in one pass."""
+        dates, descriptions, amounts = list(dates), list(descriptions), list(amounts)
+        references = GenericUtil.generate_reference_ids(dates, descriptions, amounts)
+        self._transactionList += [
+            {'reference': reference, 'date': date, 'description': description, 'amount': amount}
+            for reference, date, description, amount in zip(references, dates, descriptions, amounts)
+        ]
+
     @abstractmethod
     def readFirstPage(self):
         pass
@@ -50,20 +84,69 @@ class BaseParser(ABC):
     def processTableOnPage(self, tables):
         pass
 
-    def countPages(self):
-        pdf = fitz.open(self.filePath)
+    @property
+    def needsFilePath(self):
+        # Tabula only reads from a path, so content handed over as bytes is written out for it
+        return self.tableEngine == 'tabula'
+
+    def readTables(self, **options):
+        """
+        Tables of the statement, read with `tableEngine`.
+        :param options: Options of `tabula.io.read_pdf`, the PyMuPDF engine honours pages, area, columns, lattice and
+        pandas_options
+        :return: List of DataFrames
+        """
+        if self.tableEngine == 'fitz':
+            if self._pageCache is not None:
+                return FitzTables.readTables(self._pageCache, **options)
+            with self.openDocument() as pdf:
+                return FitzTables.readTables(FitzTables.PageCache(pdf), **options)
+        return tabula.io.read_pdf(self.filePath, **options)
+
+    def openDocument(self):
+        if self.fileContent is not None:
+            pdf = fitz.open(stream=self.fileContent, filetype='pdf')
+        else:
+            pdf = fitz.open(self.filePath)
         # If the file is encrypted and a password is provided, attempt to decrypt
         if pdf.needs_pass:
             if self.password:
-                pdf.authenticate(self.password)
+                if not pdf.authenticate(self.password):
+                    pdf.close()
+                    raise ValueError("PDF could not be decrypted with the provided password.")
             else:
+                pdf.close()
                 raise ValueError("PDF is encrypted, and no password was provided.")
+        return pdf
 
-        self.pagesInPDF = pdf.page_count
-        pdf.close()
+    def countPages(self):
+        if self._pageCache is not None:
+            self.pagesInPDF = self._pageCache.pageCount
+            return
+        with self.openDocument() as pdf:
+            self.pagesInPDF = pdf.page_count
 
     def setPath(self, path):
+        self.releaseContent()
         self.filePath = path
 
+    def setContent(self, content, fileName, spillDir):
+        """
+        Parse the statement from memory. It is written to `spillDir` only when the parser needs a real path.
+        """
+        self.releaseContent()
+        self.fileContent = content
+        if self.needsFilePath:
+            self.filePath = self._spilledPath = os.path.join(spillDir, fileName)
+            with open(self.filePath, 'wb') as file:
+                file.write(content)
+
+    def releaseContent(self):
+        """Drops the statement held in memory and its copy on disk, if one was written."""
+        if self._spilledPath is not None and os.path.exists(self._spilledPath):
+            os.remove(self._spilledPath)
+        self.fileContent = None
+        self.filePath = self._spilledPath = None
+
     def setPassword(self, password):
         self.password = password
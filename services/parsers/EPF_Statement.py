@@ -1,12 +1,13 @@
 from abc import ABC
 from datetime import datetime
-import tabula
 from pandas import DataFrame
 
+from services.parsers import TableOps
 from services.parsers.Base_Parser import BaseParser
 
 
 class EPFStatementParser(BaseParser, ABC):
+    tableEngine = 'fitz'
 
     def __init__(self):
         super().__init__(name=__name__)
@@ -15,8 +16,8 @@ class EPFStatementParser(BaseParser, ABC):
         # (top,left,bottom,right)
         extraction_area = [222, 25, 520, 560]
         columns = [82, 138, 168, 283, 339, 397, 453, 515]
-        tables: [DataFrame] = tabula.io.read_pdf(
-            self.filePath, area=extraction_area, guess=False,
+        tables: [DataFrame] = self.readTables(
+            area=extraction_area, guess=False,
             pages=1,
             columns=columns,
             stream=True, silent=True,
@@ -50,13 +51,14 @@ class EPFStatementParser(BaseParser, ABC):
     def processTableOnPage(self, tables):
         try:
             # pandas.set_option('display.max_columns', 7)   #For debugging only.
-            for index, table in enumerate(tables):
-                for innerIndex, row in table.iterrows():
-                    if self.is_valid_date_format(row.iloc[0]):
-                        self._transactionList.append({
-                            'date': row.iloc[1],
-                            'description': row.iloc[3],
-                            'amount': float(row.iloc[6].replace(',', '')) + float(row.iloc[7].replace(',', ''))
-                        })
+            frame = TableOps.combined(tables, 8)
+            rows = frame[frame[0].map(self.is_valid_date_format).astype(bool)]
+            # Employee and employer shares of the month
+            amounts = TableOps.toAmounts(rows[6]) + TableOps.toAmounts(rows[7])
+            if amounts.isna().any():
+                self.logging.info(f"Skipping {amounts.isna().sum()} months without readable amounts")
+            rows, amounts = rows[amounts.notna()], amounts[amounts.notna()]
+            self._transactionList += [{'date': date, 'description': description, 'amount': amount}
+                                      for date, description, amount in zip(rows[1], rows[3], amounts)]
         except Exception as ex:
-            self.logging.info(f"{ex}")
\ No newline at end of file
+            self.logging.info(f"{ex}")
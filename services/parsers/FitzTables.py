@@ -0,0 +1,140 @@
+"""
+Table extraction on PyMuPDF, a drop in for the `tabula.io.read_pdf` calls of the parsers that needs no JVM. It takes the
+same page, area, columns, lattice and pandas options and builds the DataFrames the way tabula-py does (one table per
+page, empty cells as NaN, numeric columns converted), so a parser can switch engines without touching its row logic.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+
+import fitz
+import numpy as np
+import pandas as pd
+
+
+def pageNumbers(pages, pageCount):
+    """
+    Zero based page numbers of a tabula page spec ('all', 3, '3', '2-5', '1,3').
+    Pages past the end raise like tabula does, parsers rely on that to stop.
+    """
+    if pages == 'all':
+        return list(range(pageCount))
+    numbers = []
+    for part in str(pages).split(','):
+        start, _, end = part.strip().partition('-')
+        numbers += range(int(start), int(end or start) + 1)
+    if any(number < 1 or number > pageCount for number in numbers):
+        raise ValueError(f"Page {pages} is out of range, the document has {pageCount} pages")
+    return [number - 1 for number in numbers]
+
+
+def wordRows(words, columns):
+    """
+    Groups the words of a page into lines, the way tabula's stream mode does, and bins every word into the column
+    whose boundary follows its left edge.
+    :param words: PyMuPDF word tuples (x0, y0, x1, y1, text, ...)
+    :return: List of rows, each a dict of column index -> text
+    """
+    lines = []
+    for word in sorted(words, key=lambda w: (w[1], w[0])):
+        middle = (word[1] + word[3]) / 2
+        if lines and lines[-1][0] <= middle <= lines[-1][1]:
+            lines[-1][2].append(word)
+            lines[-1][1] = max(lines[-1][1], word[3])
+        else:
+            lines.append([word[1], word[3], [word]])
+    rows = []
+    for _, _, lineWords in lines:
+        cells = defaultdict(list)
+        for word in sorted(lineWords, key=lambda w: w[0]):
+            cells[bisect_left(columns, word[0])].append(word[4])
+        rows.append({column: ' '.join(texts) for column, texts in cells.items()})
+    return rows
+
+
+class PageCache:
+    """
+    Words, text and ruled tables of the pages of one open document. Each is extracted on first use and shared by
+    every later pass over the same page, so a parser reading a statement several ways decodes every page once.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.pageCount = document.page_count
+        self._words = {}
+        self._text = {}
+        self._lattice = {}
+
+    def words(self, number):
+        """PyMuPDF word tuples (x0, y0, x1, y1, text, ...) of the zero based page `number`"""
+        if number not in self._words:
+            self._words[number] = self.document[number].get_text('words')
+        return self._words[number]
+
+    def text(self, number):
+        if number not in self._text:
+            self._text[number] = self.document[number].get_text()
+        return self._text[number]
+
+    def rect(self, number):
+        return self.document[number].rect
+
+    def latticeRows(self, number, clip):
+        """Rows of the ruled tables inside `clip`, as dicts of column index -> text."""
+        key = (number, tuple(clip))
+        if key not in self._lattice:
+            rows = []
+            for table in self.document[number].find_tables(clip=clip, strategy='lines').tables:
+                for row in table.extract():
+                    rows.append({column: text for column, text in enumerate(row) if text})
+            self._lattice[key] = rows
+        return self._lattice[key]
+
+    def close(self):
+        self.document.close()
+
+
+def toDataFrame(rows, pandas_options=None):
+    """Builds the DataFrame of one page the way tabula-py's JSON reader does."""
+    width = max((max(row) + 1 for row in rows if row), default=0)
+    data = [[row.get(column) or np.nan for column in range(width)] for row in rows]
+    pandas_options = dict(pandas_options or {})
+    header = pandas_options.pop('header', 'infer')
+    columns = None
+    if header is not None:
+        columns, seen, unnamed = [], defaultdict(int), 0
+        for name in data.pop(0 if header == 'infer' else header):
+            if name is np.nan:
+                name, unnamed = f"Unnamed: {unnamed}", unnamed + 1
+            columns.append(f"{name}.{seen[name]}" if seen[name] else name)
+            seen[name] += 1
+    frame = pd.DataFrame(data=data, columns=columns, **pandas_options)
+    for column in frame.columns:
+        try:
+            frame[column] = pd.to_numeric(frame[column], errors='raise')
+        except (ValueError, TypeError):
+            pass
+    return frame
+
+
+def readTables(pageCache, pages='all', area=None, columns=None, lattice=False, pandas_options=None, **ignored):
+    """
+    :param pageCache: PageCache of the open (and authenticated) document
+    :param area: (top, left, bottom, right) in points, the whole page when None
+    :param columns: x coordinates of the column boundaries, required unless `lattice`
+    :return: One DataFrame per page that has text in the area
+    """
+    if not lattice and not columns:
+        raise ValueError("The PyMuPDF engine needs explicit columns outside lattice mode")
+    tables = []
+    for number in pageNumbers(pages, pageCache.pageCount):
+        clip = fitz.Rect(area[1], area[0], area[3], area[2]) if area else pageCache.rect(number)
+        if lattice:
+            rows = pageCache.latticeRows(number, clip)
+        else:
+            # A word belongs to the area its centre falls in
+            words = [word for word in pageCache.words(number)
+                     if fitz.Point((word[0] + word[2]) / 2, (word[1] + word[3]) / 2) in clip]
+            rows = wordRows(words, sorted(columns))
+        if rows:
+            tables.append(toDataFrame(rows, pandas_options))
+    return tables
@@ -2,13 +2,13 @@ import re
 from abc import ABC
 
 import pandas
-import tabula
 
 from services.parsers.Base_Parser import BaseParser
 from utils.GenericUtils import GenericUtil
 
 
 class HDFCMilleniaParse(BaseParser, ABC):
+    tableEngine = 'fitz'
 
     def __init__(self):
         super().__init__(name=__name__)
@@ -17,14 +17,12 @@ class HDFCMilleniaParse(BaseParser, ABC):
         extraction_area = [429, 23, 677, 588]
         columns = [104, 476, 677]
         try:
-            tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-                self.filePath,
+            tables: [pandas.core.frame.DataFrame] = self.readTables(
                 pages='1', area=extraction_area, guess=False,
                 stream=True, silent=True,
                 columns=columns, password=self.password)
         except:
-            tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-                self.filePath,
+            tables: [pandas.core.frame.DataFrame] = self.readTables(
                 pages='1', area=extraction_area, guess=False,
                 stream=True, silent=True,
                 columns=columns)
@@ -36,14 +34,12 @@ class HDFCMilleniaParse(BaseParser, ABC):
         columns = [104, 476, 677]
         for i in range(2, self.pagesInPDF):
             try:
-                tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-                    self.filePath,
+                tables: [pandas.core.frame.DataFrame] = self.readTables(
                     pages=i, area=extraction_area, guess=False,
                     stream=True, silent=True,
                     columns=columns, password=self.password)
             except:
-                tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-                    self.filePath,
+                tables: [pandas.core.frame.DataFrame] = self.readTables(
                     pages=i, area=extraction_area, guess=False,
                     stream=True, silent=True,
                     columns=columns)
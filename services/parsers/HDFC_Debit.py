@@ -1,14 +1,12 @@
-import math
-import re
 from abc import ABC
 import pandas
-import tabula
 
+from services.parsers import TableOps
 from services.parsers.Base_Parser import BaseParser
-from utils.GenericUtils import GenericUtil
 
 
 class HDFCDebitParser(BaseParser, ABC):
+    tableEngine = 'fitz'
 
     def __init__(self):
         super().__init__(name=__name__)
@@ -17,17 +15,20 @@ class HDFCDebitParser(BaseParser, ABC):
         # (top,left,bottom,right)
         extraction_area = [266, 8, 800, 765]
         try:
-            tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-                self.filePath, area=extraction_area, guess=False,
+            tables: [pandas.core.frame.DataFrame] = self.readTables(
+                area=extraction_area, guess=False,
                 pages="all",
                 lattice=True, silent=True,
                 password=self.password, pandas_options={'header': None})
             self.processTableOnPage(tables)
-        except:
+        except Exception as ex:
+            self.logging.info(f"Could not read ruled tables, trying v2. {ex}")
+        # v2 statements have no ruled tables, the lattice pass finds nothing in them
+        if not self._transactionList:
             extraction_area = [228, 27, 800, 700]
             columns = [67, 272, 357, 397, 475, 551, 700]
-            tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-                self.filePath, area=extraction_area, guess=False,
+            tables: [pandas.core.frame.DataFrame] = self.readTables(
+                area=extraction_area, guess=False,
                 pages="all",
                 stream=True, silent=True,
                 pandas_options={'header': None}, columns=columns)
@@ -37,37 +38,23 @@ class HDFCDebitParser(BaseParser, ABC):
         dateRegex: str = r'\b(0[1-9]|[12][0-9]|3[01])/(0[1-9]|1[0-2])/\d{2}\b'
         try:
             # pandas.set_option('display.max_columns', 7)   #For debugging only.
-            for index, table in enumerate(tables):
-                for innerIndex, row in table.iterrows():
-                    try:
-                        date = row[0]
-                        if re.match(dateRegex, str(date)):
-                            date = self.format_date(date)
-                            desc = row[1]
-                            amount = None
-                            if type(row[4]) != str and math.isnan(row[4]):
-                                amount = -1 * float(str(row[5]).replace(",", ''))
-                            if type(row[5]) != str and math.isnan(row[5]):
-                                amount = float(str(row[4]).replace(",", ''))
-                            reference = GenericUtil().generate_reference_id(date, desc, amount)
-                            self._transactionList.append(
-                                {
-                                    'reference': reference,
-                                    'date': date,
-                                    'description': desc,
-                                    'amount': amount
-                                })
-                        elif type(row[0]) != str and type(row[2]) != str and math.isnan(row[0]) and type(
-                                row[1]) == str and math.isnan(row[2]) and len(self._transactionList) > 0:
-                            lastTuple = self._transactionList[-1]
-                            lastList = list(lastTuple)
-                            lastList[1] += row[1]
-                            self._transactionList[-1] = tuple(lastList)
-                    except Exception as ex:
-                        self.logging.error(f"Error {ex}")
-                        continue
+            frame = TableOps.combined(tables, 6)
+            isDate = TableOps.matchMask(frame[0], dateRegex)
+            # Exactly one of withdrawal (4) and deposit (5) is filled, deposits are negative
+            debitEmpty, creditEmpty = frame[4].isna(), frame[5].isna()
+            amounts = (-1 * TableOps.toAmounts(frame[5])).where(debitEmpty)
+            amounts = TableOps.toAmounts(frame[4]).where(creditEmpty, amounts)
+            unreadable = (debitEmpty & ~TableOps.isAmount(frame[5])) | (creditEmpty & ~TableOps.isAmount(frame[4]))
+            isTransaction = isDate & (debitEmpty | creditEmpty) & ~unreadable
+            # Rows with only a description continue the description of the transaction above them
+            owner = isTransaction.cumsum()
+            isOverflow = ~isDate & frame[0].isna() & frame[2].isna() & TableOps.isText(frame[1]) & (owner > 0)
+            overflow = frame[1][isOverflow].groupby(owner[isOverflow]).agg(' '.join)
 
-                self.logging.info(f"Finished table {index + 1}. Transactions analysed: {len(self._transactionList)}")
+            rows = frame[isTransaction]
+            descriptions = [f"{desc} {overflow[number]}" if isinstance(desc, str) and number in overflow else desc
+                            for desc, number in zip(rows[1], owner[isTransaction])]
+            self.appendTransactions(rows[0].map(self.format_date), descriptions, amounts[isTransaction])
             self.logging.info(f"Total transactions {len(self._transactionList)}")
         except Exception as ex:
             self.logging.error(f"Error reading tables in v2 as well. {ex}")
@@ -76,26 +63,13 @@ class HDFCDebitParser(BaseParser, ABC):
         dateRegex: str = "^(0[1-9]|1\\d|2\\d|3[01])\\/(0[1-9]|1[0-2])\\/(19|20)\\d{2}$"
 
         try:
-            for index, table in enumerate(tables):
-                for innerIndex, row in table.iterrows():
-                    date = row[0]
-                    if re.match(dateRegex, str(date)):
-                        date = self.format_date(date)
-                        desc = row[1]
-                        amount = str(row[4])
-                        amount = amount.replace(",", "")
-                        if float(amount) == 0:
-                            cleanVal = str(row[5]).replace(',', '')
-                            creditVal = float(cleanVal)
-                            amount = -1 * creditVal
-                        reference = GenericUtil().generate_reference_id(date, desc, amount)
-                        self._transactionList.append(
-                            {
-                                'reference': reference,
-                                'date': date,
-                                'description': desc,
-                                'amount': amount
-                            })
+            frame = TableOps.combined(tables, 6)
+            rows = frame[TableOps.matchMask(frame[0], dateRegex)]
+            debit = TableOps.asText(rows[4]).str.replace(",", "", regex=False)
+            # A zero withdrawal means the amount is the deposit, which is negative
+            isCredit = pandas.to_numeric(debit, errors='coerce') == 0
+            amounts = debit.where(~isCredit, -1 * TableOps.toAmounts(rows[5]))
+            self.appendTransactions(rows[0].map(self.format_date), rows[1], amounts)
         except Exception as ex:
             self.logging.error(f"Error occurred while inserting statement to HDFC.{ex}")
             return
@@ -1,7 +1,6 @@
 from abc import ABC
 
 import pandas
-import tabula
 import re
 
 from services.parsers.Base_Parser import BaseParser
@@ -9,6 +8,7 @@ from utils.GenericUtils import GenericUtil
 
 
 class ICICICreditCardStatementParser(BaseParser, ABC):
+    tableEngine = 'fitz'
     preDefinedColumns = ['Date', 'SerNo.', 'Transaction Details', 'Reward', 'Intl.#',
                          'Amount (in`)']
 
@@ -18,8 +18,7 @@ class ICICICreditCardStatementParser(BaseParser, ABC):
     def readFirstPage(self):
         extraction_area = [365, 199, 623, 568]
         columns = [243, 299, 435, 473, 515, 568]
-        tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-            self.filePath,
+        tables: [pandas.core.frame.DataFrame] = self.readTables(
             pages='1', area=extraction_area, guess=False,
             stream=True, silent=True,
             columns=columns, password=self.password)
@@ -28,8 +27,7 @@ class ICICICreditCardStatementParser(BaseParser, ABC):
     def readMiddlePages(self):
         extraction_area = [58, 30, 834, 589]
         columns = [86, 169, 366, 437, 507, 562]
-        tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-            self.filePath,
+        tables: [pandas.core.frame.DataFrame] = self.readTables(
             pages='2', area=extraction_area, guess=False,
             stream=True, silent=True,
             columns=columns, password=self.password)
@@ -1,14 +1,13 @@
-import math
-import re
 from abc import ABC
 
 import pandas
-import tabula
 
+from services.parsers import TableOps
 from services.parsers.Base_Parser import BaseParser
 
 
 class NPSParser(BaseParser, ABC):
+    tableEngine = 'fitz'
 
     def __init__(self):
         super().__init__(name=__name__)
@@ -26,8 +25,7 @@ class NPSParser(BaseParser, ABC):
         # Middle page tables is a little smaller.
         columns = [250, 291, 329, 371, 410, 452, 495]
 
-        tables: [pandas.DataFrame] = tabula.io.read_pdf(
-            self.filePath,
+        tables: [pandas.DataFrame] = self.readTables(
             pages=f'2-{self.pagesInPDF}', guess=False, pandas_options={'header': None},
             stream=True, silent=True,
             columns=columns, multiple_tables=True)
@@ -38,83 +36,67 @@ class NPSParser(BaseParser, ABC):
         extraction_area = [507, 8, 800, 581]
         columns = [237, 281, 320, 362, 402, 447, 493]
 
-        tables: [pandas.DataFrame] = tabula.io.read_pdf(
-            self.filePath,
+        tables: [pandas.DataFrame] = self.readTables(
             pages='all', guess=False, pandas_options={'header': None},
             stream=True, silent=True,
             columns=columns, multiple_tables=True)
         self.firstPageFormatTables.append(tables)
 
     def processTableOnPage(self, tables: [pandas.DataFrame]):
+        frame = TableOps.combined(tables, 8)
+        widths = TableOps.tableWidths(tables)
+        isValid = self.validLines(frame, widths)
+        isOverflow = self.nameOverflows(frame, widths) & (frame[0] != 'Note')
+        isHeader = (frame[0] == "Scheme Name") & (frame[1] == "TotalUnits") & (frame[2] == "BlockedUnits")
+
         startParsing = False
         nameRow = 0
         name = ""
         nav = None
         quantity = None
-        for index, table in enumerate(tables):
-            for row_index, row in table.iterrows():
-                if startParsing:
-                    if name.strip() == self.nameList[nameRow]:
-                        nameRow += 1
-                        self._transactionList.append({
-                            'name': name.strip(),
-                            'nav': nav,
-                            'quantity': quantity
-                        })
-                        name = ''
-                        nav = None
-                        quantity = None
-                    if self.isAValidLine(row):
-                        name += f"{row.iloc[0].strip()} "
-                        nav = row.iloc[4]
-                        quantity = row.iloc[1]
-                    elif self.isNameOverFlow(row) and row.iloc[0] != 'Note':
-                        name += f"{row.iloc[0].strip()} "
-
-                if row.iloc[0] == "Scheme Name" and row.iloc[1] == "TotalUnits" and row.iloc[2] == "BlockedUnits":
-                    startParsing = True
+        for schemeName, units, rowNav, valid, overflow, header in zip(frame[0], frame[1], frame[4], isValid,
+                                                                        isOverflow, isHeader):
+            if startParsing:
+                if name.strip() == self.nameList[nameRow]:
+                    nameRow += 1
+                    self._transactionList.append({
+                        'name': name.strip(),
+                        'nav': nav,
+                        'quantity': quantity
+                    })
+                    name = ''
+                    nav = None
+                    quantity = None
+                if valid:
+                    name += f"{schemeName.strip()} "
+                    nav = rowNav
+                    quantity = units
+                elif overflow:
+                    name += f"{schemeName.strip()} "
+
+            if header:
+                startParsing = True
         # Changing nameList to only contain remaining names
         self.nameList = self.nameList[nameRow:len(self.nameList)]
 
-    def isAValidLine(self, row):
+    @staticmethod
+    def validLines(frame, widths):
         """
-        If the row is valid, then we check the types of all indicies
-        :param row:The row being iterated
-        :return: True or False based on checks
+        A holding line has the scheme name followed by seven numbers
+        :return: True or False per row
         """
-        try:
-            if len(row) < 8:
-                return False
-            for i in range(0, 8):
-                if not isinstance(row.iloc[i], str) and math.isnan(row.iloc[i]):
-                    return False
-            floatList = []
-            if not isinstance(row.iloc[0], str):
-                return False
-            for i in range(1, 8):
-                floatList.append(float(row.iloc[i].replace(',', '')))
-            for item in floatList:
-                if not isinstance(item, float):
-                    return False
-            return True
-        except Exception as ex:
-            self.logging.error(f"Error while parsing line in NPS statement {ex}")
-            return False
+        valid = (widths >= 8) & TableOps.isText(frame[0])
+        for i in range(1, 8):
+            valid &= TableOps.isText(frame[i]) & TableOps.toAmounts(frame[i]).notna()
+        return valid
 
     @staticmethod
-    def isNameOverFlow(row):
-        try:
-            if len(row) < 8:
-                # At least 8 items should be there
-                return False
-            if not isinstance(row.iloc[0], str):
-                return False
-            for i in range(1, 8):
-                if not math.isnan(row.iloc[i]):
-                    return False
-            return True
-        except:
-            return False
+    def nameOverflows(frame, widths):
+        """A scheme name that wrapped continues on a line with nothing else on it"""
+        overflow = (widths >= 8) & TableOps.isText(frame[0])
+        for i in range(1, 8):
+            overflow &= frame[i].isna()
+        return overflow
 
     def readSecurityNamesTier1(self):
         # (top, left, bottom, right).
@@ -122,13 +104,11 @@ class NPSParser(BaseParser, ABC):
         columns = [129, 493]
 
         percentagePattern = r"^\d{1,3}(\.\d{2})?%$"
-        tables: [pandas.DataFrame] = tabula.io.read_pdf(
-            self.filePath,
+        tables: [pandas.DataFrame] = self.readTables(
             area=extraction_area,
             pages='all', guess=False, pandas_options={'header': None},
             stream=True, silent=True,
             columns=columns, multiple_tables=True)
-        for index, table in enumerate(tables):
-            for row_index, row in table.iterrows():
-                if isinstance(row.iloc[2], str) and re.match(percentagePattern, row.iloc[2]):
-                    self.nameList.append(row.iloc[1])
+        frame = TableOps.combined(tables, 3)
+        isScheme = TableOps.isText(frame[2]) & TableOps.matchMask(frame[2], percentagePattern)
+        self.nameList += frame[1][isScheme].tolist()
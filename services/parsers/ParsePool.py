@@ -0,0 +1,68 @@
+"""
+Statement parsing on a pool of processes. Tabula and PyMuPDF parsing is CPU bound, so files are parsed in parallel
+across cores while downloads, Drive uploads and database writes stay in the web process.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from enums.StatementPatternEnum import StatementPatternEnum
+from services.parsers.HDFC_Credit import HDFCMilleniaParse
+from services.parsers.HDFC_Debit import HDFCDebitParser
+from services.parsers.ICICI_Amazon_Credit import ICICICreditCardStatementParser
+from services.parsers.YES_Credit import YESBankCreditParser
+from services.parsers.YES_Debit import YESBankDebitParser
+
+STATEMENT_PARSE_WORKERS = int(os.getenv('STATEMENT_PARSE_WORKERS', os.cpu_count() or 1))
+
+_pool = None
+_poolLock = threading.Lock()
+
+
+class StatementParseError(Exception):
+    """A statement could not be parsed at all, e.g. a missing or wrong password or a table engine failure."""
+
+
+def parserForBank(bank):
+    # Define a mapping of StatementPatternEnum values to parser classes
+    parser_mapping = {
+        StatementPatternEnum.YES_BANK_DEBIT: YESBankDebitParser,
+        StatementPatternEnum.YES_BANK_ACE: YESBankCreditParser,
+        StatementPatternEnum.ICICI_AMAZON_PAY: ICICICreditCardStatementParser,
+        StatementPatternEnum.HDFC_DEBIT: HDFCDebitParser,
+        StatementPatternEnum.Millenia_Credit: HDFCMilleniaParse
+    }
+    return parser_mapping.get(getattr(StatementPatternEnum, bank))()
+
+
+def parseStatement(content, fileName, bank, password, spillDir):
+    """
+    Runs in a pool process.
+    :return: The transactions of the statement in `content`
+    :raises StatementParseError: When the parse failed before it found any transaction
+    """
+    parser = parserForBank(bank)
+    parser.setContent(content, fileName, spillDir)
+    parser.setPassword(password)
+    try:
+        transactions = parser.parseFile()
+        if parser.parseError is not None and not transactions:
+            raise StatementParseError(f"Could not parse {fileName}. {parser.parseError}")
+        return transactions
+    finally:
+        parser.releaseContent()
+
+
+def submitParse(content, fileName, bank, password, spillDir):
+    """
+    :param spillDir: Directory of the job, the statement is written there if its parser needs a path
+    :return: Future of the transaction list of the statement
+    """
+    global _pool
+    with _poolLock:
+        if _pool is None:
+            # Spawned, not forked: the web process runs threads, which a forked child would inherit mid-flight
+            _pool = ProcessPoolExecutor(max_workers=STATEMENT_PARSE_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool.submit(parseStatement, content, fileName, bank, password, spillDir)
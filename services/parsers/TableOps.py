@@ -0,0 +1,49 @@
+"""
+Column operations the parsers classify tabula rows with. Each works on a whole DataFrame column at once and matches
+what the parsers used to do per row with `re.match`, `float(str(...).replace(',', ''))` and `math.isnan`.
+"""
+import pandas as pd
+
+
+def asText(series):
+    """The column as strings, exactly like `str(value)` per row."""
+    return series.map(str).astype(object)
+
+
+def isText(series):
+    """True where the cell holds a string, like `type(value) == str`."""
+    return series.map(lambda value: isinstance(value, str)).astype(bool)
+
+
+def matchMask(series, pattern):
+    """True where `re.match(pattern, str(value))` matches."""
+    return asText(series).str.match(pattern, na=False).astype(bool)
+
+
+def toAmounts(series):
+    """`float(str(value).replace(',', ''))` for the whole column, NaN where that would fail."""
+    return pd.to_numeric(asText(series).str.replace(',', '', regex=False), errors='coerce').astype(float)
+
+
+def isAmount(series):
+    """True where `float(str(value).replace(',', ''))` succeeds, missing cells read as NaN like they do per row."""
+    return series.isna() | toAmounts(series).notna()
+
+
+def combined(tables, width):
+    """
+    The tables stacked into one frame with at least `width` positional columns, indexed by (table, row label) so
+    neighbours can still be looked up per table.
+    """
+    if not tables:
+        return pd.DataFrame(columns=range(width))
+    return pd.concat([table.reindex(columns=range(max(width, len(table.columns)))) for table in tables],
+                     keys=range(len(tables)))
+
+
+def tableWidths(tables):
+    """Column count of the table every row of `combined(tables, ...)` came from."""
+    if not tables:
+        return pd.Series(dtype=int)
+    return pd.concat([pd.Series(len(table.columns), index=table.index, dtype=int) for table in tables],
+                     keys=range(len(tables)))
@@ -2,13 +2,13 @@ import re
 from abc import ABC
 
 import pandas
-import tabula
 
 from services.parsers.Base_Parser import BaseParser
 from utils.GenericUtils import GenericUtil
 
 
 class YESBankCreditParser(BaseParser, ABC):
+    tableEngine = 'fitz'
 
     def __init__(self):
         super().__init__(name=__name__)
@@ -19,8 +19,8 @@ class YESBankCreditParser(BaseParser, ABC):
         columns = [96, 485, 650]
         for i in range(1, 1000):
             try:
-                tables += tabula.io.read_pdf(
-                    self.filePath, guess=True, silent=True,
+                tables += self.readTables(
+                    guess=True, silent=True,
                     area=extraction_area, stream=True,
                     pages=f'{i}',
                     password=self.password, pandas_options={'header': None}, columns=columns, multiple_tables=True)
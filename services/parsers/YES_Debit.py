@@ -1,15 +1,13 @@
-import math
-import re
 from abc import ABC
 
 import pandas
-import tabula
 
+from services.parsers import TableOps
 from services.parsers.Base_Parser import BaseParser
-from utils.GenericUtils import GenericUtil
 
 
 class YESBankDebitParser(BaseParser, ABC):
+    tableEngine = 'fitz'
 
     def __init__(self):
         super().__init__(name=__name__)
@@ -19,8 +17,8 @@ class YESBankDebitParser(BaseParser, ABC):
         columns = [92, 144, 282, 354, 420, 482, 700]
         extraction_area = [250, 44, 800, 700]
         try:
-            tables: [pandas.core.frame.DataFrame] = tabula.io.read_pdf(
-                self.filePath, guess=True,
+            tables: [pandas.core.frame.DataFrame] = self.readTables(
+                guess=True,
                 area=extraction_area, stream=True,
                 pages="all", silent=True,
                 password=self.password, pandas_options={'header': None}, columns=columns, multiple_tables=True)
@@ -32,42 +30,35 @@ class YESBankDebitParser(BaseParser, ABC):
         dateRegex: str = r'\b(0[1-9]|[12][0-9]|3[01])/(0[1-9]|1[0-2])/\d{4}\b'
         try:
             # pandas.set_option('display.max_columns', 7)   #For debugging only.
-            firstColP1 = False
-            firstColP2 = False
-            for index, table in enumerate(tables):
-                for innerIndex, row in table.iterrows():
-                    try:
-                        if str(row[0]).strip() == "Transaction":
-                            firstColP1 = True
-                        elif firstColP1 and str(row[0]).strip() == "Date":
-                            firstColP2 = True
-                        if str(row[0]).strip() == "Opening Ba":
-                            return
-                        date = row[0]
-                        if firstColP1 and firstColP2 and re.match(dateRegex, str(date).strip()):
-                            desc = row[2]
-                            amount = 0.0
-                            if type(row[4]) == str and type(row[5]) == str:
-                                crAmount = float(str(row[5]).replace(",", ''))
-                                dbAmount = float(str(row[4]).replace(",", ''))
-                                if dbAmount == 0.0:
-                                    amount = -1 * crAmount
-                                else:
-                                    amount = dbAmount
-                            if type(desc) != str and math.isnan(desc):
-                                if innerIndex - 1 > 0 and type(table.iloc[innerIndex - 1][2]) == str:
-                                    desc = table.iloc[innerIndex - 1][2]
-                                if innerIndex + 1 < len(table) and type(table.iloc[innerIndex + 1][2]) == str:
-                                    desc += table.iloc[innerIndex + 1][2]
-                            self._transactionList.append(
-                                {'reference': GenericUtil().generate_reference_id(date, desc, amount),
-                                 'date': date,
-                                 'description': desc,
-                                 'amount': amount
-                                 })
-                    except Exception as ex:
-                        self.logging.error(f"Error {ex}")
-                        continue
+            frame = TableOps.combined(tables, 6)
+            firstColumn = TableOps.asText(frame[0]).str.strip()
+            position = pandas.Series(range(len(frame)), index=frame.index)
+            # Transactions sit below the two line "Transaction / Date" header and end at the opening balance
+            headerStart = position[firstColumn == "Transaction"].min()
+            headerEnd = position[(firstColumn == "Date") & (position > headerStart)].min()
+            end = position[firstColumn == "Opening Ba"].min()
+            inTable = (position > headerEnd) & ~(position >= end)
+            isTransaction = inTable & TableOps.matchMask(firstColumn, dateRegex)
+
+            # Both amount columns are filled on a transaction line, a zero withdrawal means a (negative) deposit
+            bothFilled = TableOps.isText(frame[4]) & TableOps.isText(frame[5])
+            debit, credit = TableOps.toAmounts(frame[4]), TableOps.toAmounts(frame[5])
+            amounts = debit.where(debit != 0, -1 * credit).where(bothFilled, 0.0)
+            unreadable = bothFilled & ~(TableOps.isAmount(frame[4]) & TableOps.isAmount(frame[5]))
+
+            # A description that wrapped leaves the transaction line empty, it is on the lines around it instead
+            rowInTable = frame.groupby(level=0).cumcount()
+            previous = frame[2].groupby(level=0).shift(1)
+            following = frame[2].groupby(level=0).shift(-1)
+            descriptions = frame[2]
+            usePrevious = descriptions.isna() & (rowInTable >= 2) & TableOps.isText(previous)
+            useFollowing = descriptions.isna() & TableOps.isText(following)
+            descriptions = descriptions.where(~usePrevious, previous)
+            descriptions = descriptions.where(~(usePrevious & useFollowing), descriptions + following)
+            # A description cannot continue on the next line when nothing was found above
+            isTransaction &= ~unreadable & ~(useFollowing & ~usePrevious)
+
+            self.appendTransactions(frame[0][isTransaction], descriptions[isTransaction], amounts[isTransaction])
         except Exception as ex:
             self.logging.error(f"Error reading tables in Yes Bank Debit. {ex}")
 
@@ -22,8 +22,8 @@ class CheckMailTask(BaseTask):
             if not self.user_id:
                 self.logger.error("User ID not found. Stopping task")
                 return "No userid", "Failed", self.interval
-            # Just scanning the entire fcking month
-            read, conflicts = self.transactionService.readTransactionFromMail(None, None, self.user_id)
+            # Only reads the alerts that arrived since the previous run
+            read, conflicts = self.transactionService.syncTransactionsFromMail(self.user_id)
             return f"{read} emails read. {conflicts} conflicts", "Completed", self.interval
         except Exception as ex:
             return ex.__str__(), "Failed", self.interval
\ No newline at end of file
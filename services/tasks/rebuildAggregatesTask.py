@@ -0,0 +1,26 @@
+from services.tasks.baseTask import BaseTask
+from utils.logger import Logger
+
+
+class RebuildAggregatesTask(BaseTask):
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(RebuildAggregatesTask, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, title, priority):
+        if not hasattr(self, 'initialized'):  # Prevent multiple initializations
+            super().__init__(title, priority)
+            self.logger = Logger(__name__).get_logger()
+            # One off, only runs when started from the jobs page
+            self.interval = None
+
+    def run(self):
+        try:
+            # Rebuilds for the user who started it, or everyone for global jobs
+            self.transactionService.rebuildAggregates(self.user_id)
+            return "Daily rollup and monthly spend rebuilt", "Completed", self.interval
+        except Exception as ex:
+            return ex.__str__(), "Failed", self.interval
@@ -19,6 +19,7 @@ from services.tasks.SetGoldRate import SetGoldRate
 from services.tasks.SetPpfRate import SetPPFRate
 from services.tasks.checkMailTask import CheckMailTask
 from services.tasks.checkStatementsTask import CheckStatementTask
+from services.tasks.rebuildAggregatesTask import RebuildAggregatesTask
 from utils.logger import Logger
 
 
@@ -106,7 +107,8 @@ class TaskScheduler:
             "SetPPFRate": SetPPFRate,
             "CheckMail": CheckMailTask,
             "CheckStatement": CheckStatementTask,
-            "InvestmentHistoryTask": InvestmentHistoryTask
+            "InvestmentHistoryTask": InvestmentHistoryTask,
+            "RebuildAggregates": RebuildAggregatesTask
         }
         return task_mapping.get(title)
 
@@ -0,0 +1,81 @@
+"""
+`TransactionService.insertTransactions` on SQLite: duplicates within one batch, rows already stored and rows a
+concurrent writer stores between the duplicate check and the bulk write must all be counted as integrity errors, and
+every other row must be written with its search tokens and rollup.
+"""
+import datetime
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import models.investmentHistory  # noqa: F401, mapped here only, the User relationships need it
+from models import Base, DailyRollup, Transactions, TransactionForReview, TransactionSearchToken, User
+from services.transactionsService import TransactionService
+from utils.DotDict import DotDict
+
+USER = 'user-1'
+BANK = 'HDFC_DEBIT'
+
+
+def transaction(index, amount=100):
+    return {'reference': f"ref-{index:04d}", 'date': f"{index % 28 + 1:02d}/01/2024",
+            'description': f"UPI/SWIGGY {index}", 'amount': amount}
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'transactions.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.execute(insert(User), [{'userID': USER, 'email': 'user-1@example.com'}])
+    session.commit()
+    with Flask(__name__).app_context():
+        g.db = DotDict({'session': session})
+        yield session
+    session.close()
+    engine.dispose()
+
+
+def insertBatch(transactions, conflicts=()):
+    return TransactionService().insertTransactions(transactions, BANK, USER, list(conflicts), 'Email')
+
+
+def test_duplicates_within_one_batch_are_counted(session):
+    batch = [transaction(index) for index in range(10)] + [transaction(3), transaction(7), transaction(3)]
+    assert insertBatch(batch) == 3
+    assert session.query(Transactions).count() == 10
+    assert sum(count for count, in session.query(DailyRollup.transactionCount)) == 10
+    assert session.query(TransactionSearchToken).filter_by(user=USER).count() > 0
+
+
+def test_reinserting_a_statement_counts_every_stored_row(session):
+    assert insertBatch([transaction(index) for index in range(10)], ['conflict 1']) == 0
+    assert insertBatch([transaction(index) for index in range(5, 15)], ['conflict 1', 'conflict 2']) == 5
+    assert session.query(Transactions).count() == 15
+    assert sorted(conflict for conflict, in session.query(TransactionForReview.conflict)) == ['conflict 1',
+                                                                                               'conflict 2']
+    assert sum(count for count, in session.query(DailyRollup.transactionCount)) == 15
+
+
+def test_rows_written_after_the_duplicate_check_are_settled_row_by_row(session, monkeypatch):
+    racer = create_engine(session.get_bind().url)
+    bulkInsert = session.execute
+
+    def execute(statement, *args, **kwargs):
+        # Another worker stores two of the rows between the IN query and the bulk insert
+        if getattr(statement, 'is_insert', False) and statement.table.name == Transactions.__tablename__:
+            with racer.begin() as connection:
+                connection.execute(insert(Transactions), [
+                    {'referenceID': f"ref-{index:04d}", 'date': datetime.date(2024, 1, 1), 'details': 'racer',
+                     'amount': 1, 'tag': '', 'fileID': None, 'source': 'Email', 'bank': BANK, 'user': USER}
+                    for index in (2, 4)])
+        return bulkInsert(statement, *args, **kwargs)
+
+    monkeypatch.setattr(session, 'execute', execute)
+    assert insertBatch([transaction(index) for index in range(6)]) == 2
+    racer.dispose()
+    assert session.query(Transactions).count() == 6
+    # Only the rows this call wrote reach the rollup
+    assert sum(count for count, in session.query(DailyRollup.transactionCount)) == 4
@@ -0,0 +1,107 @@
+"""
+Cursor pagination of `FilterSpec.fetchKeysetPage` on SQLite: walking every page must return each row exactly once in
+the order of the offset pages, and a cursor must keep its place when rows are inserted while a client pages.
+"""
+import datetime
+import random
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+import models.investmentHistory  # noqa: F401, mapped here only, the User relationships need it
+from models import Base, FileDetails, Transactions, User
+from utils.FilterSpec import FilterSpec
+
+USER = 'user-1'
+FIRST_DAY = datetime.date(2024, 1, 1)
+COLUMNS = ['referenceID', 'date', 'amount', 'tag']
+
+
+def transactionRow(index, day):
+    return {'referenceID': f"{index:08d}", 'date': FIRST_DAY + datetime.timedelta(days=day), 'details': f"row {index}",
+            'amount': index % 200 - 100, 'tag': None if index % 3 == 0 else f"tag-{index % 4}", 'fileID': None,
+            'source': 'Email', 'bank': 'HDFC', 'user': USER}
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    generator = random.Random(0)
+    with Session(engine) as session:
+        session.execute(insert(User), [{'userID': USER, 'email': 'user-1@example.com'},
+                                       {'userID': 'user-2', 'email': 'user-2@example.com'}])
+        # Ten days for 103 rows, every sort value is shared by several rows
+        session.execute(insert(Transactions), [transactionRow(index, generator.randrange(10)) for index in range(103)])
+        session.execute(insert(Transactions), [{**transactionRow(1000, 0), 'user': 'user-2'}])
+        session.execute(insert(FileDetails), [{'fileID': f"file-{index:03d}", 'uploadDate': FIRST_DAY,
+                                               'fileName': f"statement {index}.pdf", 'fileSize': '1 KB',
+                                               'statementCount': 1, 'bank': 'HDFC', 'user': USER}
+                                              for index in range(23)])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def walk(session, filterSpec, pageSize, cursor=''):
+    """:return: [page keys] of every page from `cursor` to the last one"""
+    pages = []
+    while cursor is not None:
+        rows, _, cursor = filterSpec.fetchKeysetPage(session, cursor, pageSize)
+        pages.append([filterSpec._value(row, filterSpec.keyColumn.key) for row in rows])
+    return pages
+
+
+def offsetKeys(session, filterSpec):
+    rows, _ = filterSpec.fetchPage(session, 1, 1000)
+    return [filterSpec._value(row, filterSpec.keyColumn.key) for row in rows]
+
+
+@pytest.mark.parametrize('sortedBy', [None, {'column': 'date', 'order': 'desc'}, {'column': 'date', 'order': 'asc'},
+                                      {'column': 'tag', 'order': 'asc'}, {'column': 'referenceID', 'order': 'desc'}])
+def test_cursor_pages_have_no_duplicates_or_gaps(session, sortedBy):
+    filterSpec = FilterSpec.forTransactions({'sorted': sortedBy} if sortedBy else {}, 'sqlite', USER, COLUMNS)
+    pages = walk(session, filterSpec, 10)
+    keys = [key for page in pages for key in page]
+    assert len(keys) == len(set(keys)) == 103
+    assert all(len(page) == 10 for page in pages[:-1])
+    if sortedBy and sortedBy['column'] != 'tag':
+        # The tie-breaker is the key in the sort direction, which the offset query leaves to the database
+        tieBreaker = [Transactions.referenceID.desc() if sortedBy['order'] == 'desc' else Transactions.referenceID]
+        ordered = session.query(Transactions.referenceID).filter_by(user=USER) \
+            .order_by(*filterSpec.orderBy, *tieBreaker).all()
+        assert keys == [row.referenceID for row in ordered]
+    else:
+        assert sorted(keys) == sorted(offsetKeys(session, filterSpec))
+
+
+def test_cursor_keeps_its_place_across_inserts(session):
+    filterSpec = FilterSpec.forTransactions({'sorted': {'column': 'date', 'order': 'desc'}}, 'sqlite', USER, COLUMNS)
+    firstPage, _, cursor = filterSpec.fetchKeysetPage(session, '', 10)
+    lastSeen = firstPage[-1]
+    # Rows sorting before the cursor must not push seen rows onto the next page, rows after it must show up
+    session.execute(insert(Transactions), [transactionRow(index, 20) for index in range(500, 505)] +
+                    [transactionRow(index, -1) for index in range(600, 605)])
+    session.commit()
+    following = [key for page in walk(session, filterSpec, 10, cursor) for key in page]
+    seen = {row['referenceID'] for row in firstPage}
+    assert not seen & set(following)
+    assert len(following) == 103 - 10 + 5
+    assert {f"{index:08d}" for index in range(600, 605)} <= set(following)
+    assert all(session.get(Transactions, key).date <= lastSeen['date'] for key in following)
+
+
+def test_file_detail_cursor_pages_cover_every_file(session):
+    filterSpec = FilterSpec.forFileDetails({'sorted': {'column': 'uploadDate', 'order': 'desc'}}, USER)
+    pages = walk(session, filterSpec, 5)
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert [key for page in pages for key in page] == [f"file-{index:03d}" for index in reversed(range(23))]
+
+
+def test_cursor_of_another_sort_order_is_rejected(session):
+    byDate = FilterSpec.forTransactions({'sorted': {'column': 'date', 'order': 'desc'}}, 'sqlite', USER, COLUMNS)
+    _, _, cursor = byDate.fetchKeysetPage(session, '', 10)
+    byTag = FilterSpec.forTransactions({'sorted': {'column': 'tag', 'order': 'desc'}}, 'sqlite', USER, COLUMNS)
+    with pytest.raises(ValueError):
+        byTag.fetchKeysetPage(session, cursor, 10)
@@ -0,0 +1,102 @@
+"""
+The daily rollup must stay equal to `rebuildDailyRollup` through every write of `TransactionService`: inserts, amount
+updates, deleting a statement's transactions and adding or removing its file details. Checked on SQLite through the
+native upsert and through the update-then-insert fallback used by dialects without one.
+"""
+import datetime
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import models.investmentHistory  # noqa: F401, mapped here only, the User relationships need it
+from models import Base, DailyRollup, User
+from services.AggregateService import AggregateService
+from services.transactionsService import TransactionService
+from utils.DateTimeUtil import DateTimeUtil
+from utils.DotDict import DotDict
+
+USER = 'user-1'
+BANK = 'HDFC_DEBIT'
+UPLOAD_DAY = datetime.date(2024, 1, 20)
+
+
+def transaction(index, amount):
+    return {'reference': f"ref-{index:04d}", 'date': f"{index % 5 + 1:02d}/01/2024",
+            'description': f"UPI/SWIGGY {index}", 'amount': amount}
+
+
+@pytest.fixture(params=['upsert', 'update then insert'])
+def session(request, monkeypatch):
+    if request.param == 'update then insert':
+        monkeypatch.setattr(AggregateService, '_upsertStatement', staticmethod(lambda *args: None))
+    # SQLite only binds date objects to Date columns, the upload date is a string for MySQL otherwise
+    monkeypatch.setattr(DateTimeUtil, 'getCurrentDatetimeSqlFormat', staticmethod(lambda: UPLOAD_DAY))
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.execute(insert(User), [{'userID': USER, 'email': 'user-1@example.com'}])
+    session.commit()
+    with Flask(__name__).app_context():
+        g.db = DotDict({'session': session})
+        yield session
+    session.close()
+    engine.dispose()
+
+
+def rollup(session):
+    """:return: {(user, day): (transactions, debit sum, credit sum, statements)} of the non empty rollup rows"""
+    return {(row.user, row.day): (row.transactionCount, row.debitSum, row.creditSum, row.statementCount)
+            for row in session.query(DailyRollup) if row.transactionCount or row.statementCount}
+
+
+def assertMatchesRebuild(session):
+    maintained = rollup(session)
+    AggregateService().rebuildDailyRollup(session)
+    assert maintained == rollup(session)
+    return maintained
+
+
+def test_inserts_upsert_one_row_per_day(session):
+    service = TransactionService()
+    service.insertTransactions([transaction(index, 100 - index * 10) for index in range(20)], BANK, USER, [], 'Email')
+    service.insertTransactions([transaction(index, -25) for index in range(20, 30)], BANK, USER, [], 'Email')
+    maintained = assertMatchesRebuild(session)
+    assert len(maintained) == 5
+    assert sum(counts[0] for counts in maintained.values()) == 30
+
+
+def test_amount_update_moves_the_sums(session):
+    service = TransactionService()
+    service.insertTransactions([transaction(index, 50) for index in range(10)], BANK, USER, [], 'Email')
+    service.updateTransaction('ref-0000', {'amount': -80})
+    service.updateTransaction('ref-0005', {'tag': 'Food'})
+    maintained = assertMatchesRebuild(session)
+    assert maintained[(USER, datetime.date(2024, 1, 1))][1:3] == (50, -80)
+
+
+def test_deleting_a_statement_takes_its_transactions_and_file_out(session):
+    service = TransactionService()
+    service.insertFileDetails('file-1', 'statement.pdf', 10, BANK, USER, '1 KB', session=session)
+    service.insertTransactions([transaction(index, 10) for index in range(10)], BANK, USER, [], 'Statement',
+                               fileId='file-1')
+    service.insertTransactions([transaction(index, 30) for index in range(10, 13)], BANK, USER, [], 'Email')
+    assert rollup(session)[(USER, UPLOAD_DAY)] == (0, 0, 0, 1)
+    assertMatchesRebuild(session)
+
+    # Transactions first, deleting the file details row first sets the fileID of its transactions to NULL
+    service.deleteTransactionsFromAFile('file-1', USER)
+    service.deleteFileDetails('file-1', session=session)
+    maintained = assertMatchesRebuild(session)
+    assert (USER, UPLOAD_DAY) not in maintained
+    assert sum(counts[0] for counts in maintained.values()) == 3
+
+
+def test_calendar_reads_the_maintained_rollup(session):
+    service = TransactionService()
+    service.insertTransactions([transaction(index, 10) for index in range(3)], BANK, USER, [], 'Email')
+    service.insertFileDetails('file-1', 'statement.pdf', 3, BANK, USER, '1 KB', session=session)
+    calendar = service.fetchTransactionDates(USER, datetime.date(2024, 1, 1), datetime.date(2024, 1, 31))
+    assert calendar['transaction_dates'] == ['2024-01-01', '2024-01-02', '2024-01-03']
+    assert calendar['statement_dates'] == ['2024-01-20']
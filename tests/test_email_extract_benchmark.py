@@ -0,0 +1,32 @@
+"""
+Throughput of reading transaction alerts, measured with pytest-benchmark. The compiled matchers and the resolved date
+format cache must return exactly what the per-email implementation they replaced returns.
+
+    python -m pytest tests/test_email_extract_benchmark.py --benchmark-only
+"""
+import pytest
+
+from benchmarks.EmailExtractBenchmark import ALERTS, baselineConvert, baselineExtract, snippets
+from utils.DateTimeUtil import DateTimeUtil
+from utils.GenericUtils import GenericUtil
+
+SNIPPETS = 2000
+CONFLICT_RATE = 0.02
+
+
+@pytest.mark.parametrize('bank', list(ALERTS))
+def test_extract_details_time(benchmark, bank):
+    alerts = snippets(bank, SNIPPETS, CONFLICT_RATE)
+    expected = baselineExtract(alerts, bank)
+    assert benchmark(GenericUtil().extractDetailsFromEmail, alerts, bank) == expected
+
+
+@pytest.mark.parametrize('bank', list(ALERTS))
+def test_convert_date_time(benchmark, bank):
+    search = GenericUtil.getEmailMatcher(bank).search
+    dates = [match.group('transaction_date') for match in map(search, snippets(bank, SNIPPETS, 0)) if match]
+    expected = [baselineConvert(date, bank) for date in dates]
+    # Start from an empty format cache, the first alert of every shape pays for resolving it
+    DateTimeUtil._resolved_formats.clear()
+    convert = DateTimeUtil().convert_to_sql_datetime
+    assert benchmark(lambda: [convert(date, bank) for date in dates]) == expected
@@ -0,0 +1,50 @@
+"""
+Batched snippet reads through the real Gmail API client against the local fake server of
+`benchmarks.GmailFetchBenchmark`, measured with pytest-benchmark. Covers the multipart batch request and the per
+message fallback with its retries.
+
+    python -m pytest tests/test_gmail_fetch_benchmark.py --benchmark-only
+"""
+import threading
+
+import pytest
+
+from benchmarks.GmailFetchBenchmark import FakeGmailServer, batched, gmailClient, perMessage
+
+MESSAGES = 250
+PAGE_SIZE = 100
+
+
+@pytest.fixture
+def server(request):
+    server = FakeGmailServer(MESSAGES, latency=0.001, failing=getattr(request, 'param', 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def snippets(server):
+    return [message['snippet'] for message in server.mailbox]
+
+
+def test_batched_fetch_time(benchmark, server):
+    gmail, credentials = gmailClient(server)
+    assert benchmark(batched, gmail, credentials, PAGE_SIZE) == snippets(server)
+    # Every round lists three pages and sends one batch of gets per page, nothing is fetched on its own
+    assert server.roundTrips == 2 * server.batches
+
+
+@pytest.mark.parametrize('server', [3], indirect=True)
+def test_failed_batch_items_are_fetched_on_their_own(server):
+    gmail, credentials = gmailClient(server)
+    assert batched(gmail, credentials, PAGE_SIZE) == snippets(server)
+    # Every failing message failed in its batch, then once on its own before the retry served it
+    assert server.retried == 3
+    assert server.roundTrips == 3 + 3 + 3 * 2
+
+
+def test_per_message_fetch_reads_the_same_snippets(server):
+    gmail, credentials = gmailClient(server)
+    assert perMessage(gmail, credentials, PAGE_SIZE) == snippets(server)
+    assert server.roundTrips == 3 + MESSAGES
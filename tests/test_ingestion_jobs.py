@@ -0,0 +1,73 @@
+"""
+Ingestion job bookkeeping: jobs cut off by a restart are failed at startup, and statement reads count every listed
+mail in `messagesListed` like mail reads do.
+"""
+import datetime
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import models.investmentHistory  # noqa: F401, mapped here only, the User relationships need it
+from enums.MessageOutcomeEnum import MessageOutcomeEnum
+from enums.TaskStatusEnum import JobStatus
+from models import Base, IngestionJob, ProcessedMessage, User
+from services.IngestionJobService import IngestionJobService
+from services.transactionsService import TransactionService
+from utils.DotDict import DotDict
+
+USER = 'user-1'
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.execute(insert(User), [{'userID': USER, 'email': 'user-1@example.com'}])
+    session.commit()
+    with Flask(__name__).app_context():
+        g.db = DotDict({'session': session})
+        yield session
+    session.close()
+    engine.dispose()
+
+
+def test_jobs_left_pending_or_running_fail_at_startup(session):
+    now = datetime.datetime.now()
+    session.execute(insert(IngestionJob), [
+        {'id': status.name, 'user': USER, 'kind': 'statement', 'status': status.value, 'createdAt': now,
+         'messagesListed': 0, 'filesParsed': 0, 'rowsInserted': 0, 'conflicts': 0}
+        for status in (JobStatus.PENDING, JobStatus.RUNNING, JobStatus.COMPLETED, JobStatus.FAILED)])
+    session.commit()
+    assert IngestionJobService().failOrphanedJobs(session.get_bind()) == 2
+    session.expire_all()
+    statuses = {job.id: job.status for job in session.query(IngestionJob)}
+    assert statuses == {'PENDING': 'Failed', 'RUNNING': 'Failed', 'COMPLETED': 'Completed', 'FAILED': 'Failed'}
+    assert session.get(IngestionJob, 'RUNNING').finishedAt is not None
+
+
+def test_statement_read_counts_listed_mails(session, monkeypatch):
+    service = TransactionService()
+    entries = [
+        {'fileName': None, 'content': None, 'messageId': 'mail-1', 'attachmentId': '',
+         'outcome': MessageOutcomeEnum.Empty},
+        {'fileName': None, 'content': None, 'messageId': 'mail-2', 'attachmentId': '1',
+         'outcome': MessageOutcomeEnum.Failed},
+        {'fileName': None, 'content': None, 'messageId': 'mail-2', 'attachmentId': '',
+         'outcome': MessageOutcomeEnum.Complete},
+    ]
+    monkeypatch.setattr(service, 'fetchGmailTokenForUser', lambda userID: {})
+    monkeypatch.setattr(service, 'fetchDriveTokenForUser', lambda userID: {})
+    monkeypatch.setattr(service.gmailService, 'downloadFilesInRange', lambda *args: iter(entries))
+    counts = {}
+
+    def progress(**reported):
+        for counter, count in reported.items():
+            counts[counter] = counts.get(counter, 0) + count
+
+    service.readStatementsFromMail('2024-02-01', '2024-01-01', USER, 'YES_BANK_DEBIT', progress)
+    assert counts == {'messagesListed': 2}
+    recorded = {(row.messageId, row.attachmentId): row.outcome for row in session.query(ProcessedMessage)}
+    assert recorded == {('mail-1', ''): 'empty', ('mail-2', '1'): 'failed', ('mail-2', ''): 'complete'}
@@ -0,0 +1,140 @@
+"""
+The message ledger per (messageId, attachmentId): a statement mail is only skipped once its own entry is recorded and
+none of its attachments failed, and the statement downloader hands over an outcome for every mail or attachment that
+has no statement in it.
+"""
+import base64
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+import models.investmentHistory  # noqa: F401, mapped here only, the User relationships need it
+from enums.MessageOutcomeEnum import MessageOutcomeEnum
+from models import Base, User
+from services import StatementDownloadService as downloadModule
+from services.MessageLedgerService import MessageLedgerService
+from services.StatementDownloadService import StatementDownloadService
+
+USER = 'user-1'
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(User), [{'userID': USER, 'email': 'user-1@example.com'}])
+        yield session
+    engine.dispose()
+
+
+def test_statement_mail_is_skipped_once_its_own_entry_is_recorded(session):
+    ledger = MessageLedgerService()
+    # Scan cut short after the first attachment of mail-1
+    ledger.record(session, USER, [('mail-1', '1', MessageOutcomeEnum.Inserted)])
+    ledger.record(session, USER, [('mail-2', '1', MessageOutcomeEnum.Duplicate),
+                                  ('mail-2', '2', MessageOutcomeEnum.Failed),
+                                  ('mail-2', '', MessageOutcomeEnum.Complete),
+                                  ('mail-3', '', MessageOutcomeEnum.Empty),
+                                  ('mail-4', '', MessageOutcomeEnum.Failed)])
+    assert ledger.processedMessageIds(session, USER, ['mail-1', 'mail-2', 'mail-3', 'mail-4', 'mail-5']) == {'mail-3'}
+
+    skipAttachment = ledger.attachmentSkipper(session, USER)
+    assert skipAttachment('mail-1', '1') and skipAttachment('mail-2', '1')
+    assert not skipAttachment('mail-1', '2') and not skipAttachment('mail-2', '2')
+
+    # The retry of the failed attachment settles mail-2
+    ledger.record(session, USER, [('mail-2', '2', MessageOutcomeEnum.Inserted)])
+    assert ledger.processedMessageIds(session, USER, ['mail-2']) == {'mail-2'}
+
+
+class FakeCall:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeGmail:
+    """Answers messages().list with every mail of `mailbox` and messages().get with its payload."""
+
+    def __init__(self, mailbox):
+        self.mailbox = mailbox
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, q, maxResults):
+        return FakeCall({'messages': [{'id': messageId} for messageId in self.mailbox]})
+
+    def list_next(self, request, response):
+        return None
+
+    def get(self, userId, id):
+        return FakeCall(self.mailbox[id])
+
+
+def attachment(partId, content):
+    return {'partId': partId, 'filename': f"statement-{partId}.pdf",
+            'body': {'data': base64.urlsafe_b64encode(content).decode()}}
+
+
+def entries(files):
+    return [(file['messageId'], file['attachmentId'], file.get('outcome')) for file in files]
+
+
+def test_every_mail_without_a_statement_has_an_outcome():
+    gmail = FakeGmail({
+        'mail-1': {'payload': {'parts': [attachment('1', b'%PDF-1'), attachment('2', b'%PDF-2')]}},
+        'mail-2': {'payload': {'parts': [{'partId': '0', 'filename': '', 'body': {'data': ''}}]}},
+        'mail-3': ConnectionError("Gmail is unavailable"),
+        'mail-4': {'payload': {'parts': [{'partId': '3', 'filename': 'broken.pdf', 'body': {}}]}},
+    })
+    files = list(StatementDownloadService(gmailService=gmail).route_download_process(
+        'YES_BANK_DEBIT', '2024-02-01', '2024-01-01', skip_attachment=lambda messageId, partId: partId == '1'))
+    assert entries(files) == [
+        ('mail-1', '2', None), ('mail-1', '', MessageOutcomeEnum.Complete),
+        ('mail-2', '', MessageOutcomeEnum.Empty),
+        ('mail-3', '', MessageOutcomeEnum.Failed),
+        ('mail-4', '3', MessageOutcomeEnum.Failed), ('mail-4', '', MessageOutcomeEnum.Complete),
+    ]
+    assert files[0]['content'] == b'%PDF-2'
+
+
+def test_hdfc_mails_without_a_downloaded_statement_have_an_outcome(monkeypatch):
+    links = {'mail-1': 'https://link/1', 'mail-2': None, 'mail-3': 'https://link/3', 'mail-4': 'https://link/4',
+             'mail-5': ConnectionError("Gmail is unavailable")}
+
+    def extractLink(self, message):
+        if isinstance(links[message['id']], Exception):
+            raise links[message['id']]
+        return links[message['id']]
+
+    monkeypatch.setattr(StatementDownloadService, '_extract_smart_statement_link', extractLink)
+    monkeypatch.setattr(StatementDownloadService, '_parse_href',
+                        staticmethod(lambda link: None if link.endswith('4') else ['req', link[-1]]))
+
+    class Response:
+        def __init__(self, statusCode):
+            self.status_code = statusCode
+            self.content = b'%PDF'
+
+    monkeypatch.setattr(downloadModule.requests, 'post',
+                        lambda link, headers: Response(200 if 'jobkey=1' in link else 500))
+    gmail = FakeGmail({messageId: {} for messageId in links})
+    files = list(StatementDownloadService(gmailService=gmail).route_download_process(
+        'HDFC_DEBIT', '2024-02-01', '2024-01-01'))
+    assert entries(files) == [
+        ('mail-1', '', None),
+        ('mail-2', '', MessageOutcomeEnum.Empty),
+        ('mail-3', '', MessageOutcomeEnum.Failed),
+        ('mail-4', '', MessageOutcomeEnum.Failed),
+        ('mail-5', '', MessageOutcomeEnum.Failed),
+    ]
@@ -0,0 +1,98 @@
+"""
+The monthly spend table must stay equal to what `TransactionService.rebuildAggregates` computes from `Transactions`
+after inserts over several banks and months, tag and amount updates and deleting a statement's transactions.
+"""
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import models.investmentHistory  # noqa: F401, mapped here only, the User relationships need it
+from models import Base, MonthlySpend, User
+from services.AggregateService import AggregateService
+from services.transactionsService import TransactionService
+from utils.DotDict import DotDict
+
+USER = 'user-1'
+
+
+def transaction(index, amount):
+    return {'reference': f"ref-{index:04d}", 'date': f"{index % 28 + 1:02d}/{index % 3 + 1:02d}/2024",
+            'description': f"UPI/SWIGGY {index}", 'amount': amount}
+
+
+@pytest.fixture(params=['upsert', 'update then insert'])
+def session(request, monkeypatch):
+    if request.param == 'update then insert':
+        monkeypatch.setattr(AggregateService, '_upsertStatement', staticmethod(lambda *args: None))
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.execute(insert(User), [{'userID': USER, 'email': 'user-1@example.com'}])
+    session.commit()
+    with Flask(__name__).app_context():
+        g.db = DotDict({'session': session})
+        yield session
+    session.close()
+    engine.dispose()
+
+
+def spend(session):
+    """:return: {(user, month, bank, tag): (debit sum, credit sum, debit count, credit count)} of the non empty rows"""
+    return {(row.user, row.month, row.bank, row.tag): (row.debitSum, row.creditSum, row.debitCount, row.creditCount)
+            for row in session.query(MonthlySpend) if row.debitCount or row.creditCount}
+
+
+def assertMatchesRebuild(session):
+    maintained = spend(session)
+    TransactionService().rebuildAggregates(USER)
+    assert maintained == spend(session)
+    return maintained
+
+
+def insertStatement(service, bank, indexes, fileId=None):
+    service.insertTransactions([transaction(index, (index % 7 - 3) * 100) for index in indexes], bank, USER, [],
+                               'Statement' if fileId else 'Email', fileId=fileId)
+
+
+def test_inserts_fill_every_month_and_bank(session):
+    service = TransactionService()
+    insertStatement(service, 'HDFC_DEBIT', range(30))
+    insertStatement(service, 'YES_BANK_DEBIT', range(30, 50))
+    maintained = assertMatchesRebuild(session)
+    assert {key[1] for key in maintained} == {'2024-01', '2024-02', '2024-03'}
+    assert {key[2] for key in maintained} == {'HDFC_DEBIT', 'YES_BANK_DEBIT'}
+
+
+def test_tag_and_amount_updates_move_the_totals(session):
+    service = TransactionService()
+    insertStatement(service, 'HDFC_DEBIT', range(12))
+    service.updateTransaction('ref-0000', {'tag': 'Food'})
+    service.updateTransaction('ref-0001', {'tag': 'Travel', 'amount': 250})
+    service.updateTransaction('ref-0002', {'amount': -40})
+    maintained = assertMatchesRebuild(session)
+    assert maintained[(USER, '2024-01', 'HDFC_DEBIT', 'Food')] == (0, -300, 0, 1)
+    assert maintained[(USER, '2024-02', 'HDFC_DEBIT', 'Travel')] == (250, 0, 1, 0)
+
+
+def test_deleting_a_statement_removes_its_totals(session):
+    service = TransactionService()
+    insertStatement(service, 'HDFC_DEBIT', range(20), fileId='file-1')
+    insertStatement(service, 'YES_BANK_DEBIT', range(20, 26))
+    service.deleteTransactionsFromAFile('file-1', USER)
+    session.commit()
+    maintained = assertMatchesRebuild(session)
+    assert {key[2] for key in maintained} == {'YES_BANK_DEBIT'}
+
+
+def test_summary_adds_up_the_breakdowns(session):
+    service = TransactionService()
+    insertStatement(service, 'HDFC_DEBIT', range(30))
+    insertStatement(service, 'YES_BANK_DEBIT', range(30, 45))
+    summary = service.fetchSpendSummary(USER, '2024-01', '2024-03')
+    for month in summary.values():
+        for breakdown in ('by_tag', 'by_bank'):
+            assert sum(totals['debit_sum'] for totals in month[breakdown].values()) == month['debit_sum']
+            assert sum(totals['credit_count'] for totals in month[breakdown].values()) == month['credit_count']
+    assert sum(month['debit_count'] + month['credit_count'] for month in summary.values()) == \
+           sum(1 for index in range(45) if index % 7 != 3)
@@ -0,0 +1,45 @@
+"""
+One read of the statement per parse: on its default engine every parser opens the PDF once, decodes every page at
+most once per kind of text, and never falls back to tabula.
+"""
+from collections import Counter
+
+import fitz
+import pytest
+
+from benchmarks.SyntheticStatements import LAYOUTS, generate, parserFor
+from services.parsers import Base_Parser
+
+TRANSACTIONS = 120
+
+
+@pytest.mark.parametrize('layout', list(LAYOUTS))
+def test_statement_is_opened_and_decoded_once(layout, monkeypatch, tmp_path):
+    statement = generate(layout, TRANSACTIONS, 2)
+    opened, decoded = [], Counter()
+    openDocument, getText = fitz.open, fitz.Page.get_text
+
+    def countOpen(*args, **kwargs):
+        opened.append(args or kwargs)
+        return openDocument(*args, **kwargs)
+
+    def countText(page, option='text', **kwargs):
+        decoded[(page.number, option)] += 1
+        return getText(page, option, **kwargs)
+
+    def noTabula(*args, **kwargs):
+        raise AssertionError("tabula read a statement on its default engine")
+
+    monkeypatch.setattr(Base_Parser.fitz, 'open', countOpen)
+    monkeypatch.setattr(fitz.Page, 'get_text', countText)
+    monkeypatch.setattr(Base_Parser.tabula.io, 'read_pdf', noTabula)
+    monkeypatch.setattr(Base_Parser.BaseParser, '_engineOverride', None)
+    parser = parserFor(layout)
+    parser.setContent(statement.content, statement.fileName, str(tmp_path))
+    try:
+        assert parser.parseFile() == statement.expected
+    finally:
+        parser.releaseContent()
+    assert parser.parseError is None
+    assert len(opened) == 1
+    assert decoded and max(decoded.values()) == 1, decoded.most_common(3)
@@ -0,0 +1,34 @@
+"""
+Statement parsing on the spawned pool: a submitted statement comes back parsed, and the workers re-importing app.py
+as __mp_main__ do not build the app again.
+"""
+import runpy
+from pathlib import Path
+
+import pytest
+
+from benchmarks.SyntheticStatements import generate
+from services.parsers import ParsePool
+
+APP = Path(__file__).resolve().parent.parent / 'app.py'
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(ParsePool, 'STATEMENT_PARSE_WORKERS', 1)
+    monkeypatch.setattr(ParsePool, '_pool', None)
+    yield
+    if ParsePool._pool is not None:
+        ParsePool._pool.shutdown()
+
+
+def test_submitted_statement_is_parsed_in_a_worker(pool, tmp_path):
+    statement = generate('YES_BANK_DEBIT', 40, 0)
+    future = ParsePool.submitParse(statement.content, statement.fileName, 'YES_BANK_DEBIT', None, str(tmp_path))
+    assert future.result(timeout=120) == statement.expected
+
+
+def test_spawned_worker_does_not_build_the_app():
+    pytest.importorskip('flask_cors')
+    namespace = runpy.run_path(str(APP), run_name='__mp_main__')
+    assert 'Akkountant' in namespace and 'app' not in namespace
@@ -0,0 +1,28 @@
+"""
+Parse time of every statement layout on the synthetic statements, measured with pytest-benchmark. Every timed parse
+must also return the exact transaction list of its statement, so the suite doubles as the parser regression check.
+
+    python -m pytest tests/test_parser_benchmark.py --benchmark-only
+"""
+import pytest
+
+from benchmarks.ParserBenchmark import benchmarkLayout, firstDifference, parseTimed
+from benchmarks.SyntheticStatements import LAYOUTS, generate
+
+TRANSACTIONS = 200
+ROUNDS = 3
+
+
+@pytest.mark.parametrize('layout', list(LAYOUTS))
+def test_parse_time(benchmark, layout, tmp_path):
+    statement = generate(layout, TRANSACTIONS, 0)
+    benchmark.extra_info['pages'] = statement.pageCount
+    _, transactions = benchmark.pedantic(parseTimed, args=(statement, 'fitz', str(tmp_path)), rounds=ROUNDS)
+    assert transactions == statement.expected, firstDifference(statement.expected, transactions)
+
+
+@pytest.mark.parametrize('layout', list(LAYOUTS))
+def test_regression_check(layout):
+    # Other seeds and sizes than the timed statement, page breaks land on different rows
+    _, mismatches = benchmarkLayout(layout, files=3, transactions=45, repeat=1, engine='fitz')
+    assert not mismatches, "\n".join(mismatches)
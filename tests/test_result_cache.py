@@ -0,0 +1,63 @@
+"""
+`ResultCache`: least recently used eviction, TTL expiry, per user invalidation, and dropping values that were computed
+while their user was invalidated.
+"""
+import pytest
+
+from utils import ResultCache as resultCacheModule
+from utils.ResultCache import ResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resultCacheModule.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(maxEntries=2, ttlSeconds=60)
+    cache.put('user-1', 'a', 1)
+    cache.put('user-1', 'b', 2)
+    assert cache.get('user-1', 'a') == 1
+    cache.put('user-2', 'c', 3)
+    assert cache.get('user-1', 'b') is None
+    assert (cache.get('user-1', 'a'), cache.get('user-2', 'c')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size'] == 2
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResultCache(maxEntries=10, ttlSeconds=30)
+    cache.put('user-1', 'a', 1)
+    clock[0] += 29
+    assert cache.get('user-1', 'a') == 1
+    clock[0] += 2
+    assert cache.get('user-1', 'a') is None
+    assert cache.stats()['size'] == 0
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+
+def test_invalidation_drops_only_that_users_entries():
+    cache = ResultCache(maxEntries=10, ttlSeconds=60)
+    cache.put('user-1', 'a', 1)
+    cache.put('user-1', 'b', 2)
+    cache.put('user-2', 'a', 3)
+    cache.invalidateUser('user-1')
+    assert cache.get('user-1', 'a') is None and cache.get('user-1', 'b') is None
+    assert cache.get('user-2', 'a') == 3
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_value_computed_across_an_invalidation_is_not_cached():
+    cache = ResultCache(maxEntries=10, ttlSeconds=60)
+    generation = cache.generation('user-1')
+    # A write of user-1 commits while the value is computed
+    cache.invalidateUser('user-1')
+    cache.put('user-1', 'a', 'stale', generation)
+    assert cache.get('user-1', 'a') is None
+    assert cache.stats()['discards'] == 1
+
+    cache.put('user-1', 'a', 'fresh', cache.generation('user-1'))
+    cache.put('user-2', 'a', 'other', generation)
+    assert (cache.get('user-1', 'a'), cache.get('user-2', 'a')) == ('fresh', 'other')
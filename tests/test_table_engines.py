@@ -0,0 +1,28 @@
+"""
+Every parser on both table engines: a parser reads its tables with PyMuPDF ('fitz') only while it returns exactly
+what it returns on tabula for the same statement, and the parsers switched to it must stay switched.
+"""
+import shutil
+
+import pytest
+
+from benchmarks.ParserBenchmark import firstDifference, parseTimed
+from benchmarks.SyntheticStatements import LAYOUTS, generate, parserFor
+
+TRANSACTIONS = 60
+
+
+@pytest.mark.skipif(shutil.which('java') is None, reason="tabula needs a JVM")
+@pytest.mark.parametrize('layout', list(LAYOUTS))
+def test_fitz_reads_what_tabula_reads(layout, tmp_path):
+    statement = generate(layout, TRANSACTIONS, 1)
+    _, onTabula = parseTimed(statement, 'tabula', str(tmp_path))
+    _, onFitz = parseTimed(statement, 'fitz', str(tmp_path))
+    assert onTabula == statement.expected, firstDifference(statement.expected, onTabula)
+    assert onFitz == onTabula, firstDifference(onTabula, onFitz)
+
+
+@pytest.mark.parametrize('layout', list(LAYOUTS))
+def test_parser_defaults_to_fitz(layout, monkeypatch):
+    monkeypatch.setattr(parserFor(layout).__class__, '_engineOverride', None)
+    assert parserFor(layout).tableEngine == 'fitz'
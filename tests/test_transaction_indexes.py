@@ -0,0 +1,79 @@
+"""
+The user-scoped transaction queries must be served by their composite indexes. Runs EXPLAIN QUERY PLAN on SQLite over
+the tables as the models declare them, so a dropped index or a query that stops leading with `user` fails here instead
+of turning into a full scan in production.
+"""
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+
+import models.investmentHistory  # noqa: F401, mapped here only, the User relationships need it
+from models import Base, DailyRollup, Transactions
+from services.TransactionSearchService import TransactionSearchService
+from utils.FilterSpec import FilterSpec
+
+USER = 'user-1'
+DATE_RANGE = {'dateFrom': datetime.date(2024, 1, 1), 'dateTo': datetime.date(2024, 3, 31)}
+
+
+@pytest.fixture(scope='module')
+def session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def queryPlan(session, query):
+    """:return: The detail lines of the SQLite query plan of `query`, joined by newlines"""
+    statement = query.statement if hasattr(query, 'statement') else query
+    sql = str(statement.compile(session.get_bind(), compile_kwargs={'literal_binds': True}))
+    rows = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def assertUsesIndex(plan, table, index):
+    assert f"SCAN {table}\n" not in f"{plan}\n", plan
+    assert f"SEARCH {table} USING INDEX {index} " in plan or f"SEARCH {table} USING COVERING INDEX {index} " in plan, \
+        plan
+
+
+def listingQuery(session, filters):
+    spec = FilterSpec.forTransactions(filters, 'sqlite', USER, columns=['referenceID', 'date', 'amount'])
+    return spec.pageQuery(session, 1, 100, {'count': func.count()})
+
+
+def test_listing_by_date_range_uses_user_date_index(session):
+    plan = queryPlan(session, listingQuery(session, {'dateRange': DATE_RANGE}))
+    assertUsesIndex(plan, 'transactions', 'ix_transactions_user_date')
+
+
+def test_listing_by_bank_uses_user_bank_date_index(session):
+    plan = queryPlan(session, listingQuery(session, {'dateRange': DATE_RANGE, 'bank': 'HDFC'}))
+    assertUsesIndex(plan, 'transactions', 'ix_transactions_user_bank_date')
+
+
+def test_listing_without_filters_stays_on_the_users_rows(session):
+    plan = queryPlan(session, listingQuery(session, {}))
+    assert "SCAN transactions\n" not in f"{plan}\n", plan
+    assert "SEARCH transactions USING" in plan and "(user=?)" in plan, plan
+
+
+def test_file_transactions_use_user_file_index(session):
+    query = session.query(Transactions.referenceID).filter_by(fileID='file-1').filter_by(user=USER)
+    assertUsesIndex(queryPlan(session, query), 'transactions', 'ix_transactions_user_file')
+
+
+def test_calendar_reads_the_daily_rollup_by_key(session):
+    query = session.query(DailyRollup).filter(DailyRollup.user == USER) \
+        .filter(DailyRollup.day.between(DATE_RANGE['dateFrom'], DATE_RANGE['dateTo']))
+    assertUsesIndex(queryPlan(session, query), 'dailyRollup', 'sqlite_autoindex_dailyRollup_1')
+
+
+def test_search_tokens_are_looked_up_per_user(session):
+    query = session.query(Transactions.referenceID).filter(
+        TransactionSearchService().searchClause('sqlite', 'details', 'swiggy', USER))
+    assertUsesIndex(queryPlan(session, query), 'transactionSearchTokens', 'ix_search_tokens_user_field_token')
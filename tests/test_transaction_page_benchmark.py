@@ -0,0 +1,56 @@
+"""
+Latency of the transactions listing per filter shape, measured with pytest-benchmark on a seeded SQLite database.
+Every timed page must equal the page and totals of the separate page, count and sums queries it replaced.
+
+    python -m pytest tests/test_transaction_page_benchmark.py --benchmark-only
+"""
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.TransactionPageBenchmark import LISTING_COLUMNS, listingPage, requests, seed, threeQueryPage
+from models import Base
+from services.transactionsService import TransactionService
+from utils.DotDict import DotDict
+from utils.FilterSpec import FilterSpec
+
+TRANSACTIONS = 5000
+SHAPES = ['none', 'dateRange', 'bank+dateRange']
+
+
+@pytest.fixture(scope='module')
+def seeded(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('listing') / 'transactions.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    userIDs = seed(session, TRANSACTIONS, 3)
+    with Flask(__name__).app_context():
+        g.db = DotDict({'session': session})
+        yield session, userIDs
+    session.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_listing_time(benchmark, seeded, shape):
+    session, userIDs = seeded
+    service = TransactionService()
+    shaped = [request for request in requests(userIDs, 5) if request[0] == shape]
+    for _, userID, page, filters in shaped:
+        filterSpec = FilterSpec.forTransactions(filters, 'sqlite', userID, columns=LISTING_COLUMNS)
+        assert listingPage(service, userID, page, filters) == threeQueryPage(session, filterSpec, page)
+    _, userID, page, filters = shaped[0]
+    benchmark(listingPage, service, userID, page, filters)
+
+
+def test_first_cursor_page_has_the_totals_of_all_pages(seeded):
+    session, userIDs = seeded
+    filters = {'sorted': {'column': 'referenceID', 'order': 'desc'}}
+    filterSpec = FilterSpec.forTransactions(filters, 'sqlite', userIDs[0], columns=LISTING_COLUMNS)
+    _, expected = threeQueryPage(session, filterSpec, 1)
+    result = TransactionService()._fetchTransactions(1, filters, 100, '', userIDs[0])
+    assert (result['count'], result['credit_sum'], result['debit_sum']) == \
+           (expected['count'], expected['credit_sum'], expected['debit_sum'])
+    following = TransactionService()._fetchTransactions(1, filters, 100, result['next_cursor'], userIDs[0])
+    assert following['count'] is None
@@ -1,4 +1,5 @@
 import datetime
+import string
 
 from dateutil.relativedelta import relativedelta
 from enums.DateFormatEnum import DateStatementEnum
@@ -29,6 +30,10 @@ datetime_formats = [
 
 
 class DateTimeUtil:
+    # (bank, shape of the date string) -> format that parsed it. Alerts of a bank share one shape, so the format list is
+    # only walked once per bank instead of once per alert
+    _resolved_formats = {}
+    _shape_table = str.maketrans(string.digits + string.ascii_letters, '0' * 10 + 'a' * 52)
 
     @staticmethod
     def find_matching_format(date_string):
@@ -57,15 +62,26 @@ class DateTimeUtil:
         return first_day_formatted, last_day_formatted
 
     def convert_to_sql_datetime(self, date_str, bank):
-        # Try format and return the correctly parsed datetime in SQL format
+        key = (bank, date_str.translate(self._shape_table))
+        cached_format = self._resolved_formats.get(key)
+        if cached_format is not None:
+            try:
+                return datetime.datetime.strptime(date_str, cached_format).strftime("%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                pass
+        parsed_date, date_format = self._parse_for_bank(date_str, bank)
+        self._resolved_formats[key] = date_format
+        return parsed_date.strftime("%Y-%m-%d %H:%M:%S")  # SQL datetime format
+
+    def _parse_for_bank(self, date_str, bank):
+        """:return: (parsed datetime, format that parsed it). The bank's format is tried first, then the fallbacks"""
+        bank_format = getattr(DateStatementEnum, bank).value
         try:
-            parsed_date = datetime.datetime.strptime(date_str, getattr(DateStatementEnum, bank).value)
-            return parsed_date.strftime("%Y-%m-%d %H:%M:%S")  # SQL datetime format
+            return datetime.datetime.strptime(date_str, bank_format), bank_format
         except ValueError:
             possible_format = self.find_matching_format(date_str)
             if possible_format is not None:
-                parsed_date = datetime.datetime.strptime(date_str, possible_format)
-                return parsed_date.strftime("%Y-%m-%d %H:%M:%S")  # SQL datetime format
+                return datetime.datetime.strptime(date_str, possible_format), possible_format
             raise ValueError(f"Date format of '{date_str}' is not recognized.")
 
     def convert_to_sql_datetime_date(self, date_str, bank):
@@ -0,0 +1,237 @@
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from sqlalchemy import and_, func, or_
+
+
+class FilterSpec:
+    """
+    Compiles the `Filter` dict sent by the frontend into a reusable set of where/order clauses for a model, so the
+    page, the count and any totals can all be answered by a single statement.
+    """
+
+    def __init__(self, model, filters: dict | None, dateColumn, likeFields: dict, equalFields: dict, keyColumn,
+                 searchClause=None, userColumn=None, userID=None, columns: list | None = None):
+        """
+        :param model: Mapped class the filters apply to
+        :param filters: Filter dict from the request, may be None
+        :param dateColumn: Column the `dateRange` filter is applied to
+        :param likeFields: filter key -> column matched with ilike('%value%')
+        :param equalFields: filter key -> column matched with ==
+        :param keyColumn: Unique column used as the tie-breaker for cursor pagination
+        :param searchClause: Optional callable (filter key, value) -> clause that replaces the plain ilike for
+        `likeFields`, e.g. to go through a search index
+        :param userColumn: Column holding the owner of the row
+        :param userID: When given, every query is restricted to this user's rows
+        :param columns: Names of the columns to select. When given, pages hold plain dicts of these columns instead of
+        entities, which skips ORM hydration on large pages
+        """
+        self.model = model
+        self.filters = filters or {}
+        self.dateColumn = dateColumn
+        self.likeFields = likeFields
+        self.equalFields = equalFields
+        self.keyColumn = keyColumn
+        self.searchClause = searchClause
+        self.userColumn = userColumn
+        self.userID = userID
+        self.columns = columns
+        self.clauses = self._compileClauses()
+        self.orderBy = self._compileOrderBy()
+
+    @classmethod
+    def forTransactions(cls, filters: dict | None, dialectName: str | None = None, userID=None,
+                        columns: list | None = None):
+        """
+        :param dialectName: Dialect of the session the query runs on. When given, the details/tags filters go through
+        the transaction search index instead of a bare ilike.
+        """
+        from models import Transactions
+        from services.TransactionSearchService import TransactionSearchService
+        searchClause = None
+        if dialectName is not None:
+            searchFields = {'details': 'details', 'tags': 'tag'}
+            searchClause = lambda key, value: TransactionSearchService().searchClause(dialectName, searchFields[key],
+                                                                                      value, userID)
+        return cls(Transactions, filters, Transactions.date,
+                   likeFields={'details': Transactions.details, 'tags': Transactions.tag},
+                   equalFields={'bank': Transactions.bank, 'source': Transactions.source},
+                   keyColumn=Transactions.referenceID, searchClause=searchClause,
+                   userColumn=Transactions.user, userID=userID, columns=columns)
+
+    @classmethod
+    def forFileDetails(cls, filters: dict | None, userID=None):
+        from models import FileDetails
+        return cls(FileDetails, filters, FileDetails.uploadDate,
+                   likeFields={'fileName': FileDetails.fileName},
+                   equalFields={'bank': FileDetails.bank},
+                   keyColumn=FileDetails.fileID, userColumn=FileDetails.user, userID=userID)
+
+    def _compileClauses(self):
+        clauses = []
+        if self.userID is not None:
+            clauses.append(self.userColumn == self.userID)
+        if date_range := self.filters.get('dateRange'):
+            date_from = date_range.get('dateFrom')
+            date_to = date_range.get('dateTo')
+            if date_from and date_to:
+                clauses.append(self.dateColumn.between(date_from, date_to))
+        for key, column in self.likeFields.items():
+            if value := self.filters.get(key):
+                clauses.append(self.searchClause(key, value) if self.searchClause else column.ilike(f"%{value}%"))
+        for key, column in self.equalFields.items():
+            if value := self.filters.get(key):
+                clauses.append(column == value)
+        return clauses
+
+    @property
+    def userScopeOnly(self) -> bool:
+        """True when the filters add no clause besides the user restriction."""
+        return self.userID is not None and len(self.clauses) == 1
+
+    def _compileOrderBy(self):
+        if sorted := self.filters.get('sorted'):
+            column, order = sorted.get('column'), sorted.get('order', 'asc')
+            if column and hasattr(self.model, column):
+                column_attr = getattr(self.model, column)
+                return [column_attr.desc() if order == 'desc' else column_attr.asc()]
+        return []
+
+    def _selection(self):
+        if self.columns:
+            return [getattr(self.model, column) for column in self.columns]
+        return [self.model]
+
+    def _results(self, rows, hasTotals: bool):
+        """Strips the window columns off `rows`, giving entities or, with `columns`, dicts of the selected columns."""
+        if self.columns:
+            return [dict(zip(self.columns, row)) for row in rows]
+        return [row[0] for row in rows] if hasTotals else rows
+
+    @staticmethod
+    def _value(result, name):
+        return result[name] if isinstance(result, dict) else getattr(result, name)
+
+    def apply(self, query):
+        """Apply the compiled filters (not the ordering) to a Query or Select."""
+        return query.filter(*self.clauses) if self.clauses else query
+
+    def pageQuery(self, session, page: int, page_size: int, totals: dict | None = None):
+        """
+        Builds the page query. Every entry of `totals` is attached as a window aggregate (`agg OVER ()`), so each row
+        also carries the totals of the whole filtered set and no separate count/sum query is needed.
+        :param session: Session to build the query on
+        :param page: 1 based page number
+        :param page_size: Default page size, overridden by the `limit` filter
+        :param totals: label -> aggregate expression, e.g. {'count': func.count()}
+        """
+        windowColumns = [expression.over().label(label) for label, expression in (totals or {}).items()]
+        query = self.apply(session.query(*self._selection(), *windowColumns))
+        if self.orderBy:
+            query = query.order_by(*self.orderBy)
+        return query.offset((page - 1) * page_size).limit(self.filters.get('limit', page_size))
+
+    def totalsQuery(self, session, totals: dict):
+        """Plain aggregate query over the filtered set. Only needed when a page comes back empty."""
+        query = session.query(*[expression.label(label) for label, expression in totals.items()]).select_from(self.model)
+        return self.apply(query)
+
+    def fetchPage(self, session, page: int, page_size: int, totals: dict | None = None):
+        """
+        Runs the page query and splits the result into entities and totals.
+        :return: (entities, {label: total})
+        """
+        totals = totals or {}
+        rows = self.pageQuery(session, page, page_size, totals).all()
+        if not totals:
+            return self._results(rows, False), {}
+        if rows:
+            return self._results(rows, True), dict(zip(totals, rows[0][-len(totals):]))
+        # Page past the end of the result, the window columns have no row to ride on
+        return [], dict(zip(totals, self.totalsQuery(session, totals).first()))
+
+    """ Cursor (keyset) pagination """
+
+    def _sortKey(self):
+        """
+        Returns (column name, sort expression, descending) for keyset pagination. Nullable columns are coalesced so the
+        row comparison stays total.
+        """
+        if sorted := self.filters.get('sorted'):
+            column, order = sorted.get('column'), sorted.get('order', 'asc')
+            if column and hasattr(self.model, column) and column != self.keyColumn.key:
+                column_attr = getattr(self.model, column)
+                if column_attr.nullable:
+                    column_attr = func.coalesce(column_attr, '')
+                return column, column_attr, order == 'desc'
+        return None, None, (self.filters.get('sorted') or {}).get('order') == 'desc'
+
+    @staticmethod
+    def encodeCursor(column, sortValue, keyValue) -> str:
+        payload = json.dumps([column, sortValue, keyValue], default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decodeCursor(self, cursor: str):
+        try:
+            column, sortValue, keyValue = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError) as ex:
+            raise ValueError(f"Invalid cursor. {ex}")
+        if column != self._sortKey()[0]:
+            raise ValueError("Cursor does not belong to the requested sort order")
+        if column is not None:
+            sortValue = self._restoreValue(getattr(self.model, column), sortValue)
+        return sortValue, keyValue
+
+    @staticmethod
+    def _restoreValue(column, value):
+        # Cursor values travel as strings, convert them back so they bind like the column they are compared to
+        if value is None:
+            return ''
+        pythonType = column.type.python_type
+        if pythonType is datetime.date:
+            return datetime.date.fromisoformat(value)
+        if pythonType is datetime.datetime:
+            return datetime.datetime.fromisoformat(value)
+        if pythonType is Decimal:
+            return Decimal(value)
+        return value
+
+    def fetchKeysetPage(self, session, cursor: str | None, page_size: int, totals: dict | None = None):
+        """
+        Seeks directly to the rows after `cursor` using (sort column, key column) instead of an OFFSET, so every page
+        costs the same as the first one. Totals are only computed on the first page (no cursor), since the seek
+        predicate would otherwise change them.
+        :return: (entities, {label: total} or {}, next cursor or None)
+        """
+        column, sortExpression, descending = self._sortKey()
+        limit = self.filters.get('limit', page_size)
+        totals = totals if not cursor else None
+
+        windowColumns = [expression.over().label(label) for label, expression in (totals or {}).items()]
+        query = self.apply(session.query(*self._selection(), *windowColumns))
+        if cursor:
+            sortValue, keyValue = self.decodeCursor(cursor)
+            after = (lambda left, right: left < right) if descending else (lambda left, right: left > right)
+            keyPredicate = after(self.keyColumn, keyValue)
+            if sortExpression is not None:
+                keyPredicate = or_(after(sortExpression, sortValue),
+                                   and_(sortExpression == sortValue, keyPredicate))
+            query = query.filter(keyPredicate)
+
+        orderColumns = [sortExpression, self.keyColumn] if sortExpression is not None else [self.keyColumn]
+        query = query.order_by(*[c.desc() if descending else c.asc() for c in orderColumns]).limit(limit)
+
+        rows = query.all()
+        entities = self._results(rows, bool(totals))
+        values = {}
+        if totals:
+            values = dict(zip(totals, rows[0][-len(totals):])) if rows else dict(zip(totals, self.totalsQuery(session, totals).first()))
+
+        nextCursor = None
+        if len(entities) == limit:
+            last = entities[-1]
+            sortValue = self._value(last, column) if column is not None else None
+            nextCursor = self.encodeCursor(column, sortValue, self._value(last, self.keyColumn.key))
+        return entities, values, nextCursor
@@ -1,7 +1,7 @@
 from utils.GoogleServiceSingleton import GoogleServiceSingleton
 from io import BytesIO
 from flask import send_file
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaIoBaseUpload
 
 from googleapiclient.errors import HttpError
 
@@ -64,22 +64,43 @@ class GdriveServiceUtils:
             parent_id = self.getOrCreateFolder(drive_service, folder_name, parent_id)
         return parent_id
 
-    def uploadFileToDrive(self, fileName: str, parentFolderPath: str, userId, token, filePath):
+    def uploadFileToDrive(self, fileName: str, parentFolderPath: str, userId, token, content: bytes,
+                          folderCache=None):
+        """
+        :param folderCache: Optional DriveFolderCacheService of the user. With the folder id cached the upload is a
+        single API call, the path is only resolved again when Drive no longer knows the cached id
+        :return: Id of the uploaded file, None when the upload failed
+        """
         # Initialize Google Drive service
         drive_service = self.googleService.get_drive_service(userId, token)
 
+        parent_folder_id = folderCache.get(parentFolderPath) if folderCache is not None else None
+        if parent_folder_id is not None:
+            try:
+                return self.createFile(drive_service, fileName, parent_folder_id, content)
+            except HttpError as ex:
+                if ex.resp.status != 404:
+                    return None
+                # The folder was deleted or moved out of reach since it was cached
+                folderCache.invalidate(parentFolderPath)
+
         # Get the ID of the final folder in the path
         parent_folder_id = self.getFolderIdByPath(drive_service, parentFolderPath)
-
-        # Set up file metadata and upload
-        file_metadata = {'name': fileName, 'parents': [parent_folder_id]}
-        media = MediaFileUpload(filePath, mimetype='text/plain')
+        if folderCache is not None:
+            folderCache.put(parentFolderPath, parent_folder_id)
 
         try:
-            uploaded_file = drive_service.files().create(body=file_metadata, media_body=media).execute()
-            return uploaded_file["id"]
+            return self.createFile(drive_service, fileName, parent_folder_id, content)
         except HttpError:
             return None
 
+    @staticmethod
+    def createFile(drive_service, fileName, parentFolderId, content):
+        # Set up file metadata and upload
+        file_metadata = {'name': fileName, 'parents': [parentFolderId]}
+        media = MediaIoBaseUpload(BytesIO(content), mimetype='text/plain')
+        uploaded_file = drive_service.files().create(body=file_metadata, media_body=media).execute()
+        return uploaded_file["id"]
+
     def checkStatus(self, token):
         return self.googleService.is_token_valid(token)
\ No newline at end of file
@@ -1,7 +1,6 @@
 import os
 import re
 import hashlib
-import shutil
 import uuid
 from decimal import Decimal, ROUND_DOWN
 
@@ -38,49 +37,55 @@ class GenericUtil:
 
         return reference_id
 
+    @staticmethod
+    def generate_reference_ids(datetime_strs, varchar_fields, decimal_fields):
+        """generate_reference_id over whole columns of a statement"""
+        return [hashlib.md5(f"{datetime_str}|{varchar_field}|{float(decimal_field):.2f}".encode()).hexdigest()
+                for datetime_str, varchar_field, decimal_field in zip(datetime_strs, varchar_fields, decimal_fields)]
+
+    # bank -> compiled EmailRegexEnum pattern, compiled on first use
+    _emailMatchers = {}
+
+    @classmethod
+    def getEmailMatcher(cls, bankType):
+        matcher = cls._emailMatchers.get(bankType)
+        if matcher is None:
+            matcher = cls._emailMatchers[bankType] = re.compile(EmailRegexEnum[bankType].value)
+        return matcher
+
     def extractDetailsFromEmail(self, emails, bankType):
+        """
+        Matches every email snippet of a bank against its compiled pattern in one pass.
+        :return: (cleaned transactions, snippets that did not match)
+        """
         try:
-            # Retrieve the regex pattern from the enum
-            pattern = EmailRegexEnum[bankType].value
-            cleanedMails = []
-            conflicts = []
-            for email in emails:
-                matches = re.search(pattern, email)
-
-                if matches:
-                    # Extract matched details as a dictionary
-                    details = matches.groupdict()
-                    date = DateTimeUtil().convert_to_sql_datetime(details.get('transaction_date'), bankType)
-                    description = details.get('merchant')
-                    amount = details.get('amount_spent')
-                    referenceID = GenericUtil().generate_reference_id(date, description, amount)
-                    cleanedMails.append({
-                        'reference': referenceID,
-                        'date': date,
-                        'description': description,
-                        'amount': amount,
-                    })
-                else:
-                    # Insert this into conflicts here
-                    conflicts.append(email)
-                    self.logger.error(f"No match found for: {email}")
-            return cleanedMails, conflicts
+            search = self.getEmailMatcher(bankType).search
         except KeyError:
             self.logger.error(f"Error: '{bankType}' is not a valid EmailRegexEnum member.")
-
-    @staticmethod
-    def emptyTemp():
-        folderPath = os.getcwd() + "/tmp"
-        # Delete the folder and all its contents
-        shutil.rmtree(folderPath)
-        # Recreate the empty folder
-        os.makedirs(folderPath, exist_ok=True)
-
-        # This seems to be a faster approach then deleting the files in the folder? Not sure
-
-    @staticmethod
-    def getFileSize(filePath):
-        return os.path.getsize(os.getcwd() + '/tmp/' + filePath)
+            return None
+        convertDate = DateTimeUtil().convert_to_sql_datetime
+        referenceId = self.generate_reference_id
+        cleanedMails = []
+        conflicts = []
+        for email in emails:
+            matches = search(email)
+            if matches:
+                # Extract matched details as a dictionary
+                details = matches.groupdict()
+                date = convertDate(details.get('transaction_date'), bankType)
+                description = details.get('merchant')
+                amount = details.get('amount_spent')
+                cleanedMails.append({
+                    'reference': referenceId(date, description, amount),
+                    'date': date,
+                    'description': description,
+                    'amount': amount,
+                })
+            else:
+                # Insert this into conflicts here
+                conflicts.append(email)
+                self.logger.error(f"No match found for: {email}")
+        return cleanedMails, conflicts
 
     @staticmethod
     def generate_custom_buyID():
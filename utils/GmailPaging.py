@@ -0,0 +1,22 @@
+import os
+
+# Ids requested per messages().list page, Gmail allows up to 500
+GMAIL_PAGE_SIZE = int(os.getenv('GMAIL_PAGE_SIZE', 100))
+
+
+def iterMessagePages(gmailService, query, maxResults=GMAIL_PAGE_SIZE, skip=None):
+    """
+    Generator over a messages().list query that follows nextPageToken. Yields the ids of every page as it arrives,
+    so callers can work on a page before the next one is listed and never hold the whole listing.
+    :param skip: Optional callable returning the ids of a page that were already processed, those are left out
+    """
+    request = gmailService.users().messages().list(userId='me', q=query, maxResults=maxResults)
+    while request is not None:
+        response = request.execute()
+        messageIds = [message['id'] for message in response.get('messages', [])]
+        if skip is not None and messageIds:
+            known = skip(messageIds)
+            messageIds = [messageId for messageId in messageIds if messageId not in known]
+        if messageIds:
+            yield messageIds
+        request = gmailService.users().messages().list_next(request, response)
@@ -1,25 +1,132 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
+
 from services.StatementDownloadService import StatementDownloadService
+from utils.GmailPaging import GMAIL_PAGE_SIZE, iterMessagePages
 from utils.GoogleServiceSingleton import GoogleServiceSingleton
+from utils.logger import Logger
 
 
 class GmailServiceUtils:
+    # Gmail accepts at most 100 calls per batch request
+    batchSize = 100
+    fetchWorkers = int(os.getenv('GMAIL_FETCH_WORKERS', 8))
+    # Retries of a message fetched on its own, on 429 and 5xx responses with exponential backoff
+    fetchRetries = int(os.getenv('GMAIL_FETCH_RETRIES', 3))
 
     def __init__(self):
         self.googleService = GoogleServiceSingleton()
+        self.logger = Logger(__name__).get_logger()
+
+    def findEmailInIntervalForPattern(self, userId, token, pattern, dateFrom, dateTo, skip=None,
+                                      maxResults=GMAIL_PAGE_SIZE):
+        """
+        Generator over every page of matching mail, each page is fetched as soon as it is listed.
+        :param skip: Optional callable returning the listed message ids that were already processed
+        :return: Lists of messages with `id` and `snippet`, one per page
+        """
+        gmailService = self.googleService.get_gmail_service(userId, token)
+        credentials = self.googleService.get_gmail_credentials(userId, token)
+        query = pattern + f" after:{dateFrom} before:{dateTo}"
+        for messageIds in iterMessagePages(gmailService, query, maxResults, skip):
+            yield self.fetchMessages(gmailService, credentials, messageIds, fields='id,snippet')
 
-    def findEmailInIntervalForPattern(self, userId, token, pattern, dateFrom, dateTo):
+    def findEmailsAfter(self, userId, token, pattern, afterEpoch, skip=None, maxResults=GMAIL_PAGE_SIZE):
+        """
+        Generator over every page of matching mail received after `afterEpoch` (epoch seconds).
+        :param skip: Optional callable returning the listed message ids that were already processed
+        :return: Lists of messages with `id`, `snippet` and `internalDate` (epoch ms as a string), one per page
+        """
         gmailService = self.googleService.get_gmail_service(userId, token)
-        emailSnippets = gmailService.users().messages().list(userId='me', q=pattern + f" after:{dateFrom}"
-                                                                                      f" before:{dateTo}").execute().get(
-            'messages', [])
+        credentials = self.googleService.get_gmail_credentials(userId, token)
+        for messageIds in iterMessagePages(gmailService, f"{pattern} after:{afterEpoch}", maxResults, skip):
+            yield self.fetchMessages(gmailService, credentials, messageIds, fields='id,snippet,internalDate')
+
+    def fetchHistoryId(self, userId, token):
+        """Current historyId of the mailbox."""
+        gmailService = self.googleService.get_gmail_service(userId, token)
+        return gmailService.users().getProfile(userId='me', fields='historyId').execute()['historyId']
+
+    def fetchHistoryChanges(self, userId, token, startHistoryId):
+        """
+        Checks whether mail arrived since `startHistoryId`, usually with a single call.
+        :return: (messages were added, latest historyId), or None when `startHistoryId` is too old for Gmail to answer
+        """
+        gmailService = self.googleService.get_gmail_service(userId, token)
+        messagesAdded = False
+        request = gmailService.users().history().list(userId='me', startHistoryId=startHistoryId,
+                                                      historyTypes='messageAdded')
+        try:
+            while request is not None:
+                response = request.execute()
+                messagesAdded = messagesAdded or any(record.get('messagesAdded')
+                                                     for record in response.get('history', []))
+                latestHistoryId = response['historyId']
+                request = gmailService.users().history().list_next(request, response)
+        except HttpError as ex:
+            if ex.resp.status == 404:
+                return None
+            raise
+        return messagesAdded, latestHistoryId
+
+    def fetchMessages(self, gmailService, credentials, messageIds, fields='snippet'):
+        """
+        Fetches `fields` of every message in as few round trips as possible. Messages are requested in batches of
+        `batchSize`, whatever a batch could not serve is fetched on a thread pool.
+        :param credentials: Credentials of `gmailService`, every pooled fetch authorizes its own http object with them
+        :return: Message resources in the order of `messageIds`
+        """
+        messages = [None] * len(messageIds)
+        failed = []
+        for start in range(0, len(messageIds), self.batchSize):
+            chunk = range(start, min(start + self.batchSize, len(messageIds)))
+            failed += self._fetchBatch(gmailService, messageIds, chunk, messages, fields)
+
+        if failed:
+            self.logger.info(f"Fetching {len(failed)} messages individually after batch failures")
+            with ThreadPoolExecutor(max_workers=self.fetchWorkers) as executor:
+                for index, message in zip(failed, executor.map(
+                        lambda position: self._fetchOne(gmailService, credentials, messageIds[position], fields),
+                        failed)):
+                    messages[index] = message
+        return messages
+
+    def _fetchBatch(self, gmailService, messageIds, chunk, messages, fields):
+        """Fills `messages` for the positions in `chunk` with one batch request, returns the positions that failed."""
+        failed = []
+
+        def onResponse(requestId, response, exception):
+            if exception is not None:
+                failed.append(int(requestId))
+            else:
+                messages[int(requestId)] = response
+
+        batch = gmailService.new_batch_http_request(callback=onResponse)
+        for position in chunk:
+            batch.add(gmailService.users().messages().get(userId="me", id=messageIds[position], fields=fields),
+                      request_id=str(position))
+        try:
+            batch.execute()
+        except Exception as ex:
+            self.logger.error(f"Batch fetch of {len(chunk)} messages failed: {ex}")
+            return [position for position in chunk if messages[position] is None]
+        return failed
 
-        return [gmailService.users().messages().get(userId="me", id=email['id']).execute()['snippet'] for email in
-                emailSnippets]
+    def _fetchOne(self, gmailService, credentials, messageId, fields):
+        # The service's http object is not thread safe, give every call its own
+        http = AuthorizedHttp(credentials, http=httplib2.Http())
+        return gmailService.users().messages().get(userId="me", id=messageId, fields=fields) \
+            .execute(http=http, num_retries=self.fetchRetries)
 
-    def downloadFilesInRange(self, userId, token, password, bankType, dateTo, dateFrom):
+    def downloadFilesInRange(self, userId, token, password, bankType, dateTo, dateFrom, skip=None,
+                             skipAttachment=None):
         gmailService = self.googleService.get_gmail_service(userId, token)
         statementDownloader = StatementDownloadService(gmailService=gmailService, password=password)
-        return statementDownloader.route_download_process(bankType, dateTo, dateFrom)
+        return statementDownloader.route_download_process(bankType, dateTo, dateFrom, skip, skipAttachment)
 
     def checkStatus(self, token):
         return self.googleService.is_token_valid(token)
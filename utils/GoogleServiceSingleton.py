@@ -1,4 +1,5 @@
 import os
+import threading
 
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
@@ -13,7 +14,8 @@ class GoogleServiceSingleton:
     token. """
 
     _instance = None
-    _user_services = {}
+    # Service objects wrap an httplib2 connection, which is not thread safe, so every thread builds and caches its own
+    _local = threading.local()
     logger = None
 
     def __new__(cls):
@@ -26,8 +28,17 @@ class GoogleServiceSingleton:
         # Avoid reinitializing if already initialized
         return
 
+    @property
+    def _user_services(self):
+        if not hasattr(self._local, 'user_services'):
+            self._local.user_services = {}
+        return self._local.user_services
+
     def _initialize_service(self, token_info, service_name, api_version, scopes):
-        """Initializes a Google service if token is valid or renews it if expired."""
+        """
+        Initializes a Google service if token is valid or renews it if expired.
+        :return: (service, credentials), (None, None) when the token cannot be used
+        """
         try:
             credentials = Credentials(
                 token=token_info['token'],
@@ -49,29 +60,29 @@ class GoogleServiceSingleton:
                     token_info['expiry'] = credentials.expiry
                 except RefreshError as e:
                     self.logger.error(f"Failed to refresh token for {service_name}. Reason: {e}")
-                    return None
+                    return None, None
             elif credentials.expired:
                 self.logger.info(self.start_fresh_auth_flow(scopes))
                 self.logger.error(f"Token for {service_name} expired and no refresh token is available.")
-                return None
+                return None, None
 
             # Initialize and cache the Google service
             service = build(service_name, api_version, credentials=credentials)
-            return service
+            return service, credentials
         except RefreshError as e:
             self.logger.error(
                 f"Failed to initialize {service_name} service due to invalid grant (token expired or revoked): {e}")
-            return None
+            return None, None
         except Exception as e:
             self.logger.error(f"Failed to initialize {service_name} service: {e}")
-            return None
+            return None, None
 
     def get_gmail_service(self, user_id, token_info):
         """Return the Gmail service instance using the provided token info."""
         if user_id in self._user_services and 'gmail' in self._user_services[user_id]:
             return self._user_services[user_id]['gmail']
 
-        gmail_service = self._initialize_service(
+        gmail_service, credentials = self._initialize_service(
             token_info,
             service_name='gmail',
             api_version='v1',
@@ -79,17 +90,25 @@ class GoogleServiceSingleton:
         )
 
         if gmail_service:
-            self._user_services.setdefault(user_id, {})['gmail'] = gmail_service
+            services = self._user_services.setdefault(user_id, {})
+            services['gmail'] = gmail_service
+            services['gmail_credentials'] = credentials
             self.logger.info(f"Gmail service initialized for user {user_id}.")
 
         return gmail_service
 
+    def get_gmail_credentials(self, user_id, token_info):
+        """Return the credentials of the user's Gmail service, for requests sent over their own http object."""
+        if self.get_gmail_service(user_id, token_info) is None:
+            return None
+        return self._user_services[user_id]['gmail_credentials']
+
     def get_drive_service(self, user_id, token_info):
         """Return the Google Drive service instance using the provided token info."""
         if user_id in self._user_services and 'drive' in self._user_services[user_id]:
             return self._user_services[user_id]['drive']
 
-        drive_service = self._initialize_service(
+        drive_service, _ = self._initialize_service(
             token_info,
             service_name='drive',
             api_version='v3',
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Thread safe LRU cache with a TTL whose entries belong to a user, so every entry of a user can be dropped at once
+    when their rows change. Keeps hit/miss/eviction counters for sizing.
+
+    A value computed while the user's rows changed must not be cached: read `generation(user)` before computing it
+    and hand it to `put`, which drops the value when the user was invalidated in between.
+    """
+
+    def __init__(self, maxEntries: int, ttlSeconds: float):
+        self.maxEntries = maxEntries
+        self.ttlSeconds = ttlSeconds
+        self._entries = OrderedDict()  # (user, key) -> (expiry, value)
+        self._userKeys = {}  # user -> set of keys
+        self._generations = {}  # user -> number of invalidations
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.discards = 0
+
+    @staticmethod
+    def makeKey(*parts) -> str:
+        """Canonical hash of the parts. Dict ordering does not matter."""
+        canonical = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, user, key):
+        with self._lock:
+            entry = self._entries.get((user, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            expiry, value = entry
+            if expiry < time.monotonic():
+                self._remove((user, key))
+                self.misses += 1
+                return None
+            self._entries.move_to_end((user, key))
+            self.hits += 1
+            return value
+
+    def generation(self, user) -> int:
+        with self._lock:
+            return self._generations.get(user, 0)
+
+    def put(self, user, key, value, generation: int | None = None):
+        """:param generation: `generation(user)` from before the value was computed"""
+        with self._lock:
+            if generation is not None and generation != self._generations.get(user, 0):
+                self.discards += 1
+                return
+            self._entries[(user, key)] = (time.monotonic() + self.ttlSeconds, value)
+            self._entries.move_to_end((user, key))
+            self._userKeys.setdefault(user, set()).add(key)
+            while len(self._entries) > self.maxEntries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidateUser(self, user):
+        with self._lock:
+            for key in self._userKeys.pop(user, set()):
+                self._entries.pop((user, key), None)
+            self._generations[user] = self._generations.get(user, 0) + 1
+            self.invalidations += 1
+
+    def _remove(self, entryKey):
+        self._entries.pop(entryKey, None)
+        user, key = entryKey
+        keys = self._userKeys.get(user)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._userKeys[user]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.maxEntries,
+                "ttl_seconds": self.ttlSeconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "discards": self.discards,
+            }